@@ -0,0 +1,5 @@
+import sys
+
+from fee_simulator.cli import main
+
+sys.exit(main())
@@ -0,0 +1,251 @@
+import contextlib
+import io
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, model_validator
+
+from fee_simulator.models import ProtocolParams, DEFAULT_PROTOCOL_PARAMS
+from fee_simulator.types import RoundLabel
+from fee_simulator.utils import compute_total_cost
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.core.scenario_cache import PayoutTemplateCache
+from fee_simulator.analysis.explorer import RoundPattern, ScenarioBuilder
+from fee_simulator.analysis.expected_payouts import (
+    MAJORITY_VOTES,
+    majority_probabilities,
+    vote_count_distributions,
+)
+
+# Outcome class probabilities of one round
+OutcomeProbabilities = Dict[RoundPattern, float]
+
+# Rounds of a transaction up to one of its normal rounds
+Path = Tuple[RoundPattern, ...]
+
+# States grow geometrically with the appeals (see AppealChain)
+MAX_CHAIN_APPEALS = 3
+
+
+def round_outcome_probabilities(
+    round_index: int,
+    vote_probabilities: Sequence[float],
+    leader_timeout_probability: float = 0.0,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> OutcomeProbabilities:
+    """
+    Majority class probabilities of a round whose round_sizes[round_index]
+    voters each vote AGREE, DISAGREE and TIMEOUT with the given
+    probabilities. Leaders of normal rounds time out with
+    leader_timeout_probability.
+    """
+    size = params.round_sizes[round_index]
+    pmf = vote_count_distributions(np.tile(vote_probabilities, (size, 1)))
+    majority = majority_probabilities(pmf)
+    outcomes: OutcomeProbabilities = {}
+    receipt = 1.0
+    if round_index % 2 == 0 and leader_timeout_probability:
+        timed_out = RoundPattern(leader="TIMEOUT", majority="UNDETERMINED")
+        outcomes[timed_out] = leader_timeout_probability
+        receipt -= leader_timeout_probability
+    for outcome in MAJORITY_VOTES + ("UNDETERMINED",):
+        if majority[outcome]:
+            outcomes[RoundPattern(majority=outcome)] = receipt * majority[outcome]
+    return outcomes
+
+
+class AppealProcess(BaseModel):
+    """
+    Probabilities of the appeal process: outcome classes of normal round k
+    (index 2k) and appeal round k (index 2k + 1), and the chance that a
+    normal round of each class is appealed (zero for classes left out).
+    """
+
+    model_config = ConfigDict(frozen=True)
+    normal_outcomes: Tuple[OutcomeProbabilities, ...]
+    appeal_outcomes: Tuple[OutcomeProbabilities, ...] = ()
+    appeal_rates: Dict[RoundPattern, float] = {}
+
+    @model_validator(mode="after")
+    def validate_distributions(self):
+        if len(self.appeal_outcomes) != len(self.normal_outcomes) - 1:
+            raise ValueError("Each appeal round must be followed by a normal round")
+        for outcomes in self.normal_outcomes + self.appeal_outcomes:
+            if any(p < 0 for p in outcomes.values()) or not np.isclose(
+                sum(outcomes.values()), 1
+            ):
+                raise ValueError("Outcome probabilities must be a distribution")
+        for outcomes in self.appeal_outcomes:
+            if any(pattern.leader == "TIMEOUT" for pattern in outcomes):
+                raise ValueError("Appeal rounds have no leader")
+        if any(not 0 <= rate <= 1 for rate in self.appeal_rates.values()):
+            raise ValueError("Appeal rates must be probabilities")
+        return self
+
+    @property
+    def max_appeals(self) -> int:
+        return len(self.appeal_outcomes)
+
+
+class ChainReport(BaseModel):
+    """
+    Exact evaluation of an appeal process. Expectations are taken over the
+    transactions that process; failed_probability is the mass of those that
+    do not (e.g. a negative refund).
+    """
+
+    model_config = ConfigDict(frozen=True)
+    label_sequences: Dict[Tuple[RoundLabel, ...], float]
+    appeal_distribution: Tuple[float, ...]
+    expected_appeals: float
+    expected_sender_cost: float
+    expected_refund: float
+    failed_probability: float
+    n_states: int
+
+
+class AppealChain:
+    """
+    The appeal process as an absorbing Markov chain.
+
+    A transient state is the sequence of outcome classes up to a normal
+    round, where the process either ends or appeals; ending absorbs the
+    transaction. Labels depend on neighbouring rounds, and label_rounds
+    relabels earlier rounds when later ones arrive, so states keep the
+    rounds before them. Only classes with positive probability open
+    states.
+
+    States are therefore exponential in the number of appeals: with n
+    normal and a appeal outcome classes there are up to n * (a * n)^k
+    states with k appeals, about 20^k for the five normal and four
+    appeal classes of round_outcome_probabilities. max_appeals is capped
+    at MAX_CHAIN_APPEALS, a few tens of thousands of processed paths.
+
+    Transitions from the states with k appeals form one block of the chain,
+    so the expected visits to every state (the start row of the
+    fundamental matrix) are computed block by block as outer products.
+    Absorbed paths are processed once, on the explorer's representative
+    scenario of their classes, and cached for later evaluations.
+    """
+
+    def __init__(
+        self,
+        max_appeals: int,
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+        leader_timeout: int = 100,
+        validators_timeout: int = 200,
+    ):
+        if max_appeals > MAX_CHAIN_APPEALS:
+            raise ValueError(
+                f"The chain grows exponentially; at most {MAX_CHAIN_APPEALS} appeals"
+            )
+        self.builder = ScenarioBuilder(
+            max_appeals, params, leader_timeout, validators_timeout
+        )
+        self.max_appeals = max_appeals
+        self.params = params
+        self.addresses = self.builder.addresses()
+        self.template_cache = PayoutTemplateCache()
+        # Labels, sender cost and refund of every absorbed path seen
+        self._paths: Dict[Path, Optional[Tuple[Tuple[RoundLabel, ...], int, int]]] = {}
+
+    def path_outcome(
+        self, path: Path
+    ) -> Optional[Tuple[Tuple[RoundLabel, ...], int, int]]:
+        """
+        Labels, sender cost and refund of a transaction ending after path;
+        None if processing rejects it.
+        """
+        if path in self._paths:
+            return self._paths[path]
+        transaction_results, budget = self.builder.build(path)
+        try:
+            # Refund errors dump the fee table before raising
+            with contextlib.redirect_stdout(io.StringIO()):
+                outcome = process_transaction(
+                    self.addresses,
+                    transaction_results,
+                    budget,
+                    mode="summary",
+                    template_cache=self.template_cache,
+                    params=self.params,
+                )
+            result = (
+                tuple(outcome.labels),
+                compute_total_cost(budget, self.params),
+                outcome.refund,
+            )
+        except ValueError:
+            result = None
+        self._paths[path] = result
+        return result
+
+    def evaluate(self, process: AppealProcess) -> ChainReport:
+        if process.max_appeals > self.max_appeals:
+            raise ValueError(f"The chain allows {self.max_appeals} appeals")
+        label_sequences: Dict[Tuple[RoundLabel, ...], float] = {}
+        appeal_distribution: List[float] = []
+        expected_cost = expected_refund = failed = 0.0
+        n_states = 0
+
+        outcomes = list(process.normal_outcomes[0].items())
+        paths: List[Path] = [(pattern,) for pattern, _ in outcomes]
+        reach = np.array([p for _, p in outcomes])
+        for k in range(process.max_appeals + 1):
+            n_states += len(paths)
+            if k < process.max_appeals:
+                rates = np.array(
+                    [process.appeal_rates.get(path[-1], 0.0) for path in paths]
+                )
+            else:
+                rates = np.zeros(len(paths))
+            absorbed = reach * (1 - rates)
+            appeal_distribution.append(float(absorbed.sum()))
+
+            costs = np.zeros(len(paths))
+            refunds = np.zeros(len(paths))
+            valid = np.zeros(len(paths), dtype=bool)
+            for i, path in enumerate(paths):
+                if not absorbed[i]:
+                    continue
+                result = self.path_outcome(path)
+                if result is None:
+                    continue
+                labels, costs[i], refunds[i] = result
+                valid[i] = True
+                label_sequences[labels] = label_sequences.get(labels, 0.0) + float(
+                    absorbed[i]
+                )
+            failed += float(absorbed[~valid].sum())
+            expected_cost += float(absorbed[valid] @ costs[valid])
+            expected_refund += float(absorbed[valid] @ refunds[valid])
+
+            if k == process.max_appeals:
+                break
+            # Appeal and the next normal round, for every state at once
+            steps = [
+                (appeal, normal, p * q)
+                for appeal, p in process.appeal_outcomes[k].items()
+                for normal, q in process.normal_outcomes[k + 1].items()
+            ]
+            appealed = np.flatnonzero(reach * rates)
+            reach = np.outer(
+                (reach * rates)[appealed], [p for _, _, p in steps]
+            ).ravel()
+            paths = [
+                paths[i] + (appeal, normal)
+                for i in appealed.tolist()
+                for appeal, normal, _ in steps
+            ]
+
+        return ChainReport(
+            label_sequences=label_sequences,
+            appeal_distribution=tuple(appeal_distribution),
+            expected_appeals=float(
+                np.arange(len(appeal_distribution)) @ appeal_distribution
+            ),
+            expected_sender_cost=expected_cost,
+            expected_refund=expected_refund,
+            failed_probability=failed,
+            n_states=n_states,
+        )
@@ -0,0 +1,268 @@
+import contextlib
+import functools
+import io
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from fee_simulator.models import (
+    TransactionBudget,
+    TransactionRoundResults,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.utils import compute_total_cost
+from fee_simulator.invariants import InvariantViolation, check_invariants
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.core.scenario_cache import PayoutTemplateCache
+from fee_simulator.rng import DEFAULT_ROOT_SEED, chunk_ranges, transaction_rng
+
+# Addresses to stake, round results and the budget they were recorded with
+CorpusEntry = Tuple[List[str], TransactionRoundResults, TransactionBudget]
+
+
+class BudgetCandidate(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    leaderTimeout: int = Field(ge=0)
+    validatorsTimeout: int = Field(ge=0)
+    appealRounds: int = Field(ge=0)
+
+    def apply(self, budget: TransactionBudget) -> TransactionBudget:
+        """
+        The budget with this candidate's timeouts and appeal rounds; missing
+        rotation counts are zero.
+        """
+        n_rotations = self.appealRounds + 1
+        rotations = list(budget.rotations[:n_rotations])
+        rotations += [0] * (n_rotations - len(rotations))
+        return budget.model_copy(
+            update=dict(
+                leaderTimeout=self.leaderTimeout,
+                validatorsTimeout=self.validatorsTimeout,
+                appealRounds=self.appealRounds,
+                rotations=rotations,
+            )
+        )
+
+
+class CandidateResult(BaseModel):
+    """
+    A candidate checked against the corpus. Unsafe candidates stop at the
+    first violating scenario and carry what it broke; totals of safe ones
+    cover the whole corpus.
+    """
+
+    model_config = ConfigDict(frozen=True)
+    candidate: BudgetCandidate
+    safe: bool
+    sender_cost: int = 0
+    validator_reward: int = 0
+    failing_scenario: Optional[int] = None
+    invariant: Optional[str] = None
+    message: Optional[str] = None
+
+
+def _unsafe(
+    candidate: BudgetCandidate, index: int, invariant: str, message: str
+) -> CandidateResult:
+    return CandidateResult(
+        candidate=candidate,
+        safe=False,
+        failing_scenario=index,
+        invariant=invariant,
+        message=message,
+    )
+
+
+def evaluate_candidate(
+    corpus: Sequence[CorpusEntry],
+    candidate: BudgetCandidate,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    template_cache: Optional[PayoutTemplateCache] = None,
+) -> CandidateResult:
+    """
+    Process every scenario under the candidate budget, stopping at the first
+    negative refund, processing error or invariant violation.
+
+    The sender cost is the summed compute_total_cost of the corpus budgets;
+    the validator reward is what leaders and validators earn over it.
+    """
+    sender_cost = 0
+    validator_reward = 0
+    for index, (addresses, transaction_results, budget) in enumerate(corpus):
+        unsafe = functools.partial(_unsafe, candidate, index)
+        needed = len(transaction_results.rounds) // 2
+        if candidate.appealRounds < needed:
+            return unsafe("appeal_rounds", f"Scenario needs {needed} appeal rounds")
+        candidate_budget = candidate.apply(budget)
+        try:
+            # Refund errors dump the fee table before raising
+            with contextlib.redirect_stdout(io.StringIO()):
+                fee_events, _ = process_transaction(
+                    addresses,
+                    transaction_results,
+                    candidate_budget,
+                    # Same stakes for scenario `index` under every candidate
+                    rng=transaction_rng(DEFAULT_ROOT_SEED, index),
+                    template_cache=template_cache,
+                    params=params,
+                )
+            check_invariants(fee_events, candidate_budget, transaction_results)
+        except InvariantViolation as violation:
+            return unsafe(violation.invariant, violation.message)
+        except Exception as error:
+            return unsafe("processing", f"{type(error).__name__}: {error}")
+        sender_cost += compute_total_cost(candidate_budget, params)
+        validator_reward += (
+            fee_events.role_bucket("LEADER").earned
+            + fee_events.role_bucket("VALIDATOR").earned
+        )
+    return CandidateResult(
+        candidate=candidate,
+        safe=True,
+        sender_cost=sender_cost,
+        validator_reward=validator_reward,
+    )
+
+
+def _search_appeal_rounds(
+    corpus: Sequence[CorpusEntry],
+    leader_timeout: int,
+    validators_timeout: int,
+    appeal_rounds: Sequence[int],
+    params: ProtocolParams,
+    template_cache: PayoutTemplateCache,
+) -> List[CandidateResult]:
+    # Binary search for the fewest safe appeal rounds. Prepaying more rounds
+    # only raises the sender cost (and so the refund) and leaves payouts
+    # alone, so safety is monotone in them and more rounds are dominated.
+    results = []
+    lo, hi = 0, len(appeal_rounds) - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        candidate = BudgetCandidate(
+            leaderTimeout=leader_timeout,
+            validatorsTimeout=validators_timeout,
+            appealRounds=appeal_rounds[mid],
+        )
+        result = evaluate_candidate(corpus, candidate, params, template_cache)
+        results.append(result)
+        if result.safe:
+            hi = mid - 1
+        else:
+            lo = mid + 1
+    return results
+
+
+def _search_chunk(
+    corpus: Sequence[CorpusEntry],
+    timeouts: List[Tuple[int, int]],
+    appeal_rounds: Sequence[int],
+    params: ProtocolParams,
+) -> List[CandidateResult]:
+    template_cache = PayoutTemplateCache()
+    return [
+        result
+        for leader_timeout, validators_timeout in timeouts
+        for result in _search_appeal_rounds(
+            corpus,
+            leader_timeout,
+            validators_timeout,
+            appeal_rounds,
+            params,
+            template_cache,
+        )
+    ]
+
+
+def pareto_frontier(results: Sequence[CandidateResult]) -> List[CandidateResult]:
+    """
+    Safe results no other safe result beats on both sender cost (lower) and
+    validator reward (higher), cheapest first.
+    """
+    frontier: List[CandidateResult] = []
+    ranked = sorted(
+        (result for result in results if result.safe),
+        key=lambda result: (result.sender_cost, -result.validator_reward),
+    )
+    for result in ranked:
+        if not frontier or result.validator_reward > frontier[-1].validator_reward:
+            frontier.append(result)
+    return frontier
+
+
+class OptimizationReport(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    n_candidates: int
+    results: List[CandidateResult]
+    frontier: List[CandidateResult]
+
+    @property
+    def n_evaluated(self) -> int:
+        return len(self.results)
+
+    @property
+    def cheapest(self) -> Optional[CandidateResult]:
+        return self.frontier[0] if self.frontier else None
+
+
+def optimize_budget(
+    corpus: Sequence[CorpusEntry],
+    leader_timeouts: Sequence[int],
+    validators_timeouts: Sequence[int],
+    appeal_rounds: Sequence[int],
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    workers: int = 1,
+    chunks_per_worker: int = 4,
+) -> OptimizationReport:
+    """
+    Search a grid of timeouts and appeal rounds for budgets under which every
+    corpus scenario processes with a non-negative refund and satisfies the
+    invariants.
+
+    Each timeout pair binary searches its fewest safe appeal rounds, and
+    each candidate stops at its first violating scenario. Timeout pairs are
+    searched in chunks across a process pool.
+
+    Args:
+        corpus: Scenarios every candidate must handle
+        leader_timeouts: Leader timeouts to try
+        validators_timeouts: Validator timeouts to try
+        appeal_rounds: Appeal rounds to try
+        params: Protocol parameters to process under
+        workers: Number of processes; 1 searches in this process
+        chunks_per_worker: Chunks submitted per process, to balance load
+
+    Returns:
+        The evaluated candidates and the Pareto frontier of sender cost
+        against validator reward
+    """
+    appeal_rounds = sorted(set(appeal_rounds))
+    if not appeal_rounds or not 0 <= 2 * appeal_rounds[-1] < len(params.round_sizes):
+        raise ValueError(f"Invalid appeal rounds: {appeal_rounds}")
+    timeouts = list(itertools.product(leader_timeouts, validators_timeouts))
+
+    if workers <= 1:
+        results = _search_chunk(corpus, timeouts, appeal_rounds, params)
+    else:
+        ranges = chunk_ranges(len(timeouts), workers * chunks_per_worker)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    _search_chunk,
+                    corpus,
+                    timeouts[start:stop],
+                    appeal_rounds,
+                    params,
+                )
+                for start, stop in ranges
+            ]
+            results = [result for future in futures for result in future.result()]
+
+    return OptimizationReport(
+        n_candidates=len(timeouts) * len(appeal_rounds),
+        results=results,
+        frontier=pareto_frontier(results),
+    )
@@ -0,0 +1,522 @@
+import contextlib
+import io
+import itertools
+from collections import defaultdict
+from math import floor
+from typing import Callable, Dict, List, Literal, Optional, Tuple, Union
+
+from pydantic import BaseModel, ConfigDict
+
+from fee_simulator.models import (
+    Round,
+    TransactionBudget,
+    TransactionRoundResults,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.types import RoundLabel
+from fee_simulator.ledger import label_class
+from fee_simulator.core.idleness import compute_idle_slashes
+from fee_simulator.core.deterministic_violation import compute_deterministic_slashes
+from fee_simulator.core.bond_computing import compute_appeal_bond
+from fee_simulator.core.majority import compute_majority
+from fee_simulator.core.round_labeling import label_rounds
+from fee_simulator.core.refunds import NOT_SENDER_FUNDED
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.core.scenario_cache import PayoutTemplateCache
+from fee_simulator.core.summary import TransactionOutcome
+from fee_simulator.core.round_fee_distribution.distribute_round import (
+    get_round_kernel,
+)
+from fee_simulator.analysis.explorer import (
+    SIMPLEST,
+    RoundPattern,
+    ScenarioBuilder,
+    round_patterns,
+)
+
+CoalitionKind = Literal["VALIDATORS", "LEADER_APPEALANT", "SENDER_VALIDATORS"]
+
+# Per-address amounts of candidate members
+Earnings = Dict[str, int]
+
+# What label_rounds reads of a round: leader outcome and majority
+LabelKey = Tuple[str, str]
+
+
+def _add(a: Earnings, b: Earnings) -> Earnings:
+    total = dict(a)
+    for address, amount in b.items():
+        total[address] = total.get(address, 0) + amount
+    return total
+
+
+def _pointwise_max(a: Earnings, b: Earnings) -> Earnings:
+    # Addresses missing from either side have zero there
+    return {
+        address: max(a.get(address, 0), b.get(address, 0))
+        for address in a.keys() | b.keys()
+    }
+
+
+class CoalitionPlan(BaseModel):
+    """
+    The outcome pattern and members giving a coalition its largest net
+    extraction (earnings minus costs and slashed stake), ready to replay.
+    """
+
+    model_config = ConfigDict(frozen=True)
+    kind: CoalitionKind
+    extraction: int
+    members: Tuple[str, ...]
+    pattern: Tuple[RoundPattern, ...]
+    labels: Tuple[RoundLabel, ...]
+    transaction_results: TransactionRoundResults
+    transaction_budget: TransactionBudget
+
+
+class CoalitionSearchReport(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    kind: CoalitionKind
+    max_appeals: int
+    best: Optional[CoalitionPlan]
+    n_nodes: int
+    n_evaluated: int
+    n_pruned: int
+
+
+class _CoalitionSearch:
+    # Depth-first branch-and-bound, one round's outcome class per level
+
+    def __init__(
+        self,
+        kind: CoalitionKind,
+        builder: ScenarioBuilder,
+        max_appeals: int,
+        max_validators: int,
+        round_choices: Callable[[int], List[RoundPattern]],
+        params: ProtocolParams,
+    ):
+        self.kind = kind
+        self.builder = builder
+        self.n_rounds = 2 * max_appeals + 1
+        self.max_validators = max_validators
+        self.choices = [round_choices(i) for i in range(self.n_rounds)]
+        self.params = params
+        self.addresses = builder.addresses()
+        self.budget = builder.build((SIMPLEST,) * self.n_rounds)[1]
+        self.template_cache = PayoutTemplateCache()
+
+        if kind == "LEADER_APPEALANT":
+            self.leaders = builder.pool[: max_appeals + 1]
+            self.pool = set(self.leaders) | set(builder.appealants)
+            self.cap = None
+        else:
+            self.pool = set(builder.pool) | set(builder.reserves)
+            self.cap = max_validators
+
+        # An address is slashed at most twice a round, each time by at most
+        # the largest rate of its stake, so its stake never drops below this
+        max_rate = max(
+            params.idle_slash_rate,
+            params.validator_slash_rate,
+            params.leader_slash_rate,
+        )
+        self.stake_floor = floor(
+            params.default_stake * (1 - max_rate) ** (2 * self.n_rounds)
+        )
+
+        # Sub-results shared by every branch
+        self._results: Dict[Tuple, TransactionRoundResults] = {}
+        self._labels: Dict[Tuple[LabelKey, ...], Tuple[RoundLabel, ...]] = {}
+        self._label_earnings: Dict[Tuple, Optional[Earnings]] = {}
+        self._open_earnings: Dict[Tuple, Optional[Earnings]] = {}
+        self._losses: Dict[Tuple[int, RoundPattern], Earnings] = {}
+
+        # Outcome classes of each round grouped by the label key they share
+        self.keyed: List[Dict[LabelKey, List[RoundPattern]]] = []
+        for i, patterns in enumerate(self.choices):
+            keyed: Dict[LabelKey, List[RoundPattern]] = defaultdict(list)
+            for pattern in patterns:
+                keyed[self.label_key(i, pattern)].append(pattern)
+            self.keyed.append(dict(keyed))
+
+        self.best: Optional[CoalitionPlan] = None
+        self.n_nodes = 0
+        self.n_evaluated = 0
+        self.n_pruned = 0
+
+    def bound(self, earnings: Earnings) -> int:
+        # Most that allowed members can take together; the sender of a
+        # sender coalition is always in it
+        sender = self.builder.sender
+        gains = sorted(
+            (
+                amount
+                for address, amount in earnings.items()
+                if amount > 0 and address != sender
+            ),
+            reverse=True,
+        )
+        if self.cap is not None:
+            gains = gains[: self.cap]
+        if self.kind == "SENDER_VALIDATORS":
+            return sum(gains) + earnings.get(sender, 0)
+        return sum(gains)
+
+    def appeal_bond(self, appeal_round_index: int) -> int:
+        return compute_appeal_bond(
+            appeal_round_index - 1,
+            self.budget.leaderTimeout,
+            self.budget.validatorsTimeout,
+            self.params,
+        )
+
+    def _rounds(
+        self, round_index: int, previous: Optional[RoundPattern], pattern: RoundPattern
+    ) -> TransactionRoundResults:
+        # The round and the one before it as given, earlier rounds the simplest
+        builder = self.builder
+        rounds = [
+            Round(rotations=[builder.rotation(i, SIMPLEST)]) for i in range(round_index)
+        ]
+        if round_index > 0 and previous is not None:
+            rounds[-1] = Round(rotations=[builder.rotation(round_index - 1, previous)])
+        rounds.append(Round(rotations=[builder.rotation(round_index, pattern)]))
+        return TransactionRoundResults(rounds=rounds)
+
+    def _replaced(
+        self, round_index: int, previous: Optional[RoundPattern], pattern: RoundPattern
+    ) -> TransactionRoundResults:
+        key = (round_index, previous, pattern)
+        results = self._results.get(key)
+        if results is None:
+            results, _ = compute_idle_slashes(
+                self._rounds(round_index, previous, pattern),
+                lambda address: self.params.default_stake,
+                self.params,
+            )
+            self._results[key] = results
+        return results
+
+    def label_key(self, round_index: int, pattern: RoundPattern) -> LabelKey:
+        # label_rounds only reads whether each leader timed out and each
+        # round's majority after idle replacement
+        votes = self._replaced(round_index, None, pattern).rounds[-1].rotations[-1]
+        return pattern.leader, compute_majority(votes.votes)
+
+    def labels(self, keys: Tuple[LabelKey, ...]) -> Tuple[RoundLabel, ...]:
+        labels = self._labels.get(keys)
+        if labels is None:
+            pattern = tuple(self.keyed[i][key][0] for i, key in enumerate(keys))
+            transaction_results, _ = self.builder.build(pattern)
+            replaced, _ = compute_idle_slashes(
+                transaction_results,
+                lambda address: self.params.default_stake,
+                self.params,
+            )
+            labels = tuple(label_rounds(replaced))
+            self._labels[keys] = labels
+        return labels
+
+    def label_earnings(
+        self,
+        round_index: int,
+        label: RoundLabel,
+        previous: Optional[RoundPattern],
+        pattern: RoundPattern,
+    ) -> Optional[Earnings]:
+        """
+        What each member earns in a round with this outcome class and label;
+        None if no transaction gives the round this label.
+
+        The sender funds the payouts of rounds its refund counts, so for a
+        sender coalition its validators' earnings there only move amounts
+        inside it and count for nothing, while the sender gains what an
+        appealant it pays back receives short of the bond.
+        """
+        kernel = get_round_kernel(label)
+        if kernel.spec.votes != "ROUND_AND_PREVIOUS":
+            previous = None
+        key = (round_index, label, previous, pattern)
+        if key in self._label_earnings:
+            return self._label_earnings[key]
+        try:
+            payouts = kernel.payouts(
+                self._replaced(round_index, previous, pattern),
+                round_index,
+                self.budget,
+                params=self.params,
+            )
+        except ValueError:
+            earnings = None
+        else:
+            earnings = defaultdict(int)
+            with_sender = self.kind == "SENDER_VALIDATORS"
+            sender_funded = not NOT_SENDER_FUNDED & label_class(label)
+            for address, role, amount in zip(
+                payouts.address.tolist(), payouts.role.tolist(), payouts.earned
+            ):
+                amount = int(amount)
+                if with_sender and role == "APPEALANT":
+                    if amount > 0:
+                        earnings[self.builder.sender] += (
+                            self.appeal_bond(round_index) - amount
+                        )
+                elif with_sender and sender_funded:
+                    continue
+                elif with_sender and role == "SENDER":
+                    earnings[self.builder.sender] += amount
+                elif address in self.pool:
+                    earnings[address] += amount
+            earnings = dict(earnings)
+        self._label_earnings[key] = earnings
+        return earnings
+
+    def open_earnings(
+        self,
+        round_index: int,
+        label: RoundLabel,
+        key: LabelKey,
+        previous: Union[RoundPattern, LabelKey],
+    ) -> Optional[Earnings]:
+        # Upper bound over the outcome classes of an open round with this
+        # label key, after a chosen round or any round with a given key
+        if get_round_kernel(label).spec.votes != "ROUND_AND_PREVIOUS":
+            previous = None
+        cache_key = (round_index, label, key, previous)
+        if cache_key in self._open_earnings:
+            return self._open_earnings[cache_key]
+        if isinstance(previous, RoundPattern) or previous is None:
+            previous_choices = [previous]
+        else:
+            previous_choices = self.keyed[round_index - 1][previous]
+        earnings = None
+        for pattern in self.keyed[round_index][key]:
+            for previous_pattern in previous_choices:
+                earned = self.label_earnings(
+                    round_index, label, previous_pattern, pattern
+                )
+                if earned is not None:
+                    earnings = (
+                        earned if earnings is None else _pointwise_max(earnings, earned)
+                    )
+        self._open_earnings[cache_key] = earnings
+        return earnings
+
+    def losses(self, round_index: int, pattern: RoundPattern) -> Earnings:
+        # Least each member loses in a round: slashes at the floor stake
+        # and, in appeal rounds, the appealant's bond
+        cache_key = (round_index, pattern)
+        losses = self._losses.get(cache_key)
+        if losses is not None:
+            return losses
+        stake = self.stake_floor
+        losses = defaultdict(int)
+        replaced, idle_slashes = compute_idle_slashes(
+            self._rounds(round_index, None, pattern), lambda address: stake, self.params
+        )
+        deterministic_slashes = compute_deterministic_slashes(
+            replaced, lambda address: stake, self.params
+        )
+        for address, slashed in idle_slashes + deterministic_slashes:
+            if address in self.pool:
+                losses[address] += slashed
+        if round_index % 2 == 1:
+            appealant = self.budget.appeals[round_index // 2].appealantAddress
+            if appealant in self.pool:
+                losses[appealant] += self.appeal_bond(round_index)
+        losses = dict(losses)
+        self._losses[cache_key] = losses
+        return losses
+
+    def _select(self, outcome: TransactionOutcome, n_appeals: int):
+        # Net is additive over members, so the best coalition takes the
+        # required members and every other candidate that gains
+        net = outcome.net - outcome.slashed
+        by_address = {
+            address: int(net[i])
+            for address, i in outcome.index.items()
+            if address in self.pool
+        }
+        if self.kind == "LEADER_APPEALANT":
+            appealants = self.builder.appealants[:n_appeals]
+            if not appealants:
+                return None
+            leaders = [a for a in self.leaders if a in by_address]
+            required = [
+                max(leaders, key=lambda a: by_address[a]),
+                max(appealants, key=lambda a: by_address.get(a, 0)),
+            ]
+            optional = [a for a in by_address if a not in required]
+        elif self.kind == "SENDER_VALIDATORS":
+            required = [outcome.sender_address]
+            optional = list(by_address)
+        else:
+            ranked = sorted(by_address, key=lambda a: by_address[a], reverse=True)
+            required, optional = ranked[:1], ranked[1:]
+        optional = sorted(optional, key=lambda a: by_address[a], reverse=True)
+        gaining = [a for a in optional if by_address[a] > 0]
+        if self.cap is not None:
+            gaining = gaining[: self.cap - (self.kind == "VALIDATORS")]
+        members = required + gaining
+        totals = {a: int(net[outcome.index[a]]) for a in members if a in outcome.index}
+        return tuple(members), sum(totals.values())
+
+    def evaluate(self, pattern: Tuple[RoundPattern, ...]) -> None:
+        self.n_evaluated += 1
+        transaction_results, budget = self.builder.build(pattern)
+        try:
+            # Refund errors dump the fee table before raising
+            with contextlib.redirect_stdout(io.StringIO()):
+                outcome = process_transaction(
+                    self.addresses,
+                    transaction_results,
+                    budget,
+                    mode="summary",
+                    template_cache=self.template_cache,
+                    params=self.params,
+                )
+        except ValueError:
+            return
+        selected = self._select(outcome, len(pattern) // 2)
+        if selected is None:
+            return
+        members, extraction = selected
+        if self.best is None or extraction > self.best.extraction:
+            self.best = CoalitionPlan(
+                kind=self.kind,
+                extraction=extraction,
+                members=members,
+                pattern=pattern,
+                labels=tuple(outcome.labels),
+                transaction_results=transaction_results,
+                transaction_budget=budget,
+            )
+
+    def prefix_bounds(self, prefix: Tuple[RoundPattern, ...]) -> Tuple[int, int]:
+        """
+        Bounds on the extraction of every transaction starting with prefix,
+        and of prefix alone when it is a whole transaction.
+
+        Labels are a function of the label keys, so every completion of the
+        prefix by label keys is labeled exactly: chosen rounds earn what
+        their label pays them, open rounds the most their label pays any
+        outcome class with that key. Members lose at least the slashes and
+        bonds of the chosen rounds.
+        """
+        n_chosen = len(prefix)
+        keys = tuple(self.label_key(i, pattern) for i, pattern in enumerate(prefix))
+        losses: Earnings = {}
+        for i, pattern in enumerate(prefix):
+            losses = _add(losses, self.losses(i, pattern))
+        losses = {address: -amount for address, amount in losses.items()}
+
+        bound = end_bound = None
+        for length in range(n_chosen + 1 - n_chosen % 2, self.n_rounds + 1, 2):
+            for completion in itertools.product(
+                *(self.keyed[i] for i in range(n_chosen, length))
+            ):
+                labels = self.labels(keys + completion)
+                totals = losses
+                for i, label in enumerate(labels[:length]):
+                    if i < n_chosen:
+                        previous = prefix[i - 1] if i else None
+                        earned = self.label_earnings(i, label, previous, prefix[i])
+                    else:
+                        previous = (
+                            prefix[i - 1]
+                            if i == n_chosen
+                            else completion[i - 1 - n_chosen]
+                        )
+                        earned = self.open_earnings(
+                            i, label, completion[i - n_chosen], previous
+                        )
+                    if earned is None:
+                        break
+                    totals = _add(totals, earned)
+                else:
+                    value = self.bound(totals)
+                    bound = value if bound is None else max(bound, value)
+                    if length == n_chosen:
+                        end_bound = value
+        return bound, end_bound
+
+    def search(
+        self, prefix: Tuple[RoundPattern, ...], end_bound: Optional[int]
+    ) -> None:
+        self.n_nodes += 1
+        if end_bound is not None and (
+            self.best is None or end_bound > self.best.extraction
+        ):
+            self.evaluate(prefix)
+        if len(prefix) == self.n_rounds:
+            return
+        children = []
+        for pattern in self.choices[len(prefix)]:
+            child = prefix + (pattern,)
+            bound, child_end_bound = self.prefix_bounds(child)
+            if bound is None:
+                # No completion of the child can be processed
+                self.n_pruned += 1
+                continue
+            children.append((bound, child_end_bound, child))
+        # Most promising first, so that good coalitions prune early
+        children.sort(key=lambda child: child[0], reverse=True)
+        for bound, child_end_bound, child in children:
+            if self.best is not None and bound <= self.best.extraction:
+                self.n_pruned += 1
+                continue
+            self.search(child, child_end_bound)
+
+
+def search_coalitions(
+    kind: CoalitionKind,
+    max_appeals: int = 1,
+    max_validators: int = 3,
+    leader_timeout: int = 100,
+    validators_timeout: int = 200,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    round_choices: Callable[[int], List[RoundPattern]] = round_patterns,
+) -> CoalitionSearchReport:
+    """
+    Find the outcome pattern and coalition with the largest net extraction.
+
+    Votes are searched as per-round outcome classes rather than one by one,
+    and a branch is cut once its bound cannot beat the best coalition so far.
+    Round labels depend only on each round's leader outcome and majority, so
+    a bound labels every completion of the branch exactly and charges the
+    slashes and bonds of its chosen rounds. Per-label round earnings are
+    computed once per outcome class and shared across branches.
+
+    Args:
+        kind: VALIDATORS (colluding validators), LEADER_APPEALANT (a leader
+            with an appealant) or SENDER_VALIDATORS (the sender with validators)
+        max_appeals: Deepest appeal chain to search
+        max_validators: Most validators a coalition may hold
+        leader_timeout: Budget leader timeout
+        validators_timeout: Budget validators timeout
+        params: Protocol parameters; round_sizes set the committee sizes
+        round_choices: Outcome classes to search for each round index
+
+    Returns:
+        The best coalition plan (None if no pattern admits the coalition)
+        and search counters
+    """
+    if max_validators < 1:
+        raise ValueError("A coalition needs at least one validator")
+    if not 0 <= 2 * max_appeals < len(params.round_sizes):
+        raise ValueError(f"Invalid appeal depth: {max_appeals}")
+    builder = ScenarioBuilder(max_appeals, params, leader_timeout, validators_timeout)
+    search = _CoalitionSearch(
+        kind, builder, max_appeals, max_validators, round_choices, params
+    )
+    search.search((), None)
+    return CoalitionSearchReport(
+        kind=kind,
+        max_appeals=max_appeals,
+        best=search.best,
+        n_nodes=search.n_nodes,
+        n_evaluated=search.n_evaluated,
+        n_pruned=search.n_pruned,
+    )
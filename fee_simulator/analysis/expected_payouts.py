@@ -0,0 +1,146 @@
+from collections import defaultdict
+from typing import Dict
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+from fee_simulator.models import (
+    TransactionBudget,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.types import MajorityOutcome, RoundLabel, Role
+from fee_simulator.constants import VOTE_CODES
+from fee_simulator.core.majority import MAJORITY_CODES
+from fee_simulator.core.round_fee_distribution.distribute_round import (
+    get_round_kernel,
+)
+
+# Columns of a vote probability matrix; the rest of each row is the
+# probability of a vote that never forms a majority (idle or NA)
+MAJORITY_VOTES = tuple(MAJORITY_CODES)
+
+# Stands in for the voters outside the majority when planning a round
+_FILLER_CODE = VOTE_CODES["IDLE"]
+
+
+def vote_count_distributions(vote_probabilities: np.ndarray) -> np.ndarray:
+    """
+    Exact distributions of the number of AGREE, DISAGREE and TIMEOUT votes
+    of independent voters: one Poisson-binomial per vote type, by dynamic
+    programming over the voters.
+
+    Args:
+        vote_probabilities: (n_voters, 3) probabilities of each voter casting
+            each vote type, in MAJORITY_VOTES order; rows sum to at most 1
+
+    Returns:
+        (3, n_voters + 1) array; entry [t, k] is the probability of exactly
+        k votes of type t
+    """
+    probabilities = np.asarray(vote_probabilities, dtype=np.float64)
+    if probabilities.ndim != 2 or probabilities.shape[1] != len(MAJORITY_VOTES):
+        raise ValueError("Vote probabilities must have one column per vote type")
+    if (probabilities < 0).any() or (probabilities.sum(axis=1) > 1 + 1e-12).any():
+        raise ValueError("Vote probabilities must be non-negative and sum to <= 1")
+    n_voters = len(probabilities)
+    pmf = np.zeros((len(MAJORITY_VOTES), n_voters + 1))
+    pmf[:, 0] = 1.0
+    for i, p in enumerate(probabilities):
+        # Voter i either adds a vote of the type or does not
+        pmf[:, 1 : i + 2] = pmf[:, 1 : i + 2] * (1 - p)[:, None] + (
+            pmf[:, : i + 1] * p[:, None]
+        )
+        pmf[:, 0] *= 1 - p
+    return pmf
+
+
+def majority_probabilities(pmf: np.ndarray) -> Dict[MajorityOutcome, float]:
+    """
+    Probability of each majority outcome. A vote type is the majority once
+    it reaches n_voters // 2 + 1 votes, which at most one type can.
+    """
+    threshold = (pmf.shape[1] - 1) // 2 + 1
+    outcomes = {
+        outcome: float(pmf[t, threshold:].sum())
+        for t, outcome in enumerate(MAJORITY_VOTES)
+    }
+    outcomes["UNDETERMINED"] = max(1.0 - sum(outcomes.values()), 0.0)
+    return outcomes
+
+
+class ExpectedPayouts(BaseModel):
+    """
+    Exact expected amounts of one round, summed per recipient role.
+    """
+
+    model_config = ConfigDict(frozen=True)
+    label: RoundLabel
+    n_voters: int
+    majority: Dict[MajorityOutcome, float]
+    earned: Dict[Role, float]
+    burned: Dict[Role, float]
+
+
+def expected_round_payouts(
+    label: RoundLabel,
+    vote_probabilities: np.ndarray,
+    budget: TransactionBudget,
+    round_index: int = 0,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> ExpectedPayouts:
+    """
+    Expected payouts of a round with a given label when every voter votes
+    independently with the given probabilities.
+
+    Which rules of the label fire, for whom and for how much depends only on
+    the majority outcome and its number of votes, so the round's kernel is
+    planned once per outcome and majority size and weighted by its exact
+    probability. Leader rows count the first voter as the leader.
+
+    Args:
+        label: Round label whose rules apply
+        vote_probabilities: (n_voters, 3) AGREE, DISAGREE and TIMEOUT
+            probabilities per voter, leader first; for labels counting the
+            previous round's votes too, the voters of both rounds
+        budget: Transaction budget the amounts derive from
+        round_index: Index of the round in the transaction
+        params: Protocol parameters to plan under
+
+    Returns:
+        Majority outcome probabilities and expected earned and burned
+        amounts per role
+    """
+    pmf = vote_count_distributions(vote_probabilities)
+    n_voters = pmf.shape[1] - 1
+    majority = majority_probabilities(pmf)
+    kernel = get_round_kernel(label)
+    threshold = n_voters // 2 + 1
+
+    # (probability, votes for the majority type, code of the type)
+    cases = [(majority["UNDETERMINED"], 0, _FILLER_CODE)]
+    for t, outcome in enumerate(MAJORITY_VOTES):
+        code = MAJORITY_CODES[outcome]
+        for k in np.flatnonzero(pmf[t, threshold:]).tolist():
+            cases.append((pmf[t, threshold + k], threshold + k, code))
+
+    earned: Dict[Role, float] = defaultdict(float)
+    burned: Dict[Role, float] = defaultdict(float)
+    codes = np.full(n_voters, _FILLER_CODE, dtype=np.int8)
+    for probability, n_majority, code in cases:
+        if probability == 0:
+            continue
+        codes[:n_majority] = code
+        codes[n_majority:] = _FILLER_CODE
+        plan = kernel.plan(codes, round_index, budget, params=params)
+        for rule, amount, size in plan.entries:
+            totals = earned if rule.field == "earned" else burned
+            totals[rule.role] += probability * amount * size
+
+    return ExpectedPayouts(
+        label=label,
+        n_voters=n_voters,
+        majority=majority,
+        earned=dict(earned),
+        burned=dict(burned),
+    )
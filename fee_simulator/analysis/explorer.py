@@ -0,0 +1,389 @@
+import contextlib
+import io
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Hashable, Iterator, List, Literal, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+from fee_simulator.models import (
+    Appeal,
+    Round,
+    Rotation,
+    TransactionBudget,
+    TransactionRoundResults,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.types import Vote
+from fee_simulator.utils import generate_eth_addresses
+from fee_simulator.invariants import InvariantViolation, check_invariants
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.core.idleness import compute_idle_slash_rates
+from fee_simulator.core.scenario_cache import scenario_signature
+from fee_simulator.rng import chunk_ranges
+
+LeaderOutcome = Literal["RECEIPT", "TIMEOUT"]
+MajorityClass = Literal["AGREE", "DISAGREE", "TIMEOUT", "UNDETERMINED"]
+IdleOutcome = Literal["NONE", "REPLACED", "UNREPLACED"]
+HashMinority = Literal["NONE", "VALIDATOR", "LEADER"]
+
+MAJORITY_CLASSES: Tuple[MajorityClass, ...] = (
+    "AGREE",
+    "DISAGREE",
+    "TIMEOUT",
+    "UNDETERMINED",
+)
+IDLE_OUTCOMES: Tuple[IdleOutcome, ...] = ("NONE", "REPLACED", "UNREPLACED")
+
+MAJORITY_HASH = "0x" + "a" * 64
+MINORITY_HASH = "0x" + "b" * 64
+
+# Addresses are fixed so that a pattern always builds the same scenario
+EXPLORER_SEED = 0
+
+
+class RoundPattern(BaseModel):
+    """
+    Outcome class of one round. Appeal rounds have no leader.
+    """
+
+    model_config = ConfigDict(frozen=True)
+    leader: LeaderOutcome = "RECEIPT"
+    majority: MajorityClass = "AGREE"
+    idle: IdleOutcome = "NONE"
+    hash_minority: HashMinority = "NONE"
+
+
+# Simplest values first; shrinking moves a field towards the front
+SIMPLEST = RoundPattern()
+
+
+def round_patterns(round_index: int) -> List[RoundPattern]:
+    """
+    Every outcome class of a round, without classes that cannot be told
+    apart: a timed out leader leaves no majority and no hashes.
+    """
+    patterns = []
+    if round_index % 2 == 0:
+        for idle in IDLE_OUTCOMES:
+            patterns.append(
+                RoundPattern(leader="TIMEOUT", majority="UNDETERMINED", idle=idle)
+            )
+    hash_minorities = (
+        ("NONE", "VALIDATOR", "LEADER")
+        if round_index % 2 == 0
+        else ("NONE", "VALIDATOR")
+    )
+    for majority, idle, hash_minority in itertools.product(
+        MAJORITY_CLASSES, IDLE_OUTCOMES, hash_minorities
+    ):
+        patterns.append(
+            RoundPattern(majority=majority, idle=idle, hash_minority=hash_minority)
+        )
+    return patterns
+
+
+def enumerate_patterns(
+    max_appeals: int, params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS
+) -> Iterator[Tuple[RoundPattern, ...]]:
+    """
+    Every transaction pattern with up to max_appeals appeals, each appeal
+    followed by the next normal round.
+    """
+    if not 0 <= 2 * max_appeals < len(params.round_sizes):
+        raise ValueError(f"Invalid appeal depth: {max_appeals}")
+    for appeals in range(max_appeals + 1):
+        yield from itertools.product(
+            *(round_patterns(i) for i in range(2 * appeals + 1))
+        )
+
+
+class ScenarioBuilder:
+    """
+    Builds a representative transaction for a pattern.
+
+    Normal round 2k is led by the k-th address of a shared pool and keeps the
+    validators of earlier rounds; appeal rounds bring new validators.
+    Committee sizes come from params, timeouts from the arguments.
+    """
+
+    def __init__(
+        self,
+        max_appeals: int,
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+        leader_timeout: int = 100,
+        validators_timeout: int = 200,
+    ):
+        self.round_sizes = params.round_sizes
+        self.leader_timeout = leader_timeout
+        self.validators_timeout = validators_timeout
+        n_rounds = 2 * max_appeals + 1
+        pool_size = self.round_sizes[n_rounds - 1] + n_rounds
+        rng = np.random.default_rng(EXPLORER_SEED)
+        self.pool = generate_eth_addresses(pool_size, rng)
+        self.reserves = generate_eth_addresses(n_rounds, rng)
+        self.appealants = generate_eth_addresses(max_appeals, rng)
+        self.sender = generate_eth_addresses(1, rng)[0]
+
+    def members(self, round_index: int) -> List[str]:
+        size = self.round_sizes[round_index]
+        if round_index % 2 == 0:
+            first = round_index // 2
+        else:
+            first = (round_index - 1) // 2 + self.round_sizes[round_index - 1]
+        return self.pool[first : first + size]
+
+    def rotation(self, round_index: int, pattern: RoundPattern) -> Rotation:
+        members = self.members(round_index)
+        is_normal = round_index % 2 == 0
+        n = len(members)
+        if pattern.leader == "TIMEOUT":
+            plain = ["NA"] * n
+        elif pattern.majority == "UNDETERMINED":
+            plain = [MAJORITY_CLASSES[i % 3] for i in range(n)]
+        else:
+            # One dissenting voter so that minority payouts are exercised
+            other = "DISAGREE" if pattern.majority == "AGREE" else "AGREE"
+            plain = [pattern.majority] * (n - 1) + [other]
+            plain[1], plain[-1] = plain[-1], plain[1]
+
+        hashes: List[Optional[str]] = [None] * n
+        if pattern.leader == "RECEIPT":
+            hashes = [MAJORITY_HASH] * n
+            if pattern.hash_minority == "LEADER":
+                hashes[0] = MINORITY_HASH
+            elif pattern.hash_minority == "VALIDATOR":
+                hashes[2] = MINORITY_HASH
+
+        votes = {}
+        for i, (address, vote) in enumerate(zip(members, plain)):
+            if pattern.idle != "NONE" and i == n - 1:
+                votes[address] = "IDLE"
+                continue
+            value: Vote = vote if hashes[i] is None else [vote, hashes[i]]
+            if is_normal and i == 0:
+                if pattern.leader == "TIMEOUT":
+                    value = ["LEADER_TIMEOUT", "NA"]
+                else:
+                    value = ["LEADER_RECEIPT", vote, hashes[i]]
+            votes[address] = value
+
+        reserve_votes = {}
+        if pattern.idle == "REPLACED":
+            reserve = self.reserves[round_index]
+            reserve_votes[reserve] = (
+                plain[-1] if hashes[-1] is None else [plain[-1], hashes[-1]]
+            )
+        return Rotation(votes=votes, reserve_votes=reserve_votes)
+
+    def build(
+        self, pattern: Sequence[RoundPattern]
+    ) -> Tuple[TransactionRoundResults, TransactionBudget]:
+        appeals = len(pattern) // 2
+        transaction_results = TransactionRoundResults(
+            rounds=[
+                Round(rotations=[self.rotation(i, round_pattern)])
+                for i, round_pattern in enumerate(pattern)
+            ]
+        )
+        budget = TransactionBudget(
+            leaderTimeout=self.leader_timeout,
+            validatorsTimeout=self.validators_timeout,
+            appealRounds=appeals,
+            rotations=[0] * (appeals + 1),
+            senderAddress=self.sender,
+            appeals=[
+                Appeal(appealantAddress=address)
+                for address in self.appealants[:appeals]
+            ],
+        )
+        return transaction_results, budget
+
+    def addresses(self) -> List[str]:
+        return self.pool + self.reserves + self.appealants + [self.sender]
+
+
+def pattern_key(builder: ScenarioBuilder, pattern: Sequence[RoundPattern]) -> Hashable:
+    """
+    Patterns with the same key give the same labels, payouts and slashing.
+    The signature is taken after idle replacement, which tells replaced
+    idle validators from unreplaced ones.
+    """
+    transaction_results, budget = builder.build(pattern)
+    replaced_results, _ = compute_idle_slash_rates(transaction_results)
+    slashing = tuple((p.idle != "NONE", p.hash_minority) for p in pattern)
+    return scenario_signature(replaced_results, budget), slashing
+
+
+class Violation(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    pattern: Tuple[RoundPattern, ...]
+    invariant: str
+    message: str
+
+
+def check_pattern(
+    builder: ScenarioBuilder, pattern: Sequence[RoundPattern]
+) -> Optional[Violation]:
+    transaction_results, budget = builder.build(pattern)
+    try:
+        # Refund errors dump the fee table before raising; keep reports readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            fee_events, _ = process_transaction(
+                builder.addresses(), transaction_results, budget
+            )
+        check_invariants(fee_events, budget, transaction_results)
+    except InvariantViolation as violation:
+        return Violation(
+            pattern=tuple(pattern),
+            invariant=violation.invariant,
+            message=violation.message,
+        )
+    except Exception as error:
+        return Violation(
+            pattern=tuple(pattern),
+            invariant="processing",
+            message=f"{type(error).__name__}: {error}",
+        )
+    return None
+
+
+def _check_chunk(
+    max_appeals: int, patterns: List[Tuple[RoundPattern, ...]]
+) -> List[Violation]:
+    builder = ScenarioBuilder(max_appeals)
+    return [
+        violation
+        for violation in (check_pattern(builder, pattern) for pattern in patterns)
+        if violation is not None
+    ]
+
+
+def shrink(builder: ScenarioBuilder, violation: Violation) -> Violation:
+    """
+    Greedily simplify a violating pattern while it still breaks the same
+    invariant: drop trailing appeals, then reset round fields to their
+    simplest values.
+    """
+    current = violation
+    changed = True
+    while changed:
+        changed = False
+        pattern = current.pattern
+        candidates = []
+        if len(pattern) > 1:
+            candidates.append(pattern[:-2])
+        for i, round_pattern in enumerate(pattern):
+            for field in ("idle", "hash_minority", "leader", "majority"):
+                simplest = getattr(SIMPLEST, field)
+                if getattr(round_pattern, field) == simplest:
+                    continue
+                if round_pattern.leader == "TIMEOUT" and field == "majority":
+                    continue
+                candidates.append(
+                    pattern[:i]
+                    + (round_pattern.model_copy(update={field: simplest}),)
+                    + pattern[i + 1 :]
+                )
+        for candidate in candidates:
+            result = check_pattern(builder, candidate)
+            if result is not None and result.invariant == current.invariant:
+                current = result
+                changed = True
+                break
+    return current
+
+
+class Reproducer(BaseModel):
+    """
+    A minimal scenario breaking an invariant, ready to paste into a test.
+    """
+
+    model_config = ConfigDict(frozen=True)
+    invariant: str
+    message: str
+    pattern: Tuple[RoundPattern, ...]
+    transaction_results: TransactionRoundResults
+    transaction_budget: TransactionBudget
+
+
+class ExplorationReport(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    max_appeals: int
+    n_patterns: int
+    n_checked: int
+    violations: List[Violation]
+    reproducers: List[Reproducer]
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+
+def explore_outcome_space(
+    max_appeals: int = 1,
+    workers: int = 1,
+    chunks_per_worker: int = 4,
+) -> ExplorationReport:
+    """
+    Check the invariants on every reachable outcome pattern.
+
+    Patterns are deduplicated by signature, checked in chunks across a
+    process pool, and every invariant that fails gets one minimal
+    reproducer.
+
+    Args:
+        max_appeals: Deepest appeal chain to enumerate
+        workers: Number of processes; 1 checks in this process
+        chunks_per_worker: Chunks submitted per process, to balance load
+
+    Returns:
+        The exploration report
+    """
+    builder = ScenarioBuilder(max_appeals)
+    representatives = {}
+    n_patterns = 0
+    for pattern in enumerate_patterns(max_appeals):
+        n_patterns += 1
+        representatives.setdefault(pattern_key(builder, pattern), pattern)
+    patterns = list(representatives.values())
+
+    if workers <= 1:
+        violations = _check_chunk(max_appeals, patterns)
+    else:
+        ranges = chunk_ranges(len(patterns), workers * chunks_per_worker)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_check_chunk, max_appeals, patterns[start:stop])
+                for start, stop in ranges
+            ]
+            violations = [v for future in futures for v in future.result()]
+
+    reproducers = []
+    seen_invariants = set()
+    # Shorter patterns first, so shrinking starts close to the minimum
+    for violation in sorted(violations, key=lambda v: len(v.pattern)):
+        if violation.invariant in seen_invariants:
+            continue
+        seen_invariants.add(violation.invariant)
+        minimal = shrink(builder, violation)
+        transaction_results, budget = builder.build(minimal.pattern)
+        reproducers.append(
+            Reproducer(
+                invariant=minimal.invariant,
+                message=minimal.message,
+                pattern=minimal.pattern,
+                transaction_results=transaction_results,
+                transaction_budget=budget,
+            )
+        )
+
+    return ExplorationReport(
+        max_appeals=max_appeals,
+        n_patterns=n_patterns,
+        n_checked=len(patterns),
+        violations=violations,
+        reproducers=reproducers,
+    )
@@ -0,0 +1,367 @@
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+
+from fee_simulator.models import (
+    TransactionBudget,
+    TransactionRoundResults,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.ledger import FeeEventLedger
+from fee_simulator.fee_aggregators.aggregated import (
+    compute_agg_earnings,
+    compute_agg_burnt,
+)
+from fee_simulator.rng import DEFAULT_ROOT_SEED, RandomStreams
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.core.scenario_cache import PayoutTemplateCache
+
+DEFAULT_CHUNK_SIZE = 1000
+# Chunks in flight per worker; bounds memory whatever the input size
+MAX_PENDING_CHUNKS_PER_WORKER = 2
+
+EVENT_COLUMNS = (
+    "sequence_id",
+    "address",
+    "round_index",
+    "round_label",
+    "role",
+    "vote",
+    "hash",
+    "cost",
+    "staked",
+    "earned",
+    "slashed",
+    "burned",
+)
+INT_EVENT_COLUMNS = ("sequence_id", "cost", "staked", "earned", "slashed", "burned")
+SUMMARY_INT_COLUMNS = (
+    "n_events",
+    "sender_cost",
+    "refund",
+    "appeal_bonds",
+    "earned",
+    "burned",
+    "slashed",
+)
+
+
+class Scenario(BaseModel):
+    """
+    One input line: a budget plus round results, and optionally the addresses
+    to stake (by default every address the scenario mentions) and the
+    protocol parameters (by default the ones in constants).
+    """
+
+    model_config = ConfigDict(frozen=True)
+    id: Optional[str] = None
+    transaction_budget: TransactionBudget
+    transaction_results: TransactionRoundResults
+    addresses: Optional[List[str]] = None
+    protocol_params: Optional[ProtocolParams] = None
+
+    def participant_addresses(self) -> List[str]:
+        if self.addresses is not None:
+            return self.addresses
+        addresses = {}
+        for round_obj in self.transaction_results.rounds:
+            for rotation in round_obj.rotations:
+                addresses.update(dict.fromkeys(rotation.votes))
+                addresses.update(dict.fromkeys(rotation.reserve_votes))
+        budget = self.transaction_budget
+        addresses.update(
+            dict.fromkeys(appeal.appealantAddress for appeal in budget.appeals)
+        )
+        addresses[budget.senderAddress] = None
+        return list(addresses)
+
+
+_scenarios_adapter = TypeAdapter(List[Scenario])
+
+# One cache per worker process
+_template_cache = PayoutTemplateCache()
+
+
+def parse_scenarios(
+    lines: List[str],
+) -> List[Tuple[Optional[Scenario], Optional[str]]]:
+    """
+    Validate a chunk of JSONL lines at once, falling back to line by line
+    only to locate errors, or when a line holding several scenarios (say
+    "{...},{...}") makes the chunk parse to another count.
+    """
+    payload = "[" + ",".join(lines) + "]"
+    try:
+        scenarios = _scenarios_adapter.validate_json(payload)
+    except ValidationError:
+        pass
+    else:
+        if len(scenarios) == len(lines):
+            return [(scenario, None) for scenario in scenarios]
+    parsed = []
+    for line in lines:
+        try:
+            parsed.append((Scenario.model_validate_json(line), None))
+        except ValidationError as error:
+            parsed.append((None, str(error).replace("\n", " ")))
+    return parsed
+
+
+def _line_id(line: str) -> Optional[str]:
+    # Best effort id of a line that failed validation
+    try:
+        scenario_id = json.loads(line).get("id")
+    except (ValueError, AttributeError):
+        return None
+    return scenario_id if isinstance(scenario_id, str) else None
+
+
+def summarize(
+    index: int, scenario: Scenario, fee_events: FeeEventLedger, labels: List[str]
+) -> Dict[str, Any]:
+    return {
+        "index": index,
+        "id": scenario.id,
+        "labels": labels,
+        "n_events": len(fee_events),
+        "sender_cost": fee_events.role_bucket("SENDER").cost,
+        "refund": fee_events[-1].earned,  # the refund is the last event
+        "appeal_bonds": fee_events.role_bucket("APPEALANT").cost,
+        "earned": compute_agg_earnings(fee_events),
+        "burned": compute_agg_burnt(fee_events),
+        "slashed": sum(event.slashed for event in fee_events),
+    }
+
+
+def process_chunk(
+    start: int,
+    lines: List[str],
+    root_seed: int = DEFAULT_ROOT_SEED,
+    with_events: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Process the transactions of lines[i], numbered start + i. Each one gets
+    the random stream of its number, so results do not depend on chunking
+    or on the number of workers.
+    """
+    streams = RandomStreams(root_seed)
+    records = []
+    parsed = parse_scenarios(lines)
+    for offset, (line, (scenario, error)) in enumerate(zip(lines, parsed)):
+        index = start + offset
+        if scenario is not None:
+            try:
+                # Refund errors dump the fee table before raising; keep only
+                # the error record
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fee_events, labels = process_transaction(
+                        scenario.participant_addresses(),
+                        scenario.transaction_results,
+                        scenario.transaction_budget,
+                        rng=streams.for_transaction(index),
+                        template_cache=_template_cache,
+                        params=scenario.protocol_params or DEFAULT_PROTOCOL_PARAMS,
+                    )
+            except Exception as processing_error:
+                error = f"{type(processing_error).__name__}: {processing_error}"
+        if error is not None:
+            scenario_id = scenario.id if scenario is not None else _line_id(line)
+            records.append({"index": index, "id": scenario_id, "error": error})
+            continue
+        record = summarize(index, scenario, fee_events, labels)
+        if with_events:
+            record["events"] = [
+                event.model_dump(mode="json", include=set(EVENT_COLUMNS))
+                for event in fee_events
+            ]
+        records.append(record)
+    return records
+
+
+def read_chunks(stream: IO[str], chunk_size: int) -> Iterator[Tuple[int, List[str]]]:
+    lines = (line for line in stream if line.strip())
+    start = 0
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def iter_results(
+    chunks: Iterable[Tuple[int, List[str]]],
+    workers: int,
+    root_seed: int,
+    with_events: bool,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Process chunks in input order, keeping at most a few chunks per worker
+    in flight.
+    """
+    if workers <= 1:
+        for start, lines in chunks:
+            yield process_chunk(start, lines, root_seed, with_events)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for start, lines in chunks:
+            pending.append(
+                executor.submit(process_chunk, start, lines, root_seed, with_events)
+            )
+            if len(pending) >= workers * MAX_PENDING_CHUNKS_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class JsonlWriter:
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self.stream.write(
+            "".join(
+                json.dumps(record, separators=(",", ":")) + "\n" for record in records
+            )
+        )
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else json.dumps(value)
+
+
+class ColumnarWriter:
+    """
+    Writes each chunk as a numbered .npz part of column arrays in a
+    directory: summary columns, plus event columns keyed by transaction
+    index when events are requested.
+    """
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.part = 0
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        columns: Dict[str, np.ndarray] = {
+            "index": np.array([r["index"] for r in records], dtype=np.int64),
+            "id": np.array([r["id"] or "" for r in records], dtype=str),
+            "error": np.array([r.get("error", "") for r in records], dtype=str),
+            "labels": np.array(
+                [",".join(r.get("labels", ())) for r in records], dtype=str
+            ),
+        }
+        for name in SUMMARY_INT_COLUMNS:
+            columns[name] = np.array([r.get(name, 0) for r in records], dtype=np.int64)
+
+        events = [(r["index"], event) for r in records for event in r.get("events", ())]
+        if events:
+            columns["event_index"] = np.array([i for i, _ in events], dtype=np.int64)
+            for name in EVENT_COLUMNS:
+                values = [event[name] for _, event in events]
+                if name in INT_EVENT_COLUMNS:
+                    columns[f"event_{name}"] = np.array(values, dtype=np.int64)
+                elif name == "round_index":
+                    columns[f"event_{name}"] = np.array(
+                        [-1 if v is None else v for v in values], dtype=np.int64
+                    )
+                else:
+                    # Leader votes are lists; store them as their JSON text
+                    columns[f"event_{name}"] = np.array(
+                        [_text(value) for value in values], dtype=str
+                    )
+
+        path = os.path.join(self.directory, f"part-{self.part:05d}.npz")
+        np.savez(path, **columns)
+        self.part += 1
+
+    def close(self) -> None:
+        pass
+
+
+def run(args: argparse.Namespace) -> int:
+    if args.input == "-":
+        source = sys.stdin
+    else:
+        source = open(args.input, encoding="utf-8")
+
+    if args.format == "columnar":
+        if args.output is None:
+            raise SystemExit("--output directory is required for columnar output")
+        writer = ColumnarWriter(args.output)
+        sink = None
+    else:
+        sink = sys.stdout if args.output is None else open(args.output, "w")
+        writer = JsonlWriter(sink)
+
+    n_processed = 0
+    n_errors = 0
+    try:
+        for records in iter_results(
+            read_chunks(source, args.chunk_size), args.workers, args.seed, args.events
+        ):
+            writer.write(records)
+            n_processed += len(records)
+            n_errors += sum(1 for record in records if "error" in record)
+    finally:
+        writer.close()
+        if source is not sys.stdin:
+            source.close()
+        if sink is not None and sink is not sys.stdout:
+            sink.close()
+
+    print(f"Processed {n_processed} transactions ({n_errors} failed)", file=sys.stderr)
+    return 1 if n_errors else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m fee_simulator")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser(
+        "run", help="Process transactions from a JSONL file or stdin"
+    )
+    run_parser.add_argument(
+        "input",
+        nargs="?",
+        default="-",
+        help="JSONL file with one scenario per line, or - for stdin",
+    )
+    run_parser.add_argument(
+        "-o",
+        "--output",
+        help="Output file (jsonl, default stdout) or directory (columnar)",
+    )
+    run_parser.add_argument("--format", choices=("jsonl", "columnar"), default="jsonl")
+    run_parser.add_argument(
+        "--events", action="store_true", help="Include every fee event"
+    )
+    run_parser.add_argument("-w", "--workers", type=int, default=1)
+    run_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    run_parser.add_argument(
+        "--seed", type=int, default=DEFAULT_ROOT_SEED, help="Root seed for stakes"
+    )
+    run_parser.set_defaults(handler=run)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
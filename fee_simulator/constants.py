@@ -25,3 +25,12 @@ PENALTY_REWARD_COEFFICIENT = 1
 
 DEFAULT_HASH = "0xdefault"
 DEFAULT_STAKE = 2000000
+
+# Integer codes for normalized votes, used by compact rotations and round kernels
+VOTE_CODES = {
+    "AGREE": 0,
+    "DISAGREE": 1,
+    "TIMEOUT": 2,
+    "IDLE": 3,
+    "NA": 4,
+}
@@ -1,21 +1,23 @@
-from fee_simulator.constants import ROUND_SIZES
+from fee_simulator.models import DEFAULT_PROTOCOL_PARAMS, ProtocolParams
 
 
 def compute_appeal_bond(
     normal_round_index: int,
     leader_timeout: int,
     validators_timeout: int,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
 ) -> int:
+    round_sizes = params.round_sizes
     if (
         normal_round_index % 2 != 0
         or normal_round_index < 0
-        or normal_round_index >= len(ROUND_SIZES)
+        or normal_round_index >= len(round_sizes)
     ):
         raise ValueError(f"Invalid normal round index: {normal_round_index}")
 
     next_normal_size = (
-        ROUND_SIZES[normal_round_index + 2]
-        if normal_round_index + 2 < len(ROUND_SIZES)
+        round_sizes[normal_round_index + 2]
+        if normal_round_index + 2 < len(round_sizes)
         else 0
     )
 
@@ -1,26 +1,25 @@
-from fee_simulator.models import FeeEvent
+from fee_simulator.models import AnyFeeEvent, ProtocolParams, DEFAULT_PROTOCOL_PARAMS
 from typing import List
 from fee_simulator.core.bond_computing import compute_appeal_bond
+from fee_simulator.ledger import LabelClass, as_ledger, label_class
 
 
 def compute_unsuccessful_leader_appeal_burn(
-    current_round_index: int, appealant_address: str, fee_events: List[FeeEvent]
+    current_round_index: int, appealant_address: str, fee_events: List[AnyFeeEvent]
 ) -> float:
+    ledger = as_ledger(fee_events)
     burn = 0
     cost = 0
-    earned = 0
-    for event in fee_events:
+    for event in ledger.events_in_round(current_round_index):
         if (
-            event.address == appealant_address
-            and "UNSUCCESSFUL" in event.round_label
-            and event.round_index == current_round_index
+            appealant_address in event.addresses
+            and LabelClass.UNSUCCESSFUL & label_class(event.round_label)
         ):
             cost += event.cost
-        if (
-            event.round_index == current_round_index
-            or event.round_index == current_round_index + 1
-        ):
-            earned += event.earned
+    earned = (
+        ledger.round_bucket(current_round_index).earned
+        + ledger.round_bucket(current_round_index + 1).earned
+    )
     burn = cost - earned
     return burn
 
@@ -29,18 +28,17 @@ def compute_unsuccessful_validator_appeal_burn(
     current_round_index: int,
     leader_timeout: int,
     validator_timeout: int,
-    fee_events: List[FeeEvent],
+    fee_events: List[AnyFeeEvent],
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
 ) -> float:
+    ledger = as_ledger(fee_events)
     burn = 0
     cost = compute_appeal_bond(
-        current_round_index - 1, leader_timeout, validator_timeout
+        current_round_index - 1, leader_timeout, validator_timeout, params
     )
     earned = 0
-    for event in fee_events:
-        if (
-            event.round_index == current_round_index
-            and "UNSUCCESSFUL" in event.round_label
-        ):
-            earned += event.earned
+    for event in ledger.events_in_round(current_round_index):
+        if LabelClass.UNSUCCESSFUL & label_class(event.round_label):
+            earned += event.earned * event.size
     burn = cost - earned
     return burn
@@ -0,0 +1,222 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+from fee_simulator.models import AnyFeeEvent, ProtocolParams, DEFAULT_PROTOCOL_PARAMS
+
+# Rebuild the alias table once the live stake falls below this share of the
+# stake it was built with, so that rejection stays cheap.
+MIN_ACCEPTANCE_RATE = 0.5
+
+
+class StakeWeightedSampler:
+    """
+    Draws address indexes with probability proportional to stake.
+
+    Uses Vose's alias table for O(1) draws. The table is built over an upper
+    bound of every stake; draws are accepted with probability
+    stake / bound, so lowering a stake (slashing) is an O(1) update. Raising
+    a stake above its bound, or letting the live stake drop too far below
+    the bound, triggers a rebuild before the next draw.
+    """
+
+    def __init__(self, stakes: Sequence[float]):
+        self._stakes = np.array(stakes, dtype=float)
+        if self._stakes.ndim != 1 or (self._stakes < 0).any():
+            raise ValueError("Stakes must be a flat sequence of non-negative values")
+        self._total = float(self._stakes.sum())
+        self._n_positive = int(np.count_nonzero(self._stakes > 0))
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self._stakes)
+
+    @property
+    def stakes(self) -> np.ndarray:
+        return self._stakes
+
+    def _build(self) -> None:
+        bound = self._stakes.copy()
+        n = len(bound)
+        total = bound.sum()
+        prob = np.ones(n)
+        alias = np.arange(n)
+        if n and total > 0:
+            scaled = (bound * (n / total)).tolist()
+            small = [i for i, p in enumerate(scaled) if p < 1.0]
+            large = [i for i, p in enumerate(scaled) if p >= 1.0]
+            prob_list = [1.0] * n
+            alias_list = list(range(n))
+            while small and large:
+                s = small.pop()
+                l = large[-1]
+                prob_list[s] = scaled[s]
+                alias_list[s] = l
+                scaled[l] -= 1.0 - scaled[s]
+                if scaled[l] < 1.0:
+                    small.append(large.pop())
+            prob = np.array(prob_list)
+            alias = np.array(alias_list)
+        self._bound = bound
+        self._bound_total = float(total)
+        self._prob = prob
+        self._alias = alias
+        self._stale = False
+
+    def update(self, index: int, stake: float) -> None:
+        if stake < 0:
+            raise ValueError(f"Stake cannot be negative: {stake}")
+        self._total += stake - self._stakes[index]
+        self._n_positive += int(stake > 0) - int(self._stakes[index] > 0)
+        self._stakes[index] = stake
+        if stake > self._bound[index]:
+            self._stale = True
+
+    def _ensure_fresh(self) -> None:
+        if self._stale or self._total < MIN_ACCEPTANCE_RATE * self._bound_total:
+            self._build()
+        if self._total <= 0:
+            raise ValueError("Cannot sample from zero total stake")
+
+    def draw(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        """
+        Draw `size` indexes with replacement.
+        """
+        self._ensure_fresh()
+        result = np.empty(size, dtype=np.int64)
+        filled = 0
+        while filled < size:
+            needed = size - filled
+            slots = rng.integers(0, len(self._stakes), size=needed)
+            picked = np.where(
+                rng.random(needed) < self._prob[slots], slots, self._alias[slots]
+            )
+            accepted = picked[
+                rng.random(needed) * self._bound[picked] < self._stakes[picked]
+            ]
+            result[filled : filled + len(accepted)] = accepted
+            filled += len(accepted)
+        return result
+
+    def sample_without_replacement(
+        self,
+        rng: np.random.Generator,
+        size: int,
+        exclude: Iterable[int] = (),
+    ) -> np.ndarray:
+        """
+        Draw `size` distinct indexes, each in proportion to stake among the
+        indexes not drawn (or excluded) yet.
+        """
+        stakes = self._stakes
+        seen = set(map(int, exclude))
+        available, taken = self._n_positive, 0.0
+        if seen:
+            excluded = stakes[list(seen)]
+            available -= int(np.count_nonzero(excluded > 0))
+            taken = float(excluded.sum())
+        if size > available:
+            raise ValueError(
+                f"Cannot draw {size} distinct addresses from {available} with stake"
+            )
+        selected: List[int] = []
+        while len(selected) < size:
+            if taken > (1 - MIN_ACCEPTANCE_RATE) * self._total:
+                # Most of the stake is taken, duplicates would dominate the draws
+                free = stakes > 0
+                free[list(seen)] = False
+                candidates = np.flatnonzero(free)
+                weights = stakes[candidates]
+                selected.extend(
+                    rng.choice(
+                        candidates,
+                        size=size - len(selected),
+                        replace=False,
+                        p=weights / weights.sum(),
+                    ).tolist()
+                )
+                break
+            # Redrawing on duplicates is the same as drawing from what is left:
+            # keep the first draw of every index not seen yet, in draw order
+            drawn = [
+                i
+                for i in dict.fromkeys(self.draw(rng, size - len(selected)).tolist())
+                if i not in seen
+            ]
+            seen.update(drawn)
+            selected.extend(drawn)
+            taken += float(stakes[drawn].sum())
+        return np.array(selected, dtype=np.int64)
+
+
+class Committee(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    members: List[str]  # the leader is the first member
+    reserves: List[str] = []
+
+    @property
+    def leader(self) -> str:
+        return self.members[0]
+
+    @property
+    def validators(self) -> List[str]:
+        return self.members[1:]
+
+
+class CommitteeSelector:
+    """
+    Selects round committees from an address pool in proportion to stake.
+    """
+
+    def __init__(
+        self,
+        addresses: Sequence[str],
+        stakes: Sequence[float],
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    ):
+        if len(addresses) != len(stakes):
+            raise ValueError("Addresses and stakes must have the same length")
+        self.params = params
+        self.addresses = list(addresses)
+        self._index: Dict[str, int] = {addr: i for i, addr in enumerate(addresses)}
+        self.sampler = StakeWeightedSampler(stakes)
+
+    def stake_of(self, address: str) -> float:
+        return float(self.sampler.stakes[self._index[address]])
+
+    def select(
+        self,
+        round_index: int,
+        rng: np.random.Generator,
+        reserves: int = 0,
+        size: Optional[int] = None,
+        exclude: Iterable[str] = (),
+    ) -> Committee:
+        if size is None:
+            size = self.params.round_sizes[round_index]
+        drawn = self.sampler.sample_without_replacement(
+            rng, size + reserves, exclude=(self._index[addr] for addr in exclude)
+        )
+        addresses = [self.addresses[i] for i in drawn.tolist()]
+        return Committee(members=addresses[:size], reserves=addresses[size:])
+
+    def set_stake(self, address: str, stake: float) -> None:
+        self.sampler.update(self._index[address], stake)
+
+    def apply_fee_events(self, fee_events: List[AnyFeeEvent]) -> None:
+        """
+        Apply the stake changes (staked and slashed amounts) of new fee events.
+        """
+        for event in fee_events:
+            if not (event.staked or event.slashed):
+                continue
+            for address in event.addresses:
+                index = self._index.get(address)
+                if index is not None:
+                    self.sampler.update(
+                        index,
+                        max(
+                            self.sampler.stakes[index] + event.staked - event.slashed, 0
+                        ),
+                    )
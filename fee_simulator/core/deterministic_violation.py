@@ -1,51 +1,86 @@
-from typing import List
+from typing import Callable, List, Tuple
+
+import numpy as np
 
 from fee_simulator.models import (
+    NO_HASH,
     TransactionRoundResults,
     FeeEvent,
+    EventSequence,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
 )
 
+from fee_simulator.constants import VOTE_CODES
 from fee_simulator.core.majority import (
-    compute_majority_hash,
-    normalize_vote,
-    who_is_in_hash_majority,
+    compute_majority_hash_id,
+    encode_hashes,
+    encode_votes,
 )
 
+from fee_simulator.utils import apply_slash_rates
 from fee_simulator.fee_aggregators.address_metrics import compute_current_stake
 
 
 def handle_deterministic_violations(
-    transaction_results: TransactionRoundResults, last_event_index: int
+    transaction_results: TransactionRoundResults,
+    event_sequence: EventSequence,
+    fee_events: List[FeeEvent],
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
 ) -> List[FeeEvent]:
-    fee_events = []
-    new_event_index = last_event_index
-    for i, round_obj in enumerate(transaction_results.rounds):
+    slashes = compute_deterministic_slashes(
+        transaction_results,
+        lambda address: compute_current_stake(address, fee_events),
+        params,
+    )
+    return [
+        FeeEvent(sequence_id=event_sequence.next_id(), address=addr, slashed=slashed)
+        for addr, slashed in slashes
+    ]
+
+
+def compute_deterministic_slashes(
+    transaction_results: TransactionRoundResults,
+    current_stake: Callable[[str], int],
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> List[Tuple[str, int]]:
+    """
+    The (address, slashed) amounts of hash minority validators, in event order.
+    """
+    return apply_slash_rates(
+        compute_deterministic_slash_rates(transaction_results, params), current_stake
+    )
+
+
+def compute_deterministic_slash_rates(
+    transaction_results: TransactionRoundResults,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> List[Tuple[str, float]]:
+    """
+    The (address, rate) slashes of hash minority validators, in event order.
+    """
+    rates = []
+    for round_obj in transaction_results.rounds:
         if round_obj.rotations:
-            rotation = round_obj.rotations[-1]
-            votes = rotation.votes
+            votes = round_obj.rotations[-1].votes
 
-            # Compute majority hash (independent of vote type)
-            majority_hash = compute_majority_hash(votes)
+            # Compute majority hash (independent of vote type), on the whole
+            # committee's hash ids at once
+            hash_ids, hashes = encode_hashes(votes)
+            majority_id = compute_majority_hash_id(hash_ids)
+            if majority_id == NO_HASH or not hashes[majority_id]:
+                continue
 
-            if majority_hash:
-                # Get addresses in hash majority and minority
-                hash_majority_addresses, hash_minority_addresses = (
-                    who_is_in_hash_majority(votes, majority_hash)
+            # Slash non-idle validators in hash minority
+            addresses, _, codes = encode_votes(votes)
+            minority = (hash_ids != majority_id) & (codes != VOTE_CODES["IDLE"])
+            for position in np.flatnonzero(minority).tolist():
+                # Leader is slashed more (5%) than validators (1%)
+                slash_rate = (
+                    params.leader_slash_rate
+                    if position == 0
+                    else params.validator_slash_rate
                 )
+                rates.append((addresses[position], slash_rate))
 
-                # Slash validators in hash minority
-                for addr in hash_minority_addresses:
-                    if normalize_vote(votes[addr]) != "Idle":
-                        # Leader is slashed more (5%) than validators (1%)
-                        current_stake = compute_current_stake(addr, fee_events)
-                        slash_rate = 0.05 if addr == next(iter(votes.keys())) else 0.01
-                        fee_events.append(
-                            FeeEvent(
-                                sequence_id=new_event_index,
-                                address=addr,
-                                slashed=current_stake * (1 - slash_rate),
-                            )
-                        )
-                        new_event_index += 1
-
-    return fee_events
+    return rates
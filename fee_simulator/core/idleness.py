@@ -1,16 +1,22 @@
-from typing import List
+from typing import Callable, List, Tuple
+
+import numpy as np
+
 from fee_simulator.models import (
     TransactionRoundResults,
     FeeEvent,
     Round,
     Rotation,
     EventSequence,
+    OverlayVotes,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
 )
 
-from fee_simulator.core.majority import (
-    normalize_vote,
-)
+from fee_simulator.constants import VOTE_CODES
+from fee_simulator.core.majority import encode_votes
 
+from fee_simulator.utils import apply_slash_rates
 from fee_simulator.fee_aggregators.address_metrics import compute_current_stake
 
 
@@ -18,9 +24,54 @@ def replace_idle_participants(
     event_sequence: EventSequence,
     fee_events: List[FeeEvent],
     transaction_results: TransactionRoundResults,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
 ) -> tuple[TransactionRoundResults, List[FeeEvent]]:
-    new_fee_events = fee_events.copy()  # Create a copy to avoid modifying the input
+    """
+    Slash idle validators and replace them with reserves.
+
+    Rounds with idle validators get an overlay rotation (removed positions
+    plus appended reserves) over the original votes; nothing is copied or
+    revalidated. fee_events is only read, for current stakes.
+
+    Returns:
+        The round results after replacement and the new slashing events
+    """
+    replaced_results, slashes = compute_idle_slashes(
+        transaction_results,
+        lambda address: compute_current_stake(address, fee_events),
+        params,
+    )
+    new_fee_events = [
+        FeeEvent(sequence_id=event_sequence.next_id(), address=addr, slashed=slashed)
+        for addr, slashed in slashes
+    ]
+    return replaced_results, new_fee_events
+
+
+def compute_idle_slashes(
+    transaction_results: TransactionRoundResults,
+    current_stake: Callable[[str], int],
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> Tuple[TransactionRoundResults, List[Tuple[str, int]]]:
+    """
+    replace_idle_participants without events: the replaced round results
+    and the (address, slashed) amounts in event order.
+    """
+    replaced_results, rates = compute_idle_slash_rates(transaction_results, params)
+    return replaced_results, apply_slash_rates(rates, current_stake)
+
+
+def compute_idle_slash_rates(
+    transaction_results: TransactionRoundResults,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> Tuple[TransactionRoundResults, List[Tuple[str, float]]]:
+    """
+    The replaced round results and the (address, rate) of every idle slash,
+    in event order; apply_slash_rates turns rates into amounts.
+    """
+    rates = []
     new_rounds = []
+    replaced_any = False
 
     for round_obj in transaction_results.rounds:
         if not round_obj.rotations:
@@ -30,59 +81,35 @@ def replace_idle_participants(
         rotation = round_obj.rotations[-1]
         votes = rotation.votes
 
-        # Find idle validators
-        idle_addresses = [
-            addr for addr, vote in votes.items() if normalize_vote(vote) == "IDLE"
-        ]
+        # Find idle validators from the vote codes of the whole committee
+        addresses, _, codes = encode_votes(votes)
+        idle_positions = np.flatnonzero(codes == VOTE_CODES["IDLE"]).tolist()
+        if not idle_positions:
+            new_rounds.append(round_obj)
+            continue
 
         # Slash idle validators
-        for addr in idle_addresses:
-            current_stake = compute_current_stake(addr, new_fee_events)
-            new_fee_events.append(
-                FeeEvent(
-                    sequence_id=event_sequence.next_id(),
-                    address=addr,
-                    slashed=current_stake * 0.01,
-                )
-            )
-
-        # Replace idle validators with reserves
-        if idle_addresses:
-            new_votes = {
-                addr: vote
-                for addr, vote in votes.items()
-                if normalize_vote(vote) != "Idle"
-            }
-            reserve_count = len(idle_addresses)
-
-            # Find available reserves
-            available_reserves = [
-                addr
-                for addr, vote in rotation.reserve_votes.items()
-                if addr not in new_votes
-            ]
-
-            # Add reserves to replace idle validators
-            for i in range(min(reserve_count, len(available_reserves))):
-                reserve_addr = available_reserves[i]
-                new_votes[reserve_addr] = rotation.reserve_votes[reserve_addr]
-
-            # Update votes in the rotation
-            new_round = Round(
-                rotations=[
-                    Rotation(
-                        votes=new_votes,
-                        reserve_votes=rotation.reserve_votes,
-                    )
-                ],
-            )
-            new_rounds.append(new_round)
-        else:
-            # If no idle validators, keep the original round
-            new_rounds.append(round_obj)
+        rates.extend((addresses[i], params.idle_slash_rate) for i in idle_positions)
 
-    new_transaction_results = TransactionRoundResults(
-        rounds=new_rounds,
-    )
+        # Replace idle validators with the first reserves not already voting
+        removed = frozenset(idle_positions)
+        idle_addresses = {addresses[i] for i in idle_positions}
+        appended = {}
+        for addr, vote in rotation.reserve_votes.items():
+            if len(appended) == len(idle_positions):
+                break
+            if addr not in votes or addr in idle_addresses:
+                appended[addr] = vote
+
+        overlay = Rotation.model_construct(
+            votes=OverlayVotes(votes, removed, appended),
+            reserve_votes=rotation.reserve_votes,
+        )
+        new_rounds.append(
+            Round.model_construct(rotations=round_obj.rotations[:-1] + [overlay])
+        )
+        replaced_any = True
 
-    return new_transaction_results, new_fee_events
+    if not replaced_any:
+        return transaction_results, rates
+    return TransactionRoundResults.model_construct(rounds=new_rounds), rates
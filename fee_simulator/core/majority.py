@@ -1,7 +1,9 @@
 from typing import Dict, List, Tuple, Optional
 from fee_simulator.types import Vote, MajorityOutcome
-from collections import Counter
-from fee_simulator.constants import DEFAULT_HASH
+from itertools import compress
+import numpy as np
+from fee_simulator.constants import DEFAULT_HASH, VOTE_CODES
+from fee_simulator.models import NO_HASH, CompactVotes, OverlayVotes
 
 
 def normalize_vote(vote_value: Vote) -> Vote:
@@ -57,6 +59,8 @@ def compute_majority(rotation: Dict[str, Vote]) -> MajorityOutcome:
     """
     if not rotation:
         return "UNDETERMINED"
+    if isinstance(rotation, CompactVotes):
+        return compute_majority_from_codes(rotation.codes)
 
     # Count votes by type
     vote_counts = {"AGREE": 0, "DISAGREE": 0, "TIMEOUT": 0, "IDLE": 0}
@@ -91,30 +95,9 @@ def compute_majority_hash(rotation: Dict[str, Vote]) -> Optional[str]:
     """
     if not rotation:
         return None
-
-    # Collect all hashes from all votes
-    hashes = []
-    for addr, vote in rotation.items():
-        hash_value = extract_hash(vote)
-        if hash_value != DEFAULT_HASH:
-            hashes.append(hash_value)
-
-    # If no hashes found, return None
-    if not hashes:
-        return None
-
-    # Count hash occurrences
-    hash_counter = Counter(hashes)
-    most_common_hash, count = hash_counter.most_common(1)[0]
-
-    # Check if this hash has a majority
-    total_votes = len(rotation)
-    majority_threshold = (total_votes // 2) + 1
-
-    if count >= majority_threshold:
-        return most_common_hash
-    else:
-        return None
+    hash_ids, hashes = encode_hashes(rotation)
+    majority_id = compute_majority_hash_id(hash_ids)
+    return None if majority_id == NO_HASH else hashes[majority_id]
 
 
 def who_is_in_vote_majority(
@@ -152,14 +135,161 @@ def who_is_in_hash_majority(
     Returns:
         Lists of addresses in hash majority and minority
     """
+    hash_ids, hashes = encode_hashes(rotation)
+    if majority_hash == DEFAULT_HASH:
+        # Votes without a hash count as DEFAULT_HASH
+        in_majority = hash_ids == NO_HASH
+    elif majority_hash in hashes:
+        in_majority = hash_ids == hashes.index(majority_hash)
+    else:
+        in_majority = np.zeros(len(hash_ids), dtype=bool)
     majority_addresses = []
     minority_addresses = []
+    for addr, is_majority in zip(rotation, in_majority.tolist()):
+        (majority_addresses if is_majority else minority_addresses).append(addr)
+    return majority_addresses, minority_addresses
 
-    for addr, vote in rotation.items():
-        hash_value = extract_hash(vote)
-        if hash_value == majority_hash:
-            majority_addresses.append(addr)
-        else:
-            minority_addresses.append(addr)
 
-    return majority_addresses, minority_addresses
+OTHER_VOTE_CODE = len(VOTE_CODES)
+MAJORITY_CODES: Dict[MajorityOutcome, int] = {
+    "AGREE": VOTE_CODES["AGREE"],
+    "DISAGREE": VOTE_CODES["DISAGREE"],
+    "TIMEOUT": VOTE_CODES["TIMEOUT"],
+}
+
+
+def encode_votes(rotation: Dict[str, Vote]) -> Tuple[List[str], List[Vote], np.ndarray]:
+    """
+    Encode a rotation into parallel address, normalized vote and vote code columns.
+
+    Args:
+        rotation: Dictionary mapping addresses to votes
+
+    Returns:
+        Addresses, normalized votes and an int8 array of vote codes, in vote order
+    """
+    if isinstance(rotation, CompactVotes):
+        return list(rotation.addresses), rotation.normalized(), rotation.codes
+    if isinstance(rotation, OverlayVotes):
+        addresses, normalized, codes = encode_votes(rotation.base)
+        kept = np.ones(len(addresses), dtype=bool)
+        kept[list(rotation.removed)] = False
+        reserve_addresses, reserve_normalized, reserve_codes = encode_votes(
+            rotation.appended
+        )
+        return (
+            list(compress(addresses, kept.tolist())) + reserve_addresses,
+            list(compress(normalized, kept.tolist())) + reserve_normalized,
+            np.concatenate([codes[kept], reserve_codes]),
+        )
+    addresses = list(rotation.keys())
+    normalized = [normalize_vote(vote) for vote in rotation.values()]
+    codes = np.fromiter(
+        (VOTE_CODES.get(vote, OTHER_VOTE_CODE) for vote in normalized),
+        dtype=np.int8,
+        count=len(normalized),
+    )
+    return addresses, normalized, codes
+
+
+def encode_hashes(rotation: Dict[str, Vote]) -> Tuple[np.ndarray, List[str]]:
+    """
+    Encode the hashes of a rotation as ids into a table of distinct hashes.
+
+    Args:
+        rotation: Dictionary mapping addresses to votes
+
+    Returns:
+        An int64 array of hash ids in vote order, NO_HASH for votes without a
+        hash (or with DEFAULT_HASH), and the hash of every id
+    """
+    table: Dict[str, int] = {}
+    if isinstance(rotation, CompactVotes):
+        n = len(rotation)
+        if rotation.hash_ids is None:
+            return np.full(n, NO_HASH, dtype=np.int64), []
+        hash_values = rotation.hash_values
+        if (
+            hash_values
+            and DEFAULT_HASH not in hash_values
+            and len(set(hash_values)) == len(hash_values)
+        ):
+            # Stored ids already index a table of distinct hashes
+            return rotation.hash_ids, list(hash_values)
+        # Map the distinct stored ids, not every vote
+        stored, inverse = np.unique(rotation.hash_ids, return_inverse=True)
+        mapped = np.empty(len(stored), dtype=np.int64)
+        for j, hash_id in enumerate(stored.tolist()):
+            if hash_id == NO_HASH:
+                mapped[j] = NO_HASH
+                continue
+            hash_value = (
+                rotation.hash_values[hash_id] if rotation.hash_values else hex(hash_id)
+            )
+            mapped[j] = (
+                NO_HASH
+                if hash_value == DEFAULT_HASH
+                else table.setdefault(hash_value, len(table))
+            )
+        return mapped[inverse.reshape(n)], list(table)
+    if isinstance(rotation, OverlayVotes):
+        ids, hashes = encode_hashes(rotation.base)
+        kept = np.ones(len(ids), dtype=bool)
+        kept[list(rotation.removed)] = False
+        table = {hash_value: i for i, hash_value in enumerate(hashes)}
+        ids = ids[kept]
+        votes = rotation.appended.values()
+    else:
+        ids = np.empty(0, dtype=np.int64)
+        votes = rotation.values()
+    extra = np.fromiter(
+        (
+            (
+                NO_HASH
+                if hash_value == DEFAULT_HASH
+                else table.setdefault(hash_value, len(table))
+            )
+            for hash_value in map(extract_hash, votes)
+        ),
+        dtype=np.int64,
+    )
+    return np.concatenate([ids, extra]), list(table)
+
+
+def compute_majority_hash_id(hash_ids: np.ndarray) -> int:
+    """
+    Compute the majority hash id from an array of hash ids.
+
+    Args:
+        hash_ids: Hash ids as produced by encode_hashes
+
+    Returns:
+        Majority hash id or NO_HASH if no majority
+    """
+    valid = hash_ids[hash_ids != NO_HASH]
+    if len(valid) == 0:
+        return NO_HASH
+    counts = np.bincount(valid)
+    most_common = int(counts.argmax())
+    majority_threshold = (len(hash_ids) // 2) + 1
+    return most_common if counts[most_common] >= majority_threshold else NO_HASH
+
+
+def compute_majority_from_codes(codes: np.ndarray) -> MajorityOutcome:
+    """
+    Compute the majority vote type from an array of vote codes.
+
+    Args:
+        codes: Vote codes as produced by encode_votes
+
+    Returns:
+        Majority vote type or "UNDETERMINED" if no majority
+    """
+    if len(codes) == 0:
+        return "UNDETERMINED"
+    counts = np.bincount(codes, minlength=OTHER_VOTE_CODE + 1)
+    majority_threshold = (len(codes) // 2) + 1
+    for outcome, code in MAJORITY_CODES.items():
+        if counts[code] >= majority_threshold:
+            return outcome
+    return "UNDETERMINED"
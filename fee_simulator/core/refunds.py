@@ -1,44 +1,57 @@
 from typing import List
-from fee_simulator.models import FeeEvent, TransactionBudget
+from fee_simulator.models import (
+    AnyFeeEvent,
+    TransactionBudget,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+    expand_fee_events,
+)
 from fee_simulator.display.fee_distribution import display_fee_distribution
 from fee_simulator.core.bond_computing import compute_appeal_bond
+from fee_simulator.ledger import LabelClass, as_ledger, label_class
+
+# Rounds whose payouts are funded by appeal bonds rather than by the sender
+NOT_SENDER_FUNDED = LabelClass.UNSUCCESSFUL | LabelClass.BOND_SPLIT
 
 
 def compute_sender_refund(
     sender_address: str,
-    fee_events: List[FeeEvent],
+    fee_events: List[AnyFeeEvent],
     transaction_budget: TransactionBudget,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
 ) -> float:
     # TODO: when introducing toppers, we need to change this function
+    ledger = as_ledger(fee_events)
     sender_cost = 0
     total_paid_from_sender = 0
-    for event in fee_events:
-        # Skip unsuccessful appeal costs, if leader appeal we skip 2 rounds
-        round_label = event.round_label if event.round_label is not None else ""
-        if event.role == "APPEALANT":
-            if event.earned > 0:
-                appeal_bond = compute_appeal_bond(
-                    normal_round_index=event.round_index - 1,
-                    leader_timeout=transaction_budget.leaderTimeout,
-                    validators_timeout=transaction_budget.validatorsTimeout,
-                )
-                total_paid_from_sender += event.earned - appeal_bond
-            continue
-        if "UNSUCCESSFUL" in round_label:
-            continue
-        if (
-            round_label == "SPLIT_PREVIOUS_APPEAL_BOND"
-            or round_label == "LEADER_TIMEOUT_50_PREVIOUS_APPEAL_BOND"
+
+    # Skip unsuccessful appeal costs, if leader appeal we skip 2 rounds
+    for _, bucket in ledger.label_buckets(exclude=NOT_SENDER_FUNDED):
+        total_paid_from_sender += bucket.earned
+
+    # Appealant events are settled against their bond whatever the label
+    for event in ledger.role_bucket("APPEALANT").events:
+        if not NOT_SENDER_FUNDED & label_class(event.round_label):
+            total_paid_from_sender -= event.earned * event.size
+        if event.earned > 0:
+            appeal_bond = compute_appeal_bond(
+                normal_round_index=event.round_index - 1,
+                leader_timeout=transaction_budget.leaderTimeout,
+                validators_timeout=transaction_budget.validatorsTimeout,
+                params=params,
+            )
+            total_paid_from_sender += (event.earned - appeal_bond) * event.size
+
+    for event in ledger.address_bucket(sender_address).events:
+        if event.role == "APPEALANT" or NOT_SENDER_FUNDED & label_class(
+            event.round_label
         ):
             continue
-        if event.address == sender_address:
-            sender_cost += event.cost
-            total_paid_from_sender += event.earned
-            continue
-        total_paid_from_sender += event.earned
+        sender_cost += event.cost
+
     refund = sender_cost - total_paid_from_sender
     if refund < 0:
-        display_fee_distribution(fee_events)
+        display_fee_distribution(expand_fee_events(fee_events))
         raise ValueError(
             f"Total paid from sender is greater than sender cost: {total_paid_from_sender} > {sender_cost}"
         )
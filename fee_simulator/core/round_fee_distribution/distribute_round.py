@@ -4,55 +4,100 @@ from fee_simulator.models import (
     TransactionRoundResults,
     TransactionBudget,
     FeeEvent,
+    AnyFeeEvent,
     EventSequence,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
 )
 
 from fee_simulator.types import (
     RoundLabel,
 )
 
-from fee_simulator.core.round_fee_distribution import (
-    apply_normal_round,
-    apply_appeal_leader_timeout_successful,
-    apply_appeal_leader_successful,
-    apply_appeal_validator_successful,
-    apply_appeal_validator_unsuccessful,
-    apply_leader_timeout_50_percent,
-    apply_split_previous_appeal_bond,
-    apply_leader_timeout_50_previous_appeal_bond,
-    apply_leader_timeout_150_previous_normal_round,
+from fee_simulator.core.round_fee_distribution.rules import (
+    RoundKernel,
+    RoundRuleSpec,
+    compile_round_rules,
+)
+from fee_simulator.core.round_fee_distribution.normal_round import NORMAL_ROUND_RULES
+from fee_simulator.core.round_fee_distribution.leader_timeout_50_percent import (
+    LEADER_TIMEOUT_50_PERCENT_RULES,
+)
+from fee_simulator.core.round_fee_distribution.leader_timeout_50_previous_appeal_bond import (
+    LEADER_TIMEOUT_50_PREVIOUS_APPEAL_BOND_RULES,
+)
+from fee_simulator.core.round_fee_distribution.leader_timeout_150_previous_normal_round import (
+    LEADER_TIMEOUT_150_PREVIOUS_NORMAL_ROUND_RULES,
+)
+from fee_simulator.core.round_fee_distribution.appeal_leader_successful import (
+    APPEAL_LEADER_SUCCESSFUL_RULES,
+)
+from fee_simulator.core.round_fee_distribution.appeal_leader_timeout_successful import (
+    APPEAL_LEADER_TIMEOUT_SUCCESSFUL_RULES,
+)
+from fee_simulator.core.round_fee_distribution.appeal_validator_successful import (
+    APPEAL_VALIDATOR_SUCCESSFUL_RULES,
+)
+from fee_simulator.core.round_fee_distribution.appeal_validator_unsuccessful import (
+    APPEAL_VALIDATOR_UNSUCCESSFUL_RULES,
+)
+from fee_simulator.core.round_fee_distribution.split_previous_appeal_bond import (
+    SPLIT_PREVIOUS_APPEAL_BOND_RULES,
 )
 
 FeeTransformer = Callable[
     [TransactionRoundResults, int, TransactionBudget, EventSequence], List[FeeEvent]
 ]
 
-FEE_RULES: Dict[RoundLabel, FeeTransformer] = {
-    "NORMAL_ROUND": apply_normal_round,
-    "EMPTY_ROUND": lambda r, i, b, s: [],
-    "SKIP_ROUND": lambda r, i, b, s: [],
-    "APPEAL_LEADER_TIMEOUT_UNSUCCESSFUL": lambda r, i, b, s: [],
-    "APPEAL_LEADER_TIMEOUT_SUCCESSFUL": apply_appeal_leader_timeout_successful,
-    "APPEAL_LEADER_SUCCESSFUL": apply_appeal_leader_successful,
-    "APPEAL_LEADER_UNSUCCESSFUL": lambda r, i, b, s: [],
-    "APPEAL_VALIDATOR_SUCCESSFUL": apply_appeal_validator_successful,
-    "APPEAL_VALIDATOR_UNSUCCESSFUL": apply_appeal_validator_unsuccessful,
-    "LEADER_TIMEOUT_50_PERCENT": apply_leader_timeout_50_percent,
-    "SPLIT_PREVIOUS_APPEAL_BOND": apply_split_previous_appeal_bond,
-    "LEADER_TIMEOUT_50_PREVIOUS_APPEAL_BOND": apply_leader_timeout_50_previous_appeal_bond,
-    "LEADER_TIMEOUT_150_PREVIOUS_NORMAL_ROUND": apply_leader_timeout_150_previous_normal_round,
+ROUND_RULE_SPECS: Dict[RoundLabel, RoundRuleSpec] = {
+    "NORMAL_ROUND": NORMAL_ROUND_RULES,
+    "EMPTY_ROUND": RoundRuleSpec(label="EMPTY_ROUND"),
+    "SKIP_ROUND": RoundRuleSpec(label="SKIP_ROUND"),
+    "APPEAL_LEADER_TIMEOUT_UNSUCCESSFUL": RoundRuleSpec(
+        label="APPEAL_LEADER_TIMEOUT_UNSUCCESSFUL"
+    ),
+    "APPEAL_LEADER_TIMEOUT_SUCCESSFUL": APPEAL_LEADER_TIMEOUT_SUCCESSFUL_RULES,
+    "APPEAL_LEADER_SUCCESSFUL": APPEAL_LEADER_SUCCESSFUL_RULES,
+    "APPEAL_LEADER_UNSUCCESSFUL": RoundRuleSpec(label="APPEAL_LEADER_UNSUCCESSFUL"),
+    "APPEAL_VALIDATOR_SUCCESSFUL": APPEAL_VALIDATOR_SUCCESSFUL_RULES,
+    "APPEAL_VALIDATOR_UNSUCCESSFUL": APPEAL_VALIDATOR_UNSUCCESSFUL_RULES,
+    "LEADER_TIMEOUT_50_PERCENT": LEADER_TIMEOUT_50_PERCENT_RULES,
+    "SPLIT_PREVIOUS_APPEAL_BOND": SPLIT_PREVIOUS_APPEAL_BOND_RULES,
+    "LEADER_TIMEOUT_50_PREVIOUS_APPEAL_BOND": LEADER_TIMEOUT_50_PREVIOUS_APPEAL_BOND_RULES,
+    "LEADER_TIMEOUT_150_PREVIOUS_NORMAL_ROUND": LEADER_TIMEOUT_150_PREVIOUS_NORMAL_ROUND_RULES,
+}
+
+# Every spec is compiled once at import time; a label without a spec pays nothing
+FEE_RULES: Dict[RoundLabel, RoundKernel] = {
+    label: compile_round_rules(spec) for label, spec in ROUND_RULE_SPECS.items()
 }
 
 
+def get_round_kernel(label: RoundLabel) -> RoundKernel:
+    kernel = FEE_RULES.get(label)
+    if kernel is None:
+        kernel = compile_round_rules(RoundRuleSpec(label=label))
+    return kernel
+
+
 def distribute_round(
     transaction_results: TransactionRoundResults,
     round_index: int,
     label: RoundLabel,
     budget: TransactionBudget,
     event_sequence: EventSequence,
-) -> List[FeeEvent]:
+    grouped: bool = False,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> List[AnyFeeEvent]:
     """
     Distribute fees for a single round based on its label, generating FeeEvent instances.
+
+    With grouped=True, identical payouts to several addresses are emitted as
+    one BulkFeeEvent.
     """
-    transformer = FEE_RULES.get(label, lambda r, i, b, s: [])
-    return transformer(transaction_results, round_index, budget, event_sequence)
+    kernel = get_round_kernel(label)
+    if grouped:
+        return kernel.payouts(
+            transaction_results, round_index, budget, params=params
+        ).to_bulk_fee_events(event_sequence)
+    return kernel(transaction_results, round_index, budget, event_sequence, params)
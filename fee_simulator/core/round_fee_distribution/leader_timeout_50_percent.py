@@ -1,42 +1,20 @@
-from typing import List
-from fee_simulator.models import (
-    TransactionRoundResults,
-    TransactionBudget,
-    FeeEvent,
-    EventSequence,
+from fee_simulator.core.round_fee_distribution.rules import (
+    PayoutRule,
+    RoundRuleSpec,
+    compile_round_rules,
 )
-from fee_simulator.core.majority import normalize_vote
 
+LEADER_TIMEOUT_50_PERCENT_RULES = RoundRuleSpec(
+    label="LEADER_TIMEOUT_50_PERCENT",
+    # TODO: this is a hack, rotations are not properly implemented
+    requires_rotations=True,
+    rules=[
+        PayoutRule(
+            recipients="LEADER",
+            role="LEADER",
+            amount=lambda ctx: ctx.leader_timeout / 2,
+        ),
+    ],
+)
 
-def apply_leader_timeout_50_percent(
-    transaction_results: TransactionRoundResults,
-    round_index: int,
-    budget: TransactionBudget,
-    event_sequence: EventSequence,
-) -> List[FeeEvent]:
-    events = []
-    round = transaction_results.rounds[round_index]
-    if (
-        not round.rotations
-    ):  # TODO: this is a hack, rotations are not properly implemented
-        return events
-    votes = round.rotations[-1].votes
-    first_addr = next(iter(votes.keys()), None)
-    if first_addr:
-        events.append(
-            FeeEvent(
-                sequence_id=event_sequence.next_id(),
-                address=first_addr,
-                round_index=round_index,
-                round_label="LEADER_TIMEOUT_50_PERCENT",
-                role="LEADER",
-                vote=normalize_vote(votes[first_addr]),
-                hash="0xdefault",
-                cost=0,
-                staked=0,
-                earned=budget.leaderTimeout / 2,
-                slashed=0,
-                burned=0,
-            )
-        )
-    return events
+apply_leader_timeout_50_percent = compile_round_rules(LEADER_TIMEOUT_50_PERCENT_RULES)
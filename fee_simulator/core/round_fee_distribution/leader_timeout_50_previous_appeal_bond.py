@@ -1,72 +1,33 @@
-from typing import List
-from fee_simulator.models import (
-    TransactionRoundResults,
-    TransactionBudget,
-    FeeEvent,
-    EventSequence,
+from fee_simulator.core.round_fee_distribution.rules import (
+    PayoutRule,
+    RoundRuleSpec,
+    compile_round_rules,
 )
-from fee_simulator.core.majority import normalize_vote
-from fee_simulator.core.bond_computing import compute_appeal_bond
 
 
-def apply_leader_timeout_50_previous_appeal_bond(
-    transaction_results: TransactionRoundResults,
-    round_index: int,
-    budget: TransactionBudget,
-    event_sequence: EventSequence,
-) -> List[FeeEvent]:
-    events = []
-    round = transaction_results.rounds[round_index]
-    if (
-        not round.rotations
-        or not budget.appeals
-        or round_index < 1
-        or round_index - 1 > len(budget.appeals)
-    ):
-        return events
+def half_previous_appeal_bond(ctx):
+    return ctx.appeal_bond(ctx.round_index - 2) / 2
 
-    votes = round.rotations[-1].votes
-    sender_address = budget.senderAddress
-    appeal_bond = compute_appeal_bond(
-        round_index - 2, budget.leaderTimeout, budget.validatorsTimeout
-    )
 
-    # Award half the appeal bond to the leader
-    first_addr = next(iter(votes.keys()), None)
-    if first_addr:
-        events.append(
-            FeeEvent(
-                sequence_id=event_sequence.next_id(),
-                address=first_addr,
-                round_index=round_index,
-                round_label="LEADER_TIMEOUT_50_PREVIOUS_APPEAL_BOND",
-                role="LEADER",
-                vote=normalize_vote(votes[first_addr]),
-                hash="0xdefault",
-                cost=0,
-                staked=0,
-                earned=appeal_bond / 2,
-                slashed=0,
-                burned=0,
-            )
-        )
-
-    # Award half the appeal bond to the sender
-    events.append(
-        FeeEvent(
-            sequence_id=event_sequence.next_id(),
-            address=sender_address,
-            round_index=round_index,
-            round_label="LEADER_TIMEOUT_50_PREVIOUS_APPEAL_BOND",
+LEADER_TIMEOUT_50_PREVIOUS_APPEAL_BOND_RULES = RoundRuleSpec(
+    label="LEADER_TIMEOUT_50_PREVIOUS_APPEAL_BOND",
+    requires_rotations=True,
+    requires_appeal="PREVIOUS",
+    rules=[
+        # Half the appeal bond goes to the leader, half back to the sender
+        PayoutRule(
+            recipients="LEADER",
+            role="LEADER",
+            amount=half_previous_appeal_bond,
+        ),
+        PayoutRule(
+            recipients="SENDER",
             role="SENDER",
-            vote="NA",
-            hash="0xdefault",
-            cost=0,
-            staked=0,
-            earned=appeal_bond / 2,
-            slashed=0,
-            burned=0,
-        )
-    )
+            amount=half_previous_appeal_bond,
+        ),
+    ],
+)
 
-    return events
+apply_leader_timeout_50_previous_appeal_bond = compile_round_rules(
+    LEADER_TIMEOUT_50_PREVIOUS_APPEAL_BOND_RULES
+)
@@ -0,0 +1,101 @@
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+
+from fee_simulator.models import (
+    TransactionRoundResults,
+    TransactionBudget,
+    AnyFeeEvent,
+    SequenceBlock,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.types import RoundLabel, Vote
+from fee_simulator.core.round_fee_distribution.rules import RoundPlan
+from fee_simulator.core.round_fee_distribution.distribute_round import (
+    get_round_kernel,
+)
+
+
+def is_free_threaded() -> bool:
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def round_executor(max_workers: Optional[int] = None) -> Executor:
+    """
+    Executor for concurrent round distribution: threads when the interpreter
+    runs without a GIL, processes otherwise. The caller owns (and shuts
+    down) the executor, so one pool serves many transactions.
+    """
+    if is_free_threaded():
+        return ThreadPoolExecutor(max_workers=max_workers)
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+class RoundJob:
+    """
+    The encoded voters of one round and how many events distributing it
+    emits, known before any event is built.
+    """
+
+    __slots__ = ("round_index", "label", "addresses", "normalized", "codes", "size")
+
+    def __init__(
+        self,
+        round_index: int,
+        label: RoundLabel,
+        addresses: List[str],
+        normalized: List[Vote],
+        codes: np.ndarray,
+        size: int,
+    ):
+        self.round_index = round_index
+        self.label = label
+        self.addresses = addresses
+        self.normalized = normalized
+        self.codes = codes
+        self.size = size
+
+
+def prepare_round(
+    transaction_results: TransactionRoundResults,
+    round_index: int,
+    label: RoundLabel,
+    budget: TransactionBudget,
+    plan: Optional[RoundPlan] = None,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> RoundJob:
+    """
+    Encode a round's voters and count its events, so a sequence block of the
+    exact size can be reserved before the events are emitted.
+    """
+    kernel = get_round_kernel(label)
+    if plan is None and not kernel.is_applicable(
+        transaction_results, round_index, budget
+    ):
+        return RoundJob(round_index, label, [], [], np.empty(0, dtype=np.int8), 0)
+    if plan is not None and not plan.entries:
+        return RoundJob(round_index, label, [], [], np.empty(0, dtype=np.int8), 0)
+    addresses, normalized, codes = kernel.encode(transaction_results, round_index)
+    if plan is None:
+        plan = kernel.plan(codes, round_index, budget, params=params)
+    return RoundJob(round_index, label, addresses, normalized, codes, plan.event_count)
+
+
+def emit_round(
+    job: RoundJob,
+    budget: TransactionBudget,
+    block: SequenceBlock,
+    grouped: bool = False,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> List[AnyFeeEvent]:
+    # Runs in a worker; the job, budget, block and params are sent over
+    kernel = get_round_kernel(job.label)
+    plan = kernel.plan(job.codes, job.round_index, budget, params=params)
+    payouts = kernel.emit(plan, job.addresses, job.normalized, job.codes, budget)
+    if grouped:
+        return payouts.to_bulk_fee_events(block)
+    return payouts.to_fee_events(block)
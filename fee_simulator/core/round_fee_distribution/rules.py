@@ -0,0 +1,490 @@
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+from fee_simulator.models import (
+    TransactionRoundResults,
+    TransactionBudget,
+    FeeEvent,
+    BulkFeeEvent,
+    AnyFeeEvent,
+    EventSequence,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.types import MajorityOutcome, RoundLabel, Role, Vote
+from fee_simulator.constants import DEFAULT_HASH
+from fee_simulator.core.majority import (
+    MAJORITY_CODES,
+    compute_majority_from_codes,
+    encode_votes,
+)
+from fee_simulator.core.bond_computing import compute_appeal_bond
+from fee_simulator.utils import split_amount
+
+Recipients = Literal["LEADER", "VOTERS", "MAJORITY", "MINORITY", "SENDER", "APPEALANT"]
+MajorityCondition = Literal["ANY", "DETERMINED", "UNDETERMINED"]
+VoteSource = Literal["ROUND", "ROUND_AND_PREVIOUS"]
+AppealRequirement = Literal["CURRENT", "PREVIOUS"]
+
+
+class RuleContext:
+    """
+    Values a payout amount formula can depend on for one round.
+    """
+
+    def __init__(
+        self,
+        budget: TransactionBudget,
+        round_index: int,
+        n_voters: int,
+        n_majority: int,
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    ):
+        self.budget = budget
+        self.params = params
+        self.round_index = round_index
+        self.n_voters = n_voters
+        self.n_majority = n_majority
+        self.leader_timeout = budget.leaderTimeout
+        self.validators_timeout = budget.validatorsTimeout
+        self.penalty_coefficient = params.penalty_reward_coefficient
+
+    def appeal_bond(self, normal_round_index: int):
+        return compute_appeal_bond(
+            normal_round_index=normal_round_index,
+            leader_timeout=self.leader_timeout,
+            validators_timeout=self.validators_timeout,
+            params=self.params,
+        )
+
+    def split(self, amount, num_recipients: int):
+        return split_amount(amount, num_recipients)
+
+    def floor_split(self, amount, num_recipients: int):
+        return (amount * 10**18 // num_recipients) // 10**18
+
+
+AmountFormula = Callable[[RuleContext], Any]
+
+
+class PayoutRule(BaseModel):
+    """
+    One payout: every member of `recipients` gets `amount` in `field`.
+    """
+
+    model_config = ConfigDict(frozen=True)
+    recipients: Recipients
+    role: Role
+    amount: AmountFormula
+    field: Literal["earned", "burned"] = "earned"
+    when: MajorityCondition = "ANY"
+    # vote and hash recorded for SENDER/APPEALANT recipients; voters record their own
+    vote: Optional[Vote] = "NA"
+    hash: Optional[str] = DEFAULT_HASH
+
+
+class RoundRuleSpec(BaseModel):
+    """
+    Declarative fee distribution for one round label. Rules are emitted in order.
+    """
+
+    model_config = ConfigDict(frozen=True)
+    label: RoundLabel
+    rules: List[PayoutRule] = []
+    votes: VoteSource = "ROUND"
+    requires_rotations: bool = False
+    requires_appeal: Optional[AppealRequirement] = None
+
+
+class RoundPayouts:
+    """
+    Column-oriented payouts of one round, one row per FeeEvent to emit.
+    """
+
+    def __init__(
+        self,
+        round_index: int,
+        label: RoundLabel,
+        address: np.ndarray,
+        role: np.ndarray,
+        vote: np.ndarray,
+        hash: np.ndarray,
+        earned: np.ndarray,
+        burned: np.ndarray,
+    ):
+        self.round_index = round_index
+        self.label = label
+        self.address = address
+        self.role = role
+        self.vote = vote
+        self.hash = hash
+        self.earned = earned
+        self.burned = burned
+
+    def __len__(self) -> int:
+        return len(self.address)
+
+    def to_fee_events(self, event_sequence: EventSequence) -> List[FeeEvent]:
+        return [
+            FeeEvent(
+                sequence_id=event_sequence.next_id(),
+                address=address,
+                round_index=self.round_index,
+                round_label=self.label,
+                role=role,
+                vote=vote,
+                hash=hash,
+                earned=earned,
+                burned=burned,
+            )
+            for address, role, vote, hash, earned, burned in zip(
+                self.address, self.role, self.vote, self.hash, self.earned, self.burned
+            )
+        ]
+
+    def to_bulk_fee_events(self, event_sequence: EventSequence) -> List[AnyFeeEvent]:
+        """
+        Like to_fee_events, but runs of rows that differ only in address become
+        one BulkFeeEvent spanning their sequence ids.
+        """
+        rows = list(zip(self.role, self.vote, self.hash, self.earned, self.burned))
+        events: List[AnyFeeEvent] = []
+        start = 0
+        while start < len(rows):
+            stop = start + 1
+            while stop < len(rows) and rows[stop] == rows[start]:
+                stop += 1
+            role, vote, hash, earned, burned = rows[start]
+            fields = dict(
+                round_index=self.round_index,
+                round_label=self.label,
+                role=role,
+                vote=vote,
+                hash=hash,
+                earned=earned,
+                burned=burned,
+            )
+            if stop - start == 1:
+                events.append(
+                    FeeEvent(
+                        sequence_id=event_sequence.next_id(),
+                        address=self.address[start],
+                        **fields,
+                    )
+                )
+            else:
+                events.append(
+                    BulkFeeEvent(
+                        sequence_id=event_sequence.reserve(stop - start).start,
+                        addresses=tuple(self.address[start:stop]),
+                        **fields,
+                    )
+                )
+            start = stop
+        return events
+
+
+def _object_column(values: List[np.ndarray]) -> np.ndarray:
+    if not values:
+        return np.empty(0, dtype=object)
+    return np.concatenate(values)
+
+
+def _filled(size: int, value) -> np.ndarray:
+    column = np.empty(size, dtype=object)
+    column[:] = [value] * size
+    return column
+
+
+class RoundPlan:
+    """
+    The rules of a round that fire, with their resolved amounts.
+    """
+
+    __slots__ = ("label", "round_index", "majority_code", "entries")
+
+    def __init__(
+        self,
+        label: RoundLabel,
+        round_index: int,
+        majority_code: Optional[int],
+        entries: Tuple[Tuple[PayoutRule, Any, int], ...],
+    ):
+        self.label = label
+        self.round_index = round_index
+        self.majority_code = majority_code
+        self.entries = entries  # (rule, amount, number of recipients)
+
+    @property
+    def event_count(self) -> int:
+        return sum(size for _, _, size in self.entries)
+
+    def fixed_recipient(self, rule: PayoutRule, budget: TransactionBudget) -> str:
+        """
+        Address paid by a SENDER or APPEALANT rule.
+        """
+        if rule.recipients == "SENDER":
+            return budget.senderAddress
+        return budget.appeals[self.round_index // 2].appealantAddress
+
+    def voter_amounts(
+        self, codes: np.ndarray, dtype=np.int64
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Earned and burned totals per voter of the rules paying voters, for
+        voters with these codes: what the voters' emitted rows sum to.
+        """
+        earned = np.zeros(len(codes), dtype=dtype)
+        burned = np.zeros(len(codes), dtype=dtype)
+        if self.majority_code is None:
+            majority_mask = np.zeros(len(codes), dtype=bool)
+        else:
+            majority_mask = codes == self.majority_code
+        for rule, amount, _ in self.entries:
+            column = earned if rule.field == "earned" else burned
+            if rule.recipients == "LEADER":
+                column[0] += amount
+            elif rule.recipients == "VOTERS":
+                column += amount
+            elif rule.recipients == "MAJORITY":
+                column[majority_mask] += amount
+            elif rule.recipients == "MINORITY":
+                column[~majority_mask] += amount
+        return earned, burned
+
+
+class RoundKernel:
+    """
+    A RoundRuleSpec compiled into a single pass over a round's vote codes.
+
+    Calling the kernel has the FeeTransformer signature used by FEE_RULES.
+    """
+
+    def __init__(self, spec: RoundRuleSpec):
+        self.spec = spec
+        self.label = spec.label
+        self._rules = tuple(spec.rules)
+        self._needs_majority = any(
+            rule.recipients in ("MAJORITY", "MINORITY") or rule.when != "ANY"
+            for rule in self._rules
+        )
+
+    def _is_applicable(
+        self, transaction_results: TransactionRoundResults, round_index: int, budget
+    ) -> bool:
+        spec = self.spec
+        if spec.requires_rotations and not (
+            transaction_results.rounds[round_index].rotations
+        ):
+            return False
+        if spec.requires_appeal == "CURRENT":
+            return bool(budget.appeals) and round_index <= len(budget.appeals)
+        if spec.requires_appeal == "PREVIOUS":
+            return (
+                bool(budget.appeals)
+                and round_index >= 1
+                and round_index - 1 <= len(budget.appeals)
+            )
+        return True
+
+    def _round_votes(
+        self, transaction_results: TransactionRoundResults, round_index: int
+    ) -> Dict[str, Vote]:
+        round = transaction_results.rounds[round_index]
+        if not round.rotations:
+            return {}
+        votes = round.rotations[-1].votes
+        if self.spec.votes == "ROUND_AND_PREVIOUS":
+            previous_round = transaction_results.rounds[round_index - 1]
+            if previous_round.rotations:
+                votes = {**votes, **previous_round.rotations[-1].votes}
+        return votes
+
+    def is_applicable(
+        self,
+        transaction_results: TransactionRoundResults,
+        round_index: int,
+        budget: TransactionBudget,
+    ) -> bool:
+        return bool(self._rules) and self._is_applicable(
+            transaction_results, round_index, budget
+        )
+
+    def encode(
+        self, transaction_results: TransactionRoundResults, round_index: int
+    ) -> Tuple[List[str], List[Vote], np.ndarray]:
+        return encode_votes(self._round_votes(transaction_results, round_index))
+
+    def plan(
+        self,
+        codes: np.ndarray,
+        round_index: int,
+        budget: TransactionBudget,
+        applicable: bool = True,
+        context_type: type = RuleContext,
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    ) -> RoundPlan:
+        """
+        Resolve which rules fire and their amounts. This depends only on vote
+        counts, so a plan can be reused for any round with the same counts.
+        """
+        if not (self._rules and applicable):
+            return RoundPlan(self.label, round_index, None, ())
+        majority: MajorityOutcome = "UNDETERMINED"
+        n_majority = 0
+        if self._needs_majority:
+            majority = compute_majority_from_codes(codes)
+            if majority in MAJORITY_CODES:
+                n_majority = int(np.count_nonzero(codes == MAJORITY_CODES[majority]))
+        n_voters = len(codes)
+        context = context_type(
+            budget=budget,
+            round_index=round_index,
+            n_voters=n_voters,
+            n_majority=n_majority,
+            params=params,
+        )
+        sizes = {
+            "LEADER": min(n_voters, 1),
+            "VOTERS": n_voters,
+            "MAJORITY": n_majority,
+            "MINORITY": n_voters - n_majority,
+            "SENDER": 1,
+            "APPEALANT": 1,
+        }
+        entries = []
+        for rule in self._rules:
+            if rule.when == "DETERMINED" and majority == "UNDETERMINED":
+                continue
+            if rule.when == "UNDETERMINED" and majority != "UNDETERMINED":
+                continue
+            if sizes[rule.recipients]:
+                entries.append((rule, rule.amount(context), sizes[rule.recipients]))
+        return RoundPlan(
+            self.label, round_index, MAJORITY_CODES.get(majority), tuple(entries)
+        )
+
+    def emit(
+        self,
+        plan: RoundPlan,
+        addresses: List[str],
+        normalized: List[Vote],
+        codes: np.ndarray,
+        budget: TransactionBudget,
+    ) -> RoundPayouts:
+        """
+        Apply a plan to concrete voters, producing the payout columns.
+        """
+        if plan.majority_code is None:
+            majority_mask = np.zeros(len(codes), dtype=bool)
+        else:
+            majority_mask = codes == plan.majority_code
+        voter_address = np.array(addresses, dtype=object)
+        voter_vote = np.empty(len(normalized), dtype=object)
+        voter_vote[:] = normalized
+        columns: Dict[str, List[np.ndarray]] = {
+            "address": [],
+            "role": [],
+            "vote": [],
+            "hash": [],
+            "earned": [],
+            "burned": [],
+        }
+        for rule, amount, size in plan.entries:
+            if rule.recipients in ("SENDER", "APPEALANT"):
+                recipient_address = _filled(1, plan.fixed_recipient(rule, budget))
+                recipient_vote = _filled(1, rule.vote)
+            else:
+                if rule.recipients == "LEADER":
+                    index = np.arange(1)
+                elif rule.recipients == "VOTERS":
+                    index = np.arange(len(codes))
+                elif rule.recipients == "MAJORITY":
+                    index = np.flatnonzero(majority_mask)
+                else:
+                    index = np.flatnonzero(~majority_mask)
+                recipient_address = voter_address[index]
+                recipient_vote = voter_vote[index]
+
+            columns["address"].append(recipient_address)
+            columns["role"].append(_filled(size, rule.role))
+            columns["vote"].append(recipient_vote)
+            is_voter = rule.recipients not in ("SENDER", "APPEALANT")
+            columns["hash"].append(
+                _filled(size, DEFAULT_HASH if is_voter else rule.hash)
+            )
+            columns["earned"].append(
+                _filled(size, amount if rule.field == "earned" else 0)
+            )
+            columns["burned"].append(
+                _filled(size, amount if rule.field == "burned" else 0)
+            )
+
+        return RoundPayouts(
+            round_index=plan.round_index,
+            label=self.label,
+            **{name: _object_column(values) for name, values in columns.items()},
+        )
+
+    def resolve(
+        self,
+        transaction_results: TransactionRoundResults,
+        round_index: int,
+        budget: TransactionBudget,
+        context_type: type = RuleContext,
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    ) -> Tuple[RoundPlan, List[str], List[Vote], np.ndarray]:
+        """
+        The plan of a round and the encoded voters it applies to.
+        """
+        applicable = self.is_applicable(transaction_results, round_index, budget)
+        if applicable:
+            addresses, normalized, codes = self.encode(transaction_results, round_index)
+        else:
+            addresses, normalized, codes = [], [], np.empty(0, dtype=np.int8)
+        plan = self.plan(codes, round_index, budget, applicable, context_type, params)
+        return plan, addresses, normalized, codes
+
+    def payouts(
+        self,
+        transaction_results: TransactionRoundResults,
+        round_index: int,
+        budget: TransactionBudget,
+        context_type: type = RuleContext,
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    ) -> RoundPayouts:
+        plan, addresses, normalized, codes = self.resolve(
+            transaction_results, round_index, budget, context_type, params
+        )
+        return self.emit(plan, addresses, normalized, codes, budget)
+
+    def __call__(
+        self,
+        transaction_results: TransactionRoundResults,
+        round_index: int,
+        budget: TransactionBudget,
+        event_sequence: EventSequence,
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    ) -> List[FeeEvent]:
+        return self.payouts(
+            transaction_results, round_index, budget, params=params
+        ).to_fee_events(event_sequence)
+
+
+def compile_round_rules(spec: RoundRuleSpec) -> RoundKernel:
+    return RoundKernel(spec)
+
+
+# Amount formulas shared by several round types
+def leader_timeout(ctx: RuleContext):
+    return ctx.leader_timeout
+
+
+def validators_timeout(ctx: RuleContext):
+    return ctx.validators_timeout
+
+
+def minority_penalty(ctx: RuleContext):
+    return ctx.penalty_coefficient * ctx.validators_timeout
@@ -0,0 +1,201 @@
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from fee_simulator.models import (
+    TransactionBudget,
+    TransactionRoundResults,
+    AnyFeeEvent,
+    EventSequence,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.types import RoundLabel, Vote
+from fee_simulator.core.majority import OTHER_VOTE_CODE, encode_votes
+from fee_simulator.core.round_labeling import label_rounds
+from fee_simulator.core.round_fee_distribution.rules import RoundPayouts, RoundPlan
+from fee_simulator.core.round_fee_distribution.distribute_round import (
+    get_round_kernel,
+)
+
+DEFAULT_TEMPLATE_CACHE_SIZE = 4096
+
+# Leader vote classes that round labeling tells apart
+LEADER_TIMEOUT_KEY = 0
+LEADER_RECEIPT_KEY = 1
+LEADER_OTHER_KEY = 2
+
+
+def _leader_key(vote: Vote) -> int:
+    if vote == ["LEADER_TIMEOUT", "NA"]:
+        return LEADER_TIMEOUT_KEY
+    if isinstance(vote, list) and vote[0] == "LEADER_RECEIPT":
+        return LEADER_RECEIPT_KEY
+    return LEADER_OTHER_KEY
+
+
+def _code_counts(codes: np.ndarray) -> Tuple[int, ...]:
+    return tuple(np.bincount(codes, minlength=OTHER_VOTE_CODE + 1).tolist())
+
+
+def scenario_signature(
+    transaction_results: TransactionRoundResults,
+    budget: TransactionBudget,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> Tuple[Hashable, ...]:
+    """
+    Canonical key of everything round labels and payout plans depend on.
+
+    Two scenarios with the same signature get the same labels and the same
+    payout amounts per recipient group; only which addresses fill the groups
+    differs. Addresses, hashes and vote order are left out, so permuting
+    validators or renaming them does not change the signature.
+
+    Args:
+        transaction_results: Round results after idle replacement
+        budget: The transaction budget
+        params: The protocol parameters the plans are computed under
+
+    Returns:
+        A hashable signature
+    """
+    rounds: List[Hashable] = []
+    previous: Optional[dict] = None
+    previous_counts: Optional[np.ndarray] = None
+    for round_obj in transaction_results.rounds:
+        if not round_obj.rotations:
+            rounds.append(None)
+            previous, previous_counts = None, None
+            continue
+        votes = round_obj.rotations[-1].votes
+        _, _, codes = encode_votes(votes)
+        counts = np.bincount(codes, minlength=OTHER_VOTE_CODE + 1)
+        # Counts of the merged {**this, **previous} votes some round types pay
+        if previous is None:
+            merged = None
+        elif previous.keys().isdisjoint(votes.keys()):
+            merged = tuple((counts + previous_counts).tolist())
+        else:
+            merged = _code_counts(encode_votes({**votes, **previous})[2])
+        leader = _leader_key(next(iter(votes.values()))) if votes else None
+        rounds.append((leader, tuple(counts.tolist()), merged))
+        previous, previous_counts = votes, counts
+    return (
+        budget.leaderTimeout,
+        budget.validatorsTimeout,
+        len(budget.appeals or ()),
+        tuple(rounds),
+        params,
+    )
+
+
+class PayoutTemplate:
+    """
+    Round labels and resolved payout plans shared by every scenario with the
+    same signature.
+    """
+
+    __slots__ = ("labels", "plans")
+
+    def __init__(self, labels: List[RoundLabel], plans: List[RoundPlan]):
+        self.labels = labels
+        self.plans = plans
+
+    def round_payouts(
+        self,
+        transaction_results: TransactionRoundResults,
+        round_index: int,
+        budget: TransactionBudget,
+    ) -> Optional[RoundPayouts]:
+        """
+        The payout columns of one round for this scenario's concrete voters,
+        or None when the round pays nothing.
+        """
+        plan = self.plans[round_index]
+        if not plan.entries:
+            return None
+        kernel = get_round_kernel(plan.label)
+        addresses, normalized, codes = kernel.encode(transaction_results, round_index)
+        return kernel.emit(plan, addresses, normalized, codes, budget)
+
+    def round_events(
+        self,
+        transaction_results: TransactionRoundResults,
+        round_index: int,
+        budget: TransactionBudget,
+        event_sequence: EventSequence,
+        grouped: bool = False,
+    ) -> List[AnyFeeEvent]:
+        """
+        Emit the fee events of one round for this scenario's concrete voters.
+        """
+        payouts = self.round_payouts(transaction_results, round_index, budget)
+        if payouts is None:
+            return []
+        if grouped:
+            return payouts.to_bulk_fee_events(event_sequence)
+        return payouts.to_fee_events(event_sequence)
+
+
+def build_payout_template(
+    transaction_results: TransactionRoundResults,
+    budget: TransactionBudget,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> PayoutTemplate:
+    labels = label_rounds(transaction_results)
+    plans = []
+    for i in range(min(len(labels), len(transaction_results.rounds))):
+        kernel = get_round_kernel(labels[i])
+        if kernel.is_applicable(transaction_results, i, budget):
+            _, _, codes = kernel.encode(transaction_results, i)
+            plans.append(kernel.plan(codes, i, budget, params=params))
+        else:
+            plans.append(
+                kernel.plan(np.empty(0, dtype=np.int8), i, budget, False, params=params)
+            )
+    return PayoutTemplate(labels, plans)
+
+
+class PayoutTemplateCache:
+    """
+    LRU cache of payout templates keyed by scenario signature.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_TEMPLATE_CACHE_SIZE):
+        if maxsize <= 0:
+            raise ValueError("Cache size must be positive")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._templates: "OrderedDict[Hashable, PayoutTemplate]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def __contains__(self, signature: Hashable) -> bool:
+        return signature in self._templates
+
+    def clear(self) -> None:
+        self._templates.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def template_for(
+        self,
+        transaction_results: TransactionRoundResults,
+        budget: TransactionBudget,
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    ) -> PayoutTemplate:
+        signature = scenario_signature(transaction_results, budget, params)
+        template = self._templates.get(signature)
+        if template is not None:
+            self.hits += 1
+            self._templates.move_to_end(signature)
+            return template
+        self.misses += 1
+        template = build_payout_template(transaction_results, budget, params)
+        self._templates[signature] = template
+        if len(self._templates) > self.maxsize:
+            self._templates.popitem(last=False)
+        return template
@@ -0,0 +1,449 @@
+from collections import OrderedDict
+from itertools import filterfalse
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fee_simulator.models import (
+    FeeEvent,
+    TransactionBudget,
+    TransactionRoundResults,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.types import RoundLabel, Role
+from fee_simulator.ledger import label_class
+from fee_simulator.utils import apply_slash_rates, compute_total_cost, sample_stakes
+from fee_simulator.core.bond_computing import compute_appeal_bond
+from fee_simulator.core.round_labeling import label_rounds
+from fee_simulator.core.idleness import compute_idle_slash_rates
+from fee_simulator.core.deterministic_violation import (
+    compute_deterministic_slash_rates,
+)
+from fee_simulator.core.refunds import NOT_SENDER_FUNDED
+from fee_simulator.core.round_fee_distribution.rules import RoundPlan
+from fee_simulator.core.round_fee_distribution.distribute_round import (
+    get_round_kernel,
+)
+from fee_simulator.core.scenario_cache import (
+    DEFAULT_TEMPLATE_CACHE_SIZE,
+    PayoutTemplateCache,
+)
+
+AMOUNT_FIELDS = ("cost", "staked", "earned", "slashed", "burned")
+
+# Totals below this bound cannot overflow int64 accumulators
+_INT64_SAFE_BOUND = 2**62
+
+
+class TransactionOutcome:
+    """
+    Per-address totals of one transaction, as the fee events of the full
+    path would sum to, plus per-role totals, round labels and the refund.
+    """
+
+    def __init__(
+        self,
+        addresses: List[str],
+        amounts: Dict[str, np.ndarray],
+        role_totals: Dict[Optional[Role], Dict[str, int]],
+        labels: List[RoundLabel],
+        refund: int,
+        sender_address: str,
+    ):
+        self.addresses = addresses
+        self.cost = amounts["cost"]
+        self.staked = amounts["staked"]
+        self.earned = amounts["earned"]
+        self.slashed = amounts["slashed"]
+        self.burned = amounts["burned"]
+        self.role_totals = role_totals
+        self.labels = labels
+        self.refund = refund
+        self.sender_address = sender_address
+        self.index = {addr: i for i, addr in enumerate(addresses)}
+
+    @property
+    def net(self) -> np.ndarray:
+        return self.earned - self.cost
+
+    def totals(self, address: str) -> Dict[str, int]:
+        i = self.index.get(address)
+        if i is None:
+            return {name: 0 for name in AMOUNT_FIELDS}
+        return {name: int(getattr(self, name)[i]) for name in AMOUNT_FIELDS}
+
+
+def _integral_plan(plan: RoundPlan, budget: TransactionBudget) -> RoundPlan:
+    # Fee events hold integer amounts: a plan amount is stored as the
+    # FeeEvent emit would build stores it, and fails the same way
+    entries = tuple(
+        (
+            rule,
+            getattr(
+                FeeEvent(
+                    sequence_id=0, address=budget.senderAddress, **{rule.field: amount}
+                ),
+                rule.field,
+            ),
+            size,
+        )
+        for rule, amount, size in plan.entries
+        if size
+    )
+    return RoundPlan(plan.label, plan.round_index, plan.majority_code, entries)
+
+
+class _Accumulator:
+    # Running per-address and per-role sums, and what the refund needs
+
+    def __init__(self, sender_address: str, dtype, params: ProtocolParams):
+        self.sender_address = sender_address
+        self.params = params
+        self.dtype = dtype
+        self.index: Dict[str, int] = {}
+        self.amounts = {name: np.zeros(16, dtype=dtype) for name in AMOUNT_FIELDS}
+        self.role_totals: Dict[Optional[Role], Dict[str, int]] = {}
+        self.sender_funded_earned = 0
+        self.sender_cost = 0
+        # (round_index, label, earned) of every appealant payout
+        self.appealant_rows: List[Tuple[int, RoundLabel, int]] = []
+
+    def _grow(self) -> None:
+        # Double the columns until every indexed address has a row
+        capacity = len(self.amounts["cost"])
+        if len(self.index) <= capacity:
+            return
+        while capacity < len(self.index):
+            capacity *= 2
+        for name, column in self.amounts.items():
+            self.amounts[name] = np.concatenate(
+                [column, np.zeros(capacity - len(column), dtype=self.dtype)]
+            )
+
+    def position(self, address: str) -> int:
+        i = self.index.get(address)
+        if i is None:
+            i = self.index[address] = len(self.index)
+            self._grow()
+        return i
+
+    def positions(self, addresses) -> np.ndarray:
+        # Index the whole column first, then grow once
+        index = self.index
+        new = dict.fromkeys(filterfalse(index.__contains__, addresses))
+        index.update(zip(new, range(len(index), len(index) + len(new))))
+        self._grow()
+        return np.fromiter(
+            map(index.__getitem__, addresses), dtype=np.intp, count=len(addresses)
+        )
+
+    def _role_total(self, role: Optional[Role]) -> Dict[str, int]:
+        totals = self.role_totals.get(role)
+        if totals is None:
+            totals = self.role_totals[role] = {name: 0 for name in AMOUNT_FIELDS}
+        return totals
+
+    def add(
+        self,
+        address: str,
+        round_index: Optional[int] = None,
+        label: Optional[RoundLabel] = None,
+        role: Optional[Role] = None,
+        **amounts: int,
+    ) -> None:
+        i = self.position(address)
+        totals = self._role_total(role)
+        for name, amount in amounts.items():
+            self.amounts[name][i] += amount
+            totals[name] += amount
+        sender_funded = not NOT_SENDER_FUNDED & label_class(label)
+        earned = amounts.get("earned", 0)
+        if sender_funded:
+            self.sender_funded_earned += earned
+            if address == self.sender_address and role != "APPEALANT":
+                self.sender_cost += amounts.get("cost", 0)
+        if role == "APPEALANT":
+            self.appealant_rows.append((round_index, label, earned))
+
+    def add_stakes(self, addresses: List[str], stakes: List[int]) -> None:
+        positions = self.positions(addresses)  # may grow the columns
+        np.add.at(
+            self.amounts["staked"], positions, np.asarray(stakes, dtype=self.dtype)
+        )
+        self._role_total(None)["staked"] += sum(stakes)
+
+    def add_plan(
+        self,
+        plan: RoundPlan,
+        addresses: List[str],
+        codes: np.ndarray,
+        budget: TransactionBudget,
+    ) -> None:
+        # What add would record for every row emit would build from the plan
+        plan = _integral_plan(plan, budget)
+        earned_total = 0
+        pays_voters = False
+        for rule, amount, size in plan.entries:
+            self._role_total(rule.role)[rule.field] += amount * size
+            earned = amount if rule.field == "earned" else 0
+            earned_total += earned * size
+            if rule.role == "APPEALANT":
+                self.appealant_rows.extend(
+                    [(plan.round_index, plan.label, earned)] * size
+                )
+            if rule.recipients in ("SENDER", "APPEALANT"):
+                i = self.position(plan.fixed_recipient(rule, budget))
+                self.amounts[rule.field][i] += amount
+            else:
+                pays_voters = True
+        if pays_voters:
+            positions = self.positions(addresses)  # may grow the columns
+            earned, burned = plan.voter_amounts(codes, self.dtype)
+            np.add.at(self.amounts["earned"], positions, earned)
+            np.add.at(self.amounts["burned"], positions, burned)
+        if not NOT_SENDER_FUNDED & label_class(plan.label):
+            self.sender_funded_earned += earned_total
+
+    def sender_refund(self, budget: TransactionBudget) -> int:
+        # Same rules as compute_sender_refund, on running totals
+        total_paid_from_sender = self.sender_funded_earned
+        for round_index, label, earned in self.appealant_rows:
+            if not NOT_SENDER_FUNDED & label_class(label):
+                total_paid_from_sender -= earned
+            if earned > 0:
+                appeal_bond = compute_appeal_bond(
+                    normal_round_index=round_index - 1,
+                    leader_timeout=budget.leaderTimeout,
+                    validators_timeout=budget.validatorsTimeout,
+                    params=self.params,
+                )
+                total_paid_from_sender += earned - appeal_bond
+        refund = self.sender_cost - total_paid_from_sender
+        if refund < 0:
+            raise ValueError(
+                f"Total paid from sender is greater than sender cost: {total_paid_from_sender} > {self.sender_cost}"
+            )
+        return refund
+
+    def outcome(
+        self, labels: List[RoundLabel], refund: int, sender_address: str
+    ) -> TransactionOutcome:
+        n = len(self.index)
+        return TransactionOutcome(
+            addresses=list(self.index),
+            amounts={name: column[:n] for name, column in self.amounts.items()},
+            role_totals=self.role_totals,
+            labels=labels,
+            refund=refund,
+            sender_address=sender_address,
+        )
+
+
+def _initial_stakes(
+    addresses: List[str],
+    budget: TransactionBudget,
+    rng: np.random.Generator,
+    params: ProtocolParams,
+    stakes: Optional[Sequence[int]] = None,
+) -> List[int]:
+    # The stakes initialize_stakes would record, drawing the same numbers
+    if stakes is not None:
+        if len(stakes) != len(addresses):
+            raise ValueError("Addresses and stakes must have the same length")
+        return list(stakes)
+    if budget.staking_distribution == "constant":
+        return [params.default_stake] * len(addresses)
+    return sample_stakes(len(addresses), budget, rng, params).tolist()
+
+
+class SettlementTemplate:
+    """
+    The stake-independent part of a transaction's summary: the outcome with
+    nothing staked, and its slashes as rates taken from the stakes in order.
+    Any stakes of the same addresses settle from it without rerunning the
+    fee pipeline, and so do other addresses playing the same parts.
+    """
+
+    def __init__(
+        self,
+        outcome: TransactionOutcome,
+        stake_rows: np.ndarray,
+        slash_rates: List[Tuple[int, float]],
+        fixed_bound: int,
+    ):
+        self.base = outcome
+        self.stake_rows = stake_rows  # outcome row of every staked address
+        self.slash_rates = slash_rates  # (outcome row, rate), in event order
+        self.fixed_bound = fixed_bound
+
+    def outcome(
+        self, addresses: Sequence[str], stakes: Sequence[int]
+    ) -> TransactionOutcome:
+        """
+        The outcome of the transaction with these addresses and stakes.
+        """
+        if len(stakes) != len(addresses):
+            raise ValueError("Addresses and stakes must have the same length")
+        base = self.base
+        dtype = (
+            np.int64 if self.fixed_bound + sum(stakes) < _INT64_SAFE_BOUND else object
+        )
+        n = len(base.addresses)
+        staked = np.zeros(n, dtype=dtype)
+        np.add.at(staked, self.stake_rows, np.asarray(stakes, dtype=dtype))
+        slashes = apply_slash_rates(self.slash_rates, lambda row: int(staked[row]))
+        slashed = np.zeros(n, dtype=dtype)
+        if slashes:
+            rows, amounts = zip(*slashes)
+            np.add.at(slashed, list(rows), np.asarray(amounts, dtype=dtype))
+
+        role_totals = {role: dict(totals) for role, totals in base.role_totals.items()}
+        role_totals[None]["staked"] = sum(stakes)
+        role_totals[None]["slashed"] = sum(amount for _, amount in slashes)
+        outcome_addresses = list(base.addresses)
+        for row, address in zip(self.stake_rows.tolist(), addresses):
+            outcome_addresses[row] = address
+        return TransactionOutcome(
+            addresses=outcome_addresses,
+            amounts={
+                "cost": base.cost.astype(dtype),
+                "staked": staked,
+                "earned": base.earned.astype(dtype),
+                "slashed": slashed,
+                "burned": base.burned.astype(dtype),
+            },
+            role_totals=role_totals,
+            labels=base.labels,
+            refund=base.refund,
+            sender_address=base.sender_address,
+        )
+
+
+def build_settlement_template(
+    addresses: List[str],
+    transaction_results: TransactionRoundResults,
+    transaction_budget: TransactionBudget,
+    template_cache: Optional[PayoutTemplateCache] = None,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> SettlementTemplate:
+    total_cost = compute_total_cost(transaction_budget, params)
+    fixed_bound = 4 * total_cost * (transaction_budget.appealRounds + 1)
+    dtype = np.int64 if fixed_bound < _INT64_SAFE_BOUND else object
+
+    sender_address = transaction_budget.senderAddress
+    accumulator = _Accumulator(sender_address, dtype, params)
+    # Stakes only enter through SettlementTemplate.outcome
+    accumulator.add_stakes(addresses, [0] * len(addresses))
+    stake_rows = accumulator.positions(addresses)
+    accumulator.add(sender_address, role="SENDER", cost=total_cost)
+
+    replaced_results, idle_rates = compute_idle_slash_rates(transaction_results, params)
+    rates = idle_rates + compute_deterministic_slash_rates(replaced_results, params)
+    slash_rows = accumulator.positions([addr for addr, _ in rates]).tolist()
+    slash_rates = [(row, rate) for row, (_, rate) in zip(slash_rows, rates)]
+
+    if template_cache is not None:
+        template = template_cache.template_for(
+            replaced_results, transaction_budget, params
+        )
+        labels = template.labels
+    else:
+        template = None
+        labels = label_rounds(replaced_results)
+
+    for i in range(min(len(labels), len(replaced_results.rounds))):
+        if i % 2 == 1:
+            accumulator.add(
+                transaction_budget.appeals[i // 2].appealantAddress,
+                round_index=i,
+                label=labels[i],
+                role="APPEALANT",
+                cost=compute_appeal_bond(
+                    normal_round_index=i - 1,
+                    leader_timeout=transaction_budget.leaderTimeout,
+                    validators_timeout=transaction_budget.validatorsTimeout,
+                    params=params,
+                ),
+            )
+        kernel = get_round_kernel(labels[i])
+        if template is not None:
+            plan = template.plans[i]
+            if not plan.entries:
+                continue
+            addresses_i, _, codes = kernel.encode(replaced_results, i)
+        else:
+            plan, addresses_i, _, codes = kernel.resolve(
+                replaced_results, i, transaction_budget, params=params
+            )
+        accumulator.add_plan(plan, addresses_i, codes, transaction_budget)
+
+    refund = accumulator.sender_refund(transaction_budget)
+    accumulator.add(sender_address, role="SENDER", earned=refund)
+    return SettlementTemplate(
+        accumulator.outcome(labels, refund, sender_address),
+        stake_rows,
+        slash_rates,
+        fixed_bound,
+    )
+
+
+class SettlementTemplateCache:
+    """
+    LRU cache of settlement templates keyed by the caller: transactions
+    sharing a key may differ only in which addresses play each part.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_TEMPLATE_CACHE_SIZE):
+        if maxsize <= 0:
+            raise ValueError("Cache size must be positive")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._templates: "OrderedDict[Hashable, SettlementTemplate]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def template_for(
+        self,
+        key: Hashable,
+        addresses: List[str],
+        transaction_results: TransactionRoundResults,
+        transaction_budget: TransactionBudget,
+        template_cache: Optional[PayoutTemplateCache] = None,
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    ) -> SettlementTemplate:
+        template = self._templates.get(key)
+        if template is not None:
+            self.hits += 1
+            self._templates.move_to_end(key)
+            return template
+        self.misses += 1
+        template = build_settlement_template(
+            addresses, transaction_results, transaction_budget, template_cache, params
+        )
+        self._templates[key] = template
+        if len(self._templates) > self.maxsize:
+            self._templates.popitem(last=False)
+        return template
+
+
+def process_transaction_summary(
+    addresses: List[str],
+    transaction_results: TransactionRoundResults,
+    transaction_budget: TransactionBudget,
+    rng: np.random.Generator,
+    template_cache: Optional[PayoutTemplateCache] = None,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    stakes: Optional[Sequence[int]] = None,
+) -> TransactionOutcome:
+    """
+    The fee pipeline of process_transaction accumulated straight into
+    per-address totals, without building any FeeEvent.
+    """
+    stakes = _initial_stakes(addresses, transaction_budget, rng, params, stakes)
+    template = build_settlement_template(
+        addresses, transaction_results, transaction_budget, template_cache, params
+    )
+    return template.outcome(addresses, stakes)
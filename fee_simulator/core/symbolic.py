@@ -0,0 +1,377 @@
+from fractions import Fraction
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from fee_simulator.models import (
+    TransactionBudget,
+    TransactionRoundResults,
+    EventSequence,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.types import RoundLabel
+from fee_simulator.ledger import FeeEventLedger, label_class
+from fee_simulator.utils import compute_total_cost
+from fee_simulator.core.idleness import replace_idle_participants
+from fee_simulator.core.round_labeling import label_rounds
+from fee_simulator.core.refunds import NOT_SENDER_FUNDED
+from fee_simulator.core.round_fee_distribution.rules import RuleContext
+from fee_simulator.core.round_fee_distribution.distribute_round import (
+    get_round_kernel,
+)
+
+Scalar = Union[int, float, Fraction]
+
+
+def _fraction(value: Scalar) -> Fraction:
+    return value if isinstance(value, Fraction) else Fraction(value)
+
+
+class LinearForm:
+    """
+    An amount a·leaderTimeout + b·validatorsTimeout + c with exact coefficients.
+    """
+
+    __slots__ = ("leader", "validators", "constant")
+
+    def __init__(
+        self, leader: Scalar = 0, validators: Scalar = 0, constant: Scalar = 0
+    ):
+        self.leader = _fraction(leader)
+        self.validators = _fraction(validators)
+        self.constant = _fraction(constant)
+
+    @classmethod
+    def of(cls, value: Union["LinearForm", Scalar]) -> "LinearForm":
+        return value if isinstance(value, LinearForm) else cls(constant=value)
+
+    def __add__(self, other):
+        other = LinearForm.of(other)
+        return LinearForm(
+            self.leader + other.leader,
+            self.validators + other.validators,
+            self.constant + other.constant,
+        )
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return LinearForm(-self.leader, -self.validators, -self.constant)
+
+    def __sub__(self, other):
+        return self + (-LinearForm.of(other))
+
+    def __rsub__(self, other):
+        return LinearForm.of(other) - self
+
+    def __mul__(self, scalar: Scalar):
+        if isinstance(scalar, LinearForm):
+            raise TypeError("Product of two linear forms is not linear")
+        scalar = _fraction(scalar)
+        return LinearForm(
+            self.leader * scalar, self.validators * scalar, self.constant * scalar
+        )
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar: Scalar):
+        return self * (1 / _fraction(scalar))
+
+    def __eq__(self, other):
+        if not isinstance(other, (LinearForm, int, float, Fraction)):
+            return NotImplemented
+        other = LinearForm.of(other)
+        return self.coefficients() == other.coefficients()
+
+    def __hash__(self):
+        return hash(self.coefficients())
+
+    def __bool__(self):
+        return any(self.coefficients())
+
+    def __repr__(self):
+        return (
+            f"LinearForm(leader={self.leader}, validators={self.validators}, "
+            f"constant={self.constant})"
+        )
+
+    def coefficients(self) -> Tuple[Fraction, Fraction, Fraction]:
+        return (self.leader, self.validators, self.constant)
+
+    def evaluate(self, leader_timeout: Scalar, validators_timeout: Scalar) -> Fraction:
+        return (
+            self.leader * leader_timeout
+            + self.validators * validators_timeout
+            + self.constant
+        )
+
+
+LEADER_TIMEOUT = LinearForm(leader=1)
+VALIDATORS_TIMEOUT = LinearForm(validators=1)
+
+
+def symbolic_appeal_bond(
+    normal_round_index: int, params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS
+) -> LinearForm:
+    """
+    compute_appeal_bond as a linear form (its max(..., 0) never binds).
+    """
+    round_sizes = params.round_sizes
+    if (
+        normal_round_index % 2 != 0
+        or normal_round_index < 0
+        or normal_round_index >= len(round_sizes)
+    ):
+        raise ValueError(f"Invalid normal round index: {normal_round_index}")
+    next_normal_size = (
+        round_sizes[normal_round_index + 2]
+        if normal_round_index + 2 < len(round_sizes)
+        else 0
+    )
+    return next_normal_size * VALIDATORS_TIMEOUT + LEADER_TIMEOUT
+
+
+class SymbolicRuleContext(RuleContext):
+    """
+    RuleContext whose timeouts are linear forms.
+
+    Splits round down per budget (split_amount to whole 10**18 units,
+    floor_split to whole units), which no linear form can follow, so a split
+    of an amount that depends on the timeouts raises ValueError; only splits
+    that are exact for every budget are priced.
+    """
+
+    def __init__(
+        self,
+        budget,
+        round_index,
+        n_voters,
+        n_majority,
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    ):
+        super().__init__(budget, round_index, n_voters, n_majority, params)
+        self.leader_timeout = LEADER_TIMEOUT
+        self.validators_timeout = VALIDATORS_TIMEOUT
+
+    def appeal_bond(self, normal_round_index: int) -> LinearForm:
+        return symbolic_appeal_bond(normal_round_index, self.params)
+
+    @staticmethod
+    def _constant(amount: LinearForm):
+        # The integer an amount is for every budget, if it is one
+        if amount.leader or amount.validators or amount.constant.denominator != 1:
+            return None
+        return int(amount.constant)
+
+    def split(self, amount, num_recipients: int) -> LinearForm:
+        amount = LinearForm.of(amount)
+        constant = self._constant(amount)
+        if constant is None:
+            raise ValueError(
+                f"Cannot split {amount} among {num_recipients} symbolically: "
+                "split_amount rounds down per budget"
+            )
+        return LinearForm(constant=super().split(constant, num_recipients))
+
+    def floor_split(self, amount, num_recipients: int) -> LinearForm:
+        amount = LinearForm.of(amount)
+        constant = self._constant(amount)
+        if constant is not None:
+            return LinearForm(constant=super().floor_split(constant, num_recipients))
+        integral = all(c.denominator == 1 for c in amount.coefficients())
+        if num_recipients == 1 and integral:
+            return amount
+        raise ValueError(
+            f"Cannot split {amount} among {num_recipients} symbolically: "
+            "floor_split rounds down per budget"
+        )
+
+
+class _SymbolicBudget:
+    # Read-only stand-in for TransactionBudget inside compute_total_cost
+    def __init__(self, budget: TransactionBudget):
+        self.leaderTimeout = LEADER_TIMEOUT
+        self.validatorsTimeout = VALIDATORS_TIMEOUT
+        self.appealRounds = budget.appealRounds
+        self.rotations = budget.rotations
+
+
+class SymbolicOutcome:
+    """
+    Per-address coefficient vectors [leaderTimeout, validatorsTimeout, 1] of
+    earned, cost and burned amounts for one vote scenario.
+    """
+
+    def __init__(
+        self,
+        addresses: List[str],
+        earned: np.ndarray,
+        cost: np.ndarray,
+        burned: np.ndarray,
+        labels: List[RoundLabel],
+        refund: LinearForm,
+        sender_address: str,
+    ):
+        self.addresses = addresses
+        self.earned = earned
+        self.cost = cost
+        self.burned = burned
+        self.labels = labels
+        self.refund = refund
+        self.sender_address = sender_address
+        self.index = {addr: i for i, addr in enumerate(addresses)}
+
+    @property
+    def net(self) -> np.ndarray:
+        return self.earned - self.cost
+
+    def evaluate(
+        self,
+        leader_timeouts: Union[Sequence[float], np.ndarray],
+        validators_timeouts: Union[Sequence[float], np.ndarray],
+    ) -> Dict[str, np.ndarray]:
+        """
+        Price a grid of budgets at once.
+
+        Returns:
+            Arrays of shape (n_addresses, n_budgets) for earned, cost, burned
+            and net, plus the sender refund per budget
+        """
+        budgets = budget_matrix(leader_timeouts, validators_timeouts)
+        refund = np.array([float(c) for c in self.refund.coefficients()], dtype=float)
+        return {
+            "earned": self.earned @ budgets,
+            "cost": self.cost @ budgets,
+            "burned": self.burned @ budgets,
+            "net": self.net @ budgets,
+            "refund": refund @ budgets,
+        }
+
+
+def budget_matrix(
+    leader_timeouts: Union[Sequence[float], np.ndarray],
+    validators_timeouts: Union[Sequence[float], np.ndarray],
+) -> np.ndarray:
+    leader_timeouts = np.asarray(leader_timeouts, dtype=float)
+    validators_timeouts = np.asarray(validators_timeouts, dtype=float)
+    if leader_timeouts.shape != validators_timeouts.shape:
+        raise ValueError("leader and validators timeouts must have the same shape")
+    return np.stack(
+        [leader_timeouts, validators_timeouts, np.ones_like(leader_timeouts)]
+    )
+
+
+def process_transaction_symbolic(
+    addresses: List[str],
+    transaction_results: TransactionRoundResults,
+    transaction_budget: TransactionBudget,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> SymbolicOutcome:
+    """
+    Run the fee pipeline once with leaderTimeout and validatorsTimeout kept
+    symbolic. Stakes and slashing do not depend on them and are left out.
+    Raises ValueError for rounds that split an amount depending on them
+    (see SymbolicRuleContext).
+    """
+    replace_idle_transaction_results, _ = replace_idle_participants(
+        event_sequence=EventSequence(),
+        fee_events=FeeEventLedger(),
+        transaction_results=transaction_results,
+        params=params,
+    )
+    labels = label_rounds(replace_idle_transaction_results)
+
+    # (address, round_index, label, role, cost, earned, burned) in emission order
+    rows: List[tuple] = []
+    zero = LinearForm()
+    sender_address = transaction_budget.senderAddress
+    rows.append(
+        (
+            sender_address,
+            None,
+            None,
+            "SENDER",
+            compute_total_cost(_SymbolicBudget(transaction_budget), params),
+            zero,
+            zero,
+        )
+    )
+    for i in range(min(len(labels), len(replace_idle_transaction_results.rounds))):
+        if i % 2 == 1:
+            rows.append(
+                (
+                    transaction_budget.appeals[i // 2].appealantAddress,
+                    i,
+                    labels[i],
+                    "APPEALANT",
+                    symbolic_appeal_bond(i - 1, params),
+                    zero,
+                    zero,
+                )
+            )
+        payouts = get_round_kernel(labels[i]).payouts(
+            replace_idle_transaction_results,
+            i,
+            transaction_budget,
+            context_type=SymbolicRuleContext,
+            params=params,
+        )
+        for address, role, earned, burned in zip(
+            payouts.address, payouts.role, payouts.earned, payouts.burned
+        ):
+            rows.append(
+                (
+                    address,
+                    i,
+                    labels[i],
+                    role,
+                    zero,
+                    LinearForm.of(earned),
+                    LinearForm.of(burned),
+                )
+            )
+
+    # Same rules as compute_sender_refund
+    sender_cost = LinearForm()
+    total_paid_from_sender = LinearForm()
+    for address, round_index, label, role, cost, earned, _ in rows:
+        if role == "APPEALANT":
+            if earned:
+                total_paid_from_sender += earned - symbolic_appeal_bond(
+                    round_index - 1, params
+                )
+            continue
+        if NOT_SENDER_FUNDED & label_class(label):
+            continue
+        if address == sender_address:
+            sender_cost += cost
+        total_paid_from_sender += earned
+    refund = sender_cost - total_paid_from_sender
+    rows.append((sender_address, None, None, "SENDER", zero, refund, zero))
+
+    all_addresses = list(dict.fromkeys(row[0] for row in rows))
+    index = {addr: i for i, addr in enumerate(all_addresses)}
+    coefficients = {
+        name: np.zeros((len(all_addresses), 3), dtype=float)
+        for name in ("cost", "earned", "burned")
+    }
+    exact = {name: [LinearForm() for _ in all_addresses] for name in coefficients}
+    for address, _, _, _, cost, earned, burned in rows:
+        i = index[address]
+        exact["cost"][i] += cost
+        exact["earned"][i] += earned
+        exact["burned"][i] += burned
+    for name, forms in exact.items():
+        for i, form in enumerate(forms):
+            coefficients[name][i] = [float(c) for c in form.coefficients()]
+
+    return SymbolicOutcome(
+        addresses=all_addresses,
+        earned=coefficients["earned"],
+        cost=coefficients["cost"],
+        burned=coefficients["burned"],
+        labels=labels,
+        refund=refund,
+        sender_address=sender_address,
+    )
@@ -1,40 +1,145 @@
-from typing import List
+from concurrent.futures import Executor
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
 
 from fee_simulator.models import (
     TransactionBudget,
     TransactionRoundResults,
     FeeEvent,
+    AnyFeeEvent,
     EventSequence,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
 )
+from fee_simulator.ledger import FeeEventLedger
 
 from fee_simulator.types import (
     RoundLabel,
+    ProcessingMode,
 )
 
 from fee_simulator.utils import (
     compute_total_cost,
-    initialize_constant_stakes,
+    initialize_stakes,
 )
+from fee_simulator.rng import DEFAULT_ROOT_SEED, transaction_rng
 
 from fee_simulator.core.bond_computing import compute_appeal_bond
 from fee_simulator.core.round_labeling import label_rounds
 from fee_simulator.core.idleness import replace_idle_participants
 from fee_simulator.core.deterministic_violation import handle_deterministic_violations
 from fee_simulator.core.round_fee_distribution.distribute_round import distribute_round
+from fee_simulator.core.round_fee_distribution.parallel import (
+    prepare_round,
+    emit_round,
+)
 from fee_simulator.core.refunds import compute_sender_refund
+from fee_simulator.core.symbolic import SymbolicOutcome, process_transaction_symbolic
+from fee_simulator.core.scenario_cache import PayoutTemplateCache
+from fee_simulator.core.summary import TransactionOutcome, process_transaction_summary
+
+# Options of process_transaction each mode would otherwise ignore
+_UNSUPPORTED_OPTIONS = {
+    "symbolic": ("rng", "template_cache", "executor", "grouped", "stakes"),
+    "summary": ("executor", "grouped"),
+}
 
 
 def process_transaction(
     addresses: List[str],
     transaction_results: TransactionRoundResults,
     transaction_budget: TransactionBudget,
-) -> tuple[List[FeeEvent], List[RoundLabel]]:
+    rng: Optional[np.random.Generator] = None,
+    mode: ProcessingMode = "events",
+    template_cache: Optional[PayoutTemplateCache] = None,
+    executor: Optional[Executor] = None,
+    grouped: bool = False,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    stakes: Optional[Sequence[int]] = None,
+) -> Union[
+    tuple[List[AnyFeeEvent], List[RoundLabel]], SymbolicOutcome, TransactionOutcome
+]:
+    """
+    Run the fee pipeline for one transaction.
+
+    mode="events" returns the fee events and round labels; mode="symbolic"
+    returns a SymbolicOutcome whose amounts are linear in leaderTimeout and
+    validatorsTimeout, to price many budgets for the same votes at once.
+    mode="summary" returns a TransactionOutcome with per-address totals
+    equal to what the events would sum to, without building any FeeEvent.
+
+    With a template_cache, round labels and payout amounts are looked up by
+    scenario signature and only the events for this scenario's addresses are
+    built, which pays off when many transactions share vote patterns.
+
+    With an executor (see round_executor), rounds are distributed
+    concurrently after labeling. Each round gets a sequence block of its
+    exact event count, so the events are identical to the serial path;
+    this pays off for deep appeals with rounds of hundreds of voters.
+
+    With grouped=True, identical payouts to several voters of a round are
+    emitted as one BulkFeeEvent; expand_fee_events gives the individual
+    events, identical to the ungrouped ones.
 
+    params holds the protocol constants (round sizes, penalty coefficient,
+    default stake and slash rates); it is part of template cache keys.
+
+    stakes, when given, are the initial stakes of the addresses, in place of
+    the budget's staking distribution; slashing is a share of them. Stakes
+    drawn from a sampled distribution need an explicit rng (see
+    fee_simulator.rng.transaction_rng), so that separate transactions do not
+    silently draw the same stakes; constant stakes draw nothing.
+
+    Options a mode cannot honor raise ValueError: symbolic mode leaves
+    stakes out and takes none of rng, template_cache, executor, grouped and
+    stakes; summary mode builds no events and takes neither executor nor
+    grouped.
+    """
+    options = {
+        "rng": rng is not None,
+        "template_cache": template_cache is not None,
+        "executor": executor is not None,
+        "grouped": grouped,
+        "stakes": stakes is not None,
+    }
+    unsupported = [
+        name
+        for name, given in options.items()
+        if given and name in _UNSUPPORTED_OPTIONS.get(mode, ())
+    ]
+    if unsupported:
+        raise ValueError(f"mode={mode!r} does not support {', '.join(unsupported)}")
+    if mode == "symbolic":
+        return process_transaction_symbolic(
+            addresses, transaction_results, transaction_budget, params
+        )
+    if rng is None:
+        if stakes is None and transaction_budget.staking_distribution != "constant":
+            raise ValueError(
+                f"staking_distribution={transaction_budget.staking_distribution!r}"
+                " needs an rng to draw stakes"
+            )
+        rng = transaction_rng(DEFAULT_ROOT_SEED, 0)
+    if mode == "summary":
+        return process_transaction_summary(
+            addresses,
+            transaction_results,
+            transaction_budget,
+            rng,
+            template_cache,
+            params,
+            stakes,
+        )
     event_sequence = EventSequence()  # singleton
-    fee_events = []  # list of immutable objects that can be audited
+    fee_events = FeeEventLedger()  # list of immutable objects that can be audited
 
     # Initialize stakes
-    fee_events.extend(initialize_constant_stakes(event_sequence, addresses))
+    fee_events.extend(
+        initialize_stakes(
+            event_sequence, addresses, transaction_budget, rng, params, stakes
+        )
+    )
 
     # Subtract total cost from sender address
     sender_address = transaction_budget.senderAddress
@@ -43,31 +148,38 @@ def process_transaction(
             sequence_id=event_sequence.next_id(),
             address=sender_address,
             role="SENDER",
-            cost=compute_total_cost(transaction_budget),
+            cost=compute_total_cost(transaction_budget, params),
         )
     )
 
     # Replace idle validators and slash them
-    replace_idle_transaction_results, replace_idle_fee_events = (
-        replace_idle_participants(
-            event_sequence=event_sequence,
-            fee_events=fee_events,
-            transaction_results=transaction_results,
-        )
+    replace_idle_transaction_results, idle_fee_events = replace_idle_participants(
+        event_sequence=event_sequence,
+        fee_events=fee_events,
+        transaction_results=transaction_results,
+        params=params,
     )
-    fee_events = replace_idle_fee_events
+    fee_events.extend(idle_fee_events)
 
     # Handle deterministic violations (hash mismatches)
     fee_events.extend(
         handle_deterministic_violations(
-            replace_idle_transaction_results, event_sequence
+            replace_idle_transaction_results, event_sequence, fee_events, params
         )
     )
 
     # Get labels for all rounds
-    labels = label_rounds(replace_idle_transaction_results)
+    if template_cache is not None:
+        template = template_cache.template_for(
+            replace_idle_transaction_results, transaction_budget, params
+        )
+        labels = template.labels
+    else:
+        template = None
+        labels = label_rounds(replace_idle_transaction_results)
 
     # Process each round with its label
+    pending = []
     for i, round_obj in enumerate(replace_idle_transaction_results.rounds):
         if i < len(labels):
 
@@ -78,28 +190,72 @@ def process_transaction(
                     normal_round_index=i - 1,
                     leader_timeout=transaction_budget.leaderTimeout,
                     validators_timeout=transaction_budget.validatorsTimeout,
+                    params=params,
+                )
+                bond_event = FeeEvent(
+                    sequence_id=event_sequence.next_id(),
+                    round_index=i,
+                    round_label=labels[i],
+                    role="APPEALANT",
+                    address=appealant_address,
+                    cost=bond,
+                )
+                if executor is None:
+                    fee_events.append(bond_event)
+            else:
+                bond_event = None
+
+            if executor is not None:
+                # Reserve this round's ids now and emit its events concurrently
+                job = prepare_round(
+                    replace_idle_transaction_results,
+                    i,
+                    labels[i],
+                    transaction_budget,
+                    plan=template.plans[i] if template is not None else None,
+                    params=params,
                 )
-                fee_events.append(
-                    FeeEvent(
-                        sequence_id=event_sequence.next_id(),
-                        round_index=i,
-                        round_label=labels[i],
-                        role="APPEALANT",
-                        address=appealant_address,
-                        cost=bond,
+                block = event_sequence.reserve(job.size)
+                future = (
+                    executor.submit(
+                        emit_round, job, transaction_budget, block, grouped, params
                     )
+                    if job.size
+                    else None
                 )
+                pending.append((bond_event, future))
+                continue
 
-            round_fee_events = distribute_round(
-                transaction_results=replace_idle_transaction_results,
-                round_index=i,
-                label=labels[i],
-                budget=transaction_budget,
-                event_sequence=event_sequence,
-            )
+            if template is not None:
+                round_fee_events = template.round_events(
+                    replace_idle_transaction_results,
+                    i,
+                    transaction_budget,
+                    event_sequence,
+                    grouped,
+                )
+            else:
+                round_fee_events = distribute_round(
+                    transaction_results=replace_idle_transaction_results,
+                    round_index=i,
+                    label=labels[i],
+                    budget=transaction_budget,
+                    event_sequence=event_sequence,
+                    grouped=grouped,
+                    params=params,
+                )
             fee_events.extend(round_fee_events)
 
-    refunds = compute_sender_refund(sender_address, fee_events, transaction_budget)
+    # Collect concurrently distributed rounds in round order
+    for bond_event, future in pending:
+        if bond_event is not None:
+            fee_events.append(bond_event)
+        if future is not None:
+            fee_events.extend(future.result())
+
+    refunds = compute_sender_refund(
+        sender_address, fee_events, transaction_budget, params
+    )
     fee_events.append(
         FeeEvent(
             sequence_id=event_sequence.next_id(),
@@ -1,5 +1,5 @@
 from typing import List
-from fee_simulator.models import FeeEvent
+from fee_simulator.models import AnyFeeEvent, expand_fee_events
 from fee_simulator.display.utils import (
     Colors,
     ROUND_LABEL_COLORS,
@@ -19,7 +19,9 @@ from fee_simulator.fee_aggregators.address_metrics import (
 )
 
 
-def display_fee_distribution(fee_events: List[FeeEvent], verbose: bool = False) -> None:
+def display_fee_distribution(
+    fee_events: List[AnyFeeEvent], verbose: bool = False
+) -> None:
     """
     Display a formatted table of fee events with a summary of totals, excluding initial staking events.
 
@@ -30,6 +32,7 @@ def display_fee_distribution(fee_events: List[FeeEvent], verbose: bool = False)
     print(
         f"\n{Colors.BOLD}{Colors.HEADER}=== DEBUG: FEE EVENT DISTRIBUTION ==={Colors.ENDC}\n"
     )
+    fee_events = expand_fee_events(fee_events)
 
     # Prepare table headers
     headers = [
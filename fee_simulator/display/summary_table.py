@@ -2,9 +2,12 @@ from typing import List
 from tabulate import tabulate
 from fee_simulator.models import (
     TransactionRoundResults,
-    FeeEvent,
+    AnyFeeEvent,
     TransactionBudget,
+    expand_fee_events,
     RoundLabel,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
 )
 from fee_simulator.display.utils import (
     Colors,
@@ -25,15 +28,15 @@ from fee_simulator.fee_aggregators.address_metrics import (
     compute_current_stake,
     compute_all_zeros,
 )
-from fee_simulator.constants import DEFAULT_STAKE
 
 
 def display_summary_table(
-    fee_events: List[FeeEvent],
+    fee_events: List[AnyFeeEvent],
     transaction_results: TransactionRoundResults,
     transaction_budget: TransactionBudget,
     round_labels: List[RoundLabel],
     verbose: bool = False,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
 ) -> None:
     """
     Display a summary table of fee events with votes per round, and transaction budget and round labels side by side below.
@@ -44,8 +47,10 @@ def display_summary_table(
         transaction_budget: Transaction budget parameters.
         round_labels: List of round labels.
         verbose: Enable detailed logging if True (currently unused).
+        params: Protocol parameters the fee events were computed with.
     """
     print(f"\n{Colors.BOLD}{Colors.HEADER}=== SUMMARY TABLE ==={Colors.ENDC}\n")
+    fee_events = expand_fee_events(fee_events)
 
     # Collect active addresses
     active_addresses = {
@@ -147,7 +152,7 @@ def display_summary_table(
             }
         )
 
-        if staked < (DEFAULT_STAKE * 0.99):
+        if staked < params.default_stake * (1 - params.idle_slash_rate):
             addr_short += Colors.colorize(" [SLASHED]", Colors.RED)
 
         # Format votes per round
@@ -1,50 +1,62 @@
 from typing import List
 
-from fee_simulator.models import FeeEvent
+from fee_simulator.models import AnyFeeEvent
+from fee_simulator.ledger import FeeEventLedger
 
 
-def compute_current_stake(address: str, fee_events: List[FeeEvent]) -> float:
+def compute_current_stake(address: str, fee_events: List[AnyFeeEvent]) -> float:
+    if isinstance(fee_events, FeeEventLedger):
+        bucket = fee_events.address_bucket(address)
+        return bucket.staked - bucket.slashed
     current_stake = 0
     for event in fee_events:
-        if event.address == address:
+        if address in event.addresses:
             current_stake += event.staked
             current_stake -= event.slashed
     return current_stake
 
 
-def compute_total_costs(fee_events: List[FeeEvent], address: str) -> float:
+def compute_total_costs(fee_events: List[AnyFeeEvent], address: str) -> float:
+    if isinstance(fee_events, FeeEventLedger):
+        return fee_events.address_bucket(address).cost
     total_costs = 0
     for event in fee_events:
-        if event.address == address:
+        if address in event.addresses:
             total_costs += event.cost
     return total_costs
 
 
-def compute_total_earnings(fee_events: List[FeeEvent], address: str) -> float:
+def compute_total_earnings(fee_events: List[AnyFeeEvent], address: str) -> float:
+    if isinstance(fee_events, FeeEventLedger):
+        return fee_events.address_bucket(address).earned
     total_earnings = 0
     for event in fee_events:
-        if event.address == address:
+        if address in event.addresses:
             total_earnings += event.earned
     return total_earnings
 
 
-def compute_total_burnt(fee_events: List[FeeEvent], address: str) -> float:
+def compute_total_burnt(fee_events: List[AnyFeeEvent], address: str) -> float:
+    if isinstance(fee_events, FeeEventLedger):
+        return fee_events.address_bucket(address).burned
     total_burnt = 0
     for event in fee_events:
-        if event.address == address:
+        if address in event.addresses:
             total_burnt += event.burned
     return total_burnt
 
 
-def compute_total_slashed(fee_events: List[FeeEvent], address: str) -> float:
+def compute_total_slashed(fee_events: List[AnyFeeEvent], address: str) -> float:
+    if isinstance(fee_events, FeeEventLedger):
+        return fee_events.address_bucket(address).slashed
     total_slashed = 0
     for event in fee_events:
-        if event.address == address:
+        if address in event.addresses:
             total_slashed += event.slashed
     return total_slashed
 
 
-def compute_all_zeros(fee_events: List[FeeEvent], address: str) -> bool:
+def compute_all_zeros(fee_events: List[AnyFeeEvent], address: str) -> bool:
     return (
         compute_total_costs(fee_events, address) == 0
         and compute_total_earnings(fee_events, address) == 0
@@ -53,31 +65,33 @@ def compute_all_zeros(fee_events: List[FeeEvent], address: str) -> bool:
     )
 
 
-def compute_total_balance(fee_events: List[FeeEvent], address: str) -> float:
+def compute_total_balance(fee_events: List[AnyFeeEvent], address: str) -> float:
     costs = compute_total_costs(fee_events, address)
     earnings = compute_total_earnings(fee_events, address)
     return earnings - costs
 
 
-def compute_txn_costs(fee_events: List[FeeEvent]) -> float:
-    return sum(event.cost for event in fee_events)
+def compute_txn_costs(fee_events: List[AnyFeeEvent]) -> float:
+    return sum(event.cost * event.size for event in fee_events)
 
 
-def compute_txn_earnings(fee_events: List[FeeEvent]) -> float:
-    return sum(event.earned for event in fee_events)
+def compute_txn_earnings(fee_events: List[AnyFeeEvent]) -> float:
+    return sum(event.earned * event.size for event in fee_events)
 
 
-def compute_txn_burnt(fee_events: List[FeeEvent]) -> float:
-    return sum(event.burned for event in fee_events)
+def compute_txn_burnt(fee_events: List[AnyFeeEvent]) -> float:
+    return sum(event.burned * event.size for event in fee_events)
 
 
-def compute_txn_slashed(fee_events: List[FeeEvent]) -> float:
-    return sum(event.slashed for event in fee_events)
+def compute_txn_slashed(fee_events: List[AnyFeeEvent]) -> float:
+    return sum(event.slashed * event.size for event in fee_events)
 
 
-def compute_txn_balance(fee_events: List[FeeEvent]) -> float:
+def compute_txn_balance(fee_events: List[AnyFeeEvent]) -> float:
     return compute_txn_earnings(fee_events) - compute_txn_costs(fee_events)
 
 
-def compute_txn_appealants_burnt(fee_events: List[FeeEvent]) -> float:
-    return sum(event.burned for event in fee_events if event.role == "APPEALANT")
+def compute_txn_appealants_burnt(fee_events: List[AnyFeeEvent]) -> float:
+    return sum(
+        event.burned * event.size for event in fee_events if event.role == "APPEALANT"
+    )
@@ -1,18 +1,20 @@
-from fee_simulator.models import FeeEvent
+from fee_simulator.models import AnyFeeEvent
 from typing import List
 
 
-def compute_agg_costs(fee_events: List[FeeEvent]) -> float:
-    return sum(event.cost for event in fee_events)
+def compute_agg_costs(fee_events: List[AnyFeeEvent]) -> float:
+    return sum(event.cost * event.size for event in fee_events)
 
 
-def compute_agg_earnings(fee_events: List[FeeEvent]) -> float:
-    return sum(event.earned for event in fee_events)
+def compute_agg_earnings(fee_events: List[AnyFeeEvent]) -> float:
+    return sum(event.earned * event.size for event in fee_events)
 
 
-def compute_agg_burnt(fee_events: List[FeeEvent]) -> float:
-    return sum(event.burned for event in fee_events)
+def compute_agg_burnt(fee_events: List[AnyFeeEvent]) -> float:
+    return sum(event.burned * event.size for event in fee_events)
 
 
-def compute_agg_appealant_burnt(fee_events: List[FeeEvent]) -> float:
-    return sum(event.burned for event in fee_events if event.role == "APPEALANT")
+def compute_agg_appealant_burnt(fee_events: List[AnyFeeEvent]) -> float:
+    return sum(
+        event.burned * event.size for event in fee_events if event.role == "APPEALANT"
+    )
@@ -0,0 +1,152 @@
+import itertools
+from collections import defaultdict
+from typing import Dict, List
+
+from fee_simulator.models import AnyFeeEvent, TransactionBudget, TransactionRoundResults
+from fee_simulator.ledger import FeeEventLedger
+from fee_simulator.fee_aggregators.aggregated import (
+    compute_agg_costs,
+    compute_agg_earnings,
+    compute_agg_burnt,
+    compute_agg_appealant_burnt,
+)
+from fee_simulator.fee_aggregators.address_metrics import (
+    compute_total_costs,
+    compute_total_earnings,
+)
+
+
+class InvariantViolation(AssertionError):
+    """
+    Raised when fee events break a protocol invariant.
+    """
+
+    def __init__(self, invariant: str, message: str):
+        super().__init__(f"{invariant}: {message}")
+        self.invariant = invariant
+        self.message = message
+
+
+def check_costs_equal_earnings(
+    fee_events: List[AnyFeeEvent], tolerance: int = 5
+) -> None:
+    appealant_burnt = compute_agg_appealant_burnt(fee_events)
+    costs = compute_agg_costs(fee_events)
+    earnings = compute_agg_earnings(fee_events)
+    if not abs(costs - earnings - appealant_burnt) < tolerance:
+        raise InvariantViolation(
+            "costs_equal_earnings",
+            f"costs {costs} != earnings {earnings} + appealant burnt {appealant_burnt}",
+        )
+
+
+def check_party_safety(fee_events: List[AnyFeeEvent], party: List[str]) -> None:
+    party_acc_costs = 0
+    party_acc_earnings = 0
+    for address in party:
+        addr_costs = compute_total_costs(fee_events, address)
+        addr_earnings = compute_total_earnings(fee_events, address)
+        party_acc_costs += addr_costs
+        party_acc_earnings += addr_earnings
+    if party_acc_costs < party_acc_earnings:
+        raise InvariantViolation(
+            "party_safety",
+            f"party {party} earns {party_acc_earnings} for costs {party_acc_costs}",
+        )
+
+
+def check_no_free_burn(fee_events: List[AnyFeeEvent]) -> None:
+    # Check that noone can burn more of what is costing
+    total_costs = compute_agg_costs(fee_events)
+    total_burnt = compute_agg_burnt(fee_events)
+    if not total_burnt < total_costs:
+        raise InvariantViolation(
+            "no_free_burn", f"burnt {total_burnt} with total costs {total_costs}"
+        )
+
+
+def all_parties_to_check(
+    transaction_results: TransactionRoundResults, max_n_vals: int = 3
+) -> List[List[str]]:
+    all_validator_addresses = list(
+        set(
+            [
+                addr
+                for round in transaction_results.rounds
+                for rotation in round.rotations
+                for addr in rotation.votes.keys()
+            ]
+        )
+    )
+    all_validators_combinations = []
+    for i in range(
+        1, min(len(all_validator_addresses), max_n_vals)
+    ):  # grows exponentially
+        all_validators_combinations.extend(
+            list(itertools.combinations(all_validator_addresses, i))
+        )
+    return all_validators_combinations
+
+
+def _net_costs(fee_events: List[AnyFeeEvent]) -> Dict[str, int]:
+    # Costs minus earnings per address
+    if isinstance(fee_events, FeeEventLedger):
+        return {
+            address: fee_events.address_bucket(address).cost
+            - fee_events.address_bucket(address).earned
+            for address in fee_events.addresses()
+        }
+    net: Dict[str, int] = defaultdict(int)
+    for event in fee_events:
+        for address in event.addresses:
+            net[address] += event.cost - event.earned
+    return net
+
+
+def check_all_parties_safety(
+    fee_events: List[AnyFeeEvent],
+    initial_party: List[str],
+    transaction_results: TransactionRoundResults,
+    max_n_vals: int = 3,
+) -> None:
+    """
+    Same outcome as check_party_safety on initial_party plus every
+    combination from all_parties_to_check, without enumerating them.
+
+    Party safety is additive over members, so the weakest party of each
+    size adds the validators with the lowest costs minus earnings.
+    """
+    validators = {
+        addr
+        for round in transaction_results.rounds
+        for rotation in round.rotations
+        for addr in rotation.votes.keys()
+    }
+    max_size = min(len(validators), max_n_vals) - 1
+    if max_size < 1:
+        return
+    net = _net_costs(fee_events)
+    base = sum(net.get(address, 0) for address in initial_party)
+    weakest = sorted(validators, key=lambda address: net.get(address, 0))[:max_size]
+    party_net = base
+    for size, address in enumerate(weakest, start=1):
+        party_net += net.get(address, 0)
+        if party_net < 0:
+            check_party_safety(fee_events, initial_party + weakest[:size])
+
+
+def check_invariants(
+    fee_events: List[AnyFeeEvent],
+    transaction_budget: TransactionBudget,
+    transaction_results: TransactionRoundResults,
+    tolerance: int = 5,
+    max_n_vals: int = 3,
+) -> None:
+    check_costs_equal_earnings(fee_events, tolerance)
+    check_no_free_burn(fee_events)
+    sender_address = transaction_budget.senderAddress
+    appealant_addresses = [
+        appeal.appealantAddress for appeal in transaction_budget.appeals
+    ]
+    initial_party = [sender_address] + appealant_addresses
+    check_all_parties_safety(fee_events, initial_party, transaction_results, max_n_vals)
@@ -0,0 +1,202 @@
+import heapq
+from collections import defaultdict
+from enum import IntFlag
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, get_args
+
+from fee_simulator.models import AnyFeeEvent, BulkFeeEvent, expand_fee_events
+from fee_simulator.types import RoundLabel, Role
+
+
+class LabelClass(IntFlag):
+    """
+    Bitflags grouping round labels that fee computations treat alike.
+    """
+
+    NONE = 0
+    APPEAL = 1
+    SUCCESSFUL = 2
+    UNSUCCESSFUL = 4
+    LEADER_TIMEOUT = 8
+    BOND_SPLIT = 16
+    NO_PAYOUT = 32
+
+
+def _classify_label(label: RoundLabel) -> LabelClass:
+    flags = LabelClass.NONE
+    if label.startswith("APPEAL"):
+        flags |= LabelClass.APPEAL
+    if "UNSUCCESSFUL" in label:
+        flags |= LabelClass.UNSUCCESSFUL
+    elif "SUCCESSFUL" in label:
+        flags |= LabelClass.SUCCESSFUL
+    if "LEADER_TIMEOUT" in label:
+        flags |= LabelClass.LEADER_TIMEOUT
+    if label in (
+        "SPLIT_PREVIOUS_APPEAL_BOND",
+        "LEADER_TIMEOUT_50_PREVIOUS_APPEAL_BOND",
+    ):
+        flags |= LabelClass.BOND_SPLIT
+    if label in ("EMPTY_ROUND", "SKIP_ROUND"):
+        flags |= LabelClass.NO_PAYOUT
+    return flags
+
+
+LABEL_CLASSES: Dict[Optional[RoundLabel], LabelClass] = {
+    label: _classify_label(label) for label in get_args(RoundLabel)
+}
+LABEL_CLASSES[None] = LabelClass.NONE
+
+
+def label_class(label: Optional[RoundLabel]) -> LabelClass:
+    return LABEL_CLASSES.get(label, LabelClass.NONE)
+
+
+class LedgerBucket:
+    """
+    Events sharing one index key, with running totals of their amounts.
+    A BulkFeeEvent counts once per address in the bucket.
+    """
+
+    __slots__ = ("events", "cost", "staked", "earned", "slashed", "burned")
+
+    def __init__(self):
+        self.events: List[AnyFeeEvent] = []
+        self.cost = 0
+        self.staked = 0
+        self.earned = 0
+        self.slashed = 0
+        self.burned = 0
+
+    def add(self, event: AnyFeeEvent, size: int = 1) -> None:
+        self.events.append(event)
+        self.cost += event.cost * size
+        self.staked += event.staked * size
+        self.earned += event.earned * size
+        self.slashed += event.slashed * size
+        self.burned += event.burned * size
+
+
+_EMPTY_BUCKET = LedgerBucket()
+
+
+class FeeEventLedger(list):
+    """
+    Append-only list of FeeEvents that keeps per-round, per-label, per-role
+    and per-address buckets up to date as events are added.
+
+    It can be passed anywhere a List[FeeEvent] is expected; functions that
+    know about the ledger use the buckets instead of scanning every event.
+    BulkFeeEvents are kept grouped; bucket totals count them per address.
+    """
+
+    def __init__(self, events: Iterable[AnyFeeEvent] = ()):
+        super().__init__()
+        self._by_round: Dict[Optional[int], LedgerBucket] = defaultdict(LedgerBucket)
+        self._by_label: Dict[Optional[RoundLabel], LedgerBucket] = defaultdict(
+            LedgerBucket
+        )
+        self._by_role: Dict[Optional[Role], LedgerBucket] = defaultdict(LedgerBucket)
+        self._by_address: Dict[str, LedgerBucket] = defaultdict(LedgerBucket)
+        self.extend(events)
+
+    def append(self, event: AnyFeeEvent) -> None:
+        super().append(event)
+        if isinstance(event, BulkFeeEvent):
+            size = event.size
+            self._by_round[event.round_index].add(event, size)
+            self._by_label[event.round_label].add(event, size)
+            self._by_role[event.role].add(event, size)
+            for address in event.addresses:
+                self._by_address[address].add(event)
+            return
+        self._by_round[event.round_index].add(event)
+        self._by_label[event.round_label].add(event)
+        self._by_role[event.role].add(event)
+        self._by_address[event.address].add(event)
+
+    def extend(self, events: Iterable[AnyFeeEvent]) -> None:
+        for event in events:
+            self.append(event)
+
+    def __iadd__(self, events: Iterable[AnyFeeEvent]) -> "FeeEventLedger":
+        self.extend(events)
+        return self
+
+    def copy(self) -> "FeeEventLedger":
+        return FeeEventLedger(self)
+
+    def __reduce__(self):
+        # Rebuild the buckets from the events; list pickling would extend the
+        # ledger before its buckets exist
+        return FeeEventLedger, (list(self),)
+
+    def event_count(self) -> int:
+        # Individual events, counting a BulkFeeEvent once per address
+        return sum(event.size for event in self)
+
+    def expanded(self) -> "FeeEventLedger":
+        return FeeEventLedger(expand_fee_events(self))
+
+    def _append_only(self, *args, **kwargs):
+        raise TypeError("FeeEventLedger is append-only")
+
+    __setitem__ = __delitem__ = insert = pop = remove = clear = _append_only
+    sort = reverse = _append_only
+
+    def round_bucket(self, round_index: Optional[int]) -> LedgerBucket:
+        return self._by_round.get(round_index, _EMPTY_BUCKET)
+
+    def label_bucket(self, label: Optional[RoundLabel]) -> LedgerBucket:
+        return self._by_label.get(label, _EMPTY_BUCKET)
+
+    def role_bucket(self, role: Optional[Role]) -> LedgerBucket:
+        return self._by_role.get(role, _EMPTY_BUCKET)
+
+    def address_bucket(self, address: str) -> LedgerBucket:
+        return self._by_address.get(address, _EMPTY_BUCKET)
+
+    def addresses(self) -> Iterable[str]:
+        return self._by_address.keys()
+
+    def events_in_round(self, round_index: Optional[int]) -> List[AnyFeeEvent]:
+        return self.round_bucket(round_index).events
+
+    def label_buckets(
+        self,
+        include: LabelClass = LabelClass.NONE,
+        exclude: LabelClass = LabelClass.NONE,
+    ) -> Iterator[Tuple[Optional[RoundLabel], LedgerBucket]]:
+        """
+        Iterate over label buckets whose class has all `include` flags and
+        none of the `exclude` flags.
+        """
+        for label, bucket in self._by_label.items():
+            flags = label_class(label)
+            if flags & include == include and not flags & exclude:
+                yield label, bucket
+
+
+def as_ledger(fee_events: List[AnyFeeEvent]) -> FeeEventLedger:
+    if isinstance(fee_events, FeeEventLedger):
+        return fee_events
+    return FeeEventLedger(fee_events)
+
+
+def merge_ledgers(*ledgers: Iterable[AnyFeeEvent]) -> FeeEventLedger:
+    """
+    k-way merge of event streams, each already ordered by sequence_id (as
+    emitted from one sequence block), into one ledger ordered by sequence_id.
+    Merging per-worker ledgers of blocks reserved in serial order gives the
+    serial ledger.
+    """
+    merged = FeeEventLedger()
+    next_free = None
+    for event in heapq.merge(*ledgers, key=lambda event: event.sequence_id):
+        if next_free is not None and event.sequence_id < next_free:
+            raise ValueError(
+                f"Sequence id {event.sequence_id} is duplicated or out of order "
+                "within a ledger"
+            )
+        next_free = event.sequence_id + event.size  # a bulk event spans size ids
+        merged.append(event)
+    return merged
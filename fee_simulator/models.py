@@ -1,27 +1,379 @@
 import re
-from typing import Dict, List, Literal, Optional
-from pydantic import BaseModel, Field, field_validator, ConfigDict, model_validator
+import threading
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import (
+    Any,
+    ClassVar,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-from fee_simulator.constants import ETH_ADDRESS_REGEX
-from fee_simulator.types import RoundLabel, Vote, Role
+import numpy as np
+from pydantic import (
+    BaseModel,
+    Field,
+    field_serializer,
+    field_validator,
+    ConfigDict,
+    TypeAdapter,
+    model_validator,
+)
+
+from fee_simulator.constants import (
+    DEFAULT_STAKE,
+    ETH_ADDRESS_REGEX,
+    PENALTY_REWARD_COEFFICIENT,
+    ROUND_SIZES,
+    VOTE_CODES,
+)
+from fee_simulator.types import LeaderAction, RoundLabel, Vote, Role
+
+_ETH_ADDRESS_PATTERN = re.compile(ETH_ADDRESS_REGEX)
+_HASH_PATTERN = re.compile(r"^0x[a-fA-F0-9]+$")
+# Newline separated addresses, to validate a whole column with one match
+_ADDRESS_COLUMN_PATTERN = re.compile(r"0x[a-fA-F0-9]{40}(?:\n0x[a-fA-F0-9]{40})*")
+
+VOTE_NAMES = tuple(sorted(VOTE_CODES, key=VOTE_CODES.get))
+# Looks up the names of a whole code column at once
+_VOTE_NAME_ARRAY = np.array(VOTE_NAMES, dtype=object)
+NO_HASH = -1
+
+
+@lru_cache(maxsize=1 << 16)
+def is_valid_address(address: str) -> bool:
+    # Validators and appealants recur across transactions, so cache the verdict
+    # fullmatch: "$" alone would let a trailing newline through
+    return _ETH_ADDRESS_PATTERN.fullmatch(address) is not None
+
+
+def _vote_hash(vote: Vote) -> Optional[str]:
+    # Hash carried by a vote: [vote, hash] or [leader_action, vote, hash]
+    if isinstance(vote, list) and len(vote) > 1:
+        if len(vote) == 3 or (
+            len(vote) == 2 and vote[0] not in ("LEADER_RECEIPT", "LEADER_TIMEOUT")
+        ):
+            return vote[-1]
+    return None
+
+
+def _validate_address_column(addresses: Sequence[str]) -> None:
+    column = "\n".join(addresses)
+    # An entry holding a newline would match as two addresses
+    if not addresses or (
+        column.count("\n") == len(addresses) - 1
+        and _ADDRESS_COLUMN_PATTERN.fullmatch(column)
+    ):
+        return
+    for addr in addresses:
+        if not is_valid_address(addr):
+            raise ValueError(f"Invalid Ethereum address: {addr}")
+
+
+class CompactVotes(Mapping):
+    """
+    Read-only address to vote mapping backed by arrays.
+
+    Votes are decoded into the usual Vote values only when read, so code
+    that reads rotation.votes keeps working; vectorized code can use the
+    vote codes directly.
+    """
+
+    __slots__ = (
+        "addresses",
+        "codes",
+        "hash_ids",
+        "hash_values",
+        "leader_action",
+        "_positions",
+    )
+
+    def __init__(
+        self,
+        addresses: Sequence[str],
+        codes: np.ndarray,
+        hash_ids: Optional[np.ndarray] = None,
+        hash_values: Optional[Sequence[str]] = None,
+        leader_action: Optional[LeaderAction] = None,
+    ):
+        self.addresses = addresses
+        self.codes = codes
+        self.hash_ids = hash_ids
+        self.hash_values = hash_values
+        self.leader_action = leader_action
+        self._positions: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def from_arrays(
+        cls,
+        addresses: Sequence[str],
+        vote_codes: Iterable[int],
+        hash_ids: Optional[Iterable[int]] = None,
+        leader_action: Optional[LeaderAction] = "LEADER_RECEIPT",
+        hash_values: Optional[Sequence[str]] = None,
+    ) -> "CompactVotes":
+        """
+        Validate whole columns at once and build the mapping.
+
+        Args:
+            addresses: Voter addresses; the first one leads if leader_action is set
+            vote_codes: Vote codes as in VOTE_CODES
+            hash_ids: Per voter index into hash_values, or NO_HASH
+            leader_action: Action of the first voter, or None for no leader
+            hash_values: Hash strings; by default hash id k is hex(k)
+        """
+        addresses = tuple(addresses)
+        _validate_address_column(addresses)
+        if len(set(addresses)) != len(addresses):
+            raise ValueError("Duplicate voter addresses")
+
+        codes = np.asarray(vote_codes)
+        if codes.shape != (len(addresses),):
+            raise ValueError("vote_codes must have one code per address")
+        if len(codes) and (codes.min() < 0 or codes.max() >= len(VOTE_NAMES)):
+            raise ValueError(f"Vote codes must be in [0, {len(VOTE_NAMES)})")
+        codes = codes.astype(np.int8)
+        codes.flags.writeable = False
+
+        if hash_ids is not None:
+            hash_ids = np.asarray(hash_ids)
+            if hash_ids.shape != (len(addresses),):
+                raise ValueError("hash_ids must have one id per address")
+            upper = len(hash_values) if hash_values is not None else np.inf
+            if len(hash_ids) and (hash_ids.min() < NO_HASH or hash_ids.max() >= upper):
+                raise ValueError("hash_ids out of range")
+            hash_ids = hash_ids.astype(np.int64)
+            hash_ids.flags.writeable = False
+        if hash_values is not None:
+            hash_values = tuple(hash_values)
+            for hash_value in hash_values:
+                if not _HASH_PATTERN.match(hash_value):
+                    raise ValueError(f"Invalid hash format: {hash_value}")
+        if leader_action is not None and leader_action not in (
+            "LEADER_RECEIPT",
+            "LEADER_TIMEOUT",
+        ):
+            raise ValueError(f"Invalid leader action: {leader_action}")
+        return cls(addresses, codes, hash_ids, hash_values, leader_action)
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.addresses)
+
+    def _position(self, address: str) -> int:
+        if self._positions is None:
+            self._positions = {addr: i for i, addr in enumerate(self.addresses)}
+        return self._positions[address]
+
+    def __getitem__(self, address: str) -> Vote:
+        return self.vote_at(self._position(address))
+
+    def __contains__(self, address: object) -> bool:
+        try:
+            self._position(address)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def items(self):
+        return zip(self.addresses, map(self.vote_at, range(len(self.addresses))))
+
+    def values(self):
+        return map(self.vote_at, range(len(self.addresses)))
+
+    def hash_at(self, position: int) -> Optional[str]:
+        if self.hash_ids is None or self.hash_ids[position] == NO_HASH:
+            return None
+        hash_id = int(self.hash_ids[position])
+        return self.hash_values[hash_id] if self.hash_values else hex(hash_id)
+
+    def vote_at(self, position: int) -> Vote:
+        name = VOTE_NAMES[self.codes[position]]
+        hash_value = self.hash_at(position)
+        if position == 0 and self.leader_action is not None:
+            vote = [self.leader_action, name]
+            return vote if hash_value is None else vote + [hash_value]
+        return name if hash_value is None else [name, hash_value]
+
+    def normalized(self) -> List[Vote]:
+        return _VOTE_NAME_ARRAY[self.codes].tolist()
+
+    def to_dict(self) -> Dict[str, Vote]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"CompactVotes({self.to_dict()!r})"
+
+
+class OverlayVotes(Mapping):
+    """
+    Votes of a rotation after idle replacement, as an overlay on the original
+    votes: the votes at the removed positions are skipped and the appended
+    reserve votes follow. The original votes are neither copied nor
+    revalidated.
+    """
+
+    __slots__ = ("base", "removed", "appended", "_removed_addresses")
+
+    def __init__(
+        self,
+        base: Mapping,
+        removed: FrozenSet[int],
+        appended: Dict[str, Vote],
+    ):
+        self.base = base
+        self.removed = removed
+        self.appended = appended
+        self._removed_addresses = frozenset(
+            addr for i, addr in enumerate(base) if i in removed
+        )
+
+    def __len__(self) -> int:
+        return len(self.base) - len(self.removed) + len(self.appended)
+
+    def __iter__(self) -> Iterator[str]:
+        for addr in self.base:
+            if addr not in self._removed_addresses:
+                yield addr
+        yield from self.appended
+
+    def __getitem__(self, address: str) -> Vote:
+        if address in self.appended:
+            return self.appended[address]
+        if address in self._removed_addresses:
+            raise KeyError(address)
+        return self.base[address]
+
+    def __contains__(self, address: object) -> bool:
+        return address in self.appended or (
+            address in self.base and address not in self._removed_addresses
+        )
+
+    def items(self):
+        for addr, vote in self.base.items():
+            if addr not in self._removed_addresses:
+                yield addr, vote
+        yield from self.appended.items()
+
+    def values(self):
+        for _, vote in self.items():
+            yield vote
+
+    def to_dict(self) -> Dict[str, Vote]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return f"OverlayVotes({self.to_dict()!r})"
+
+
+class SequenceBlock:
+    """
+    A contiguous range of sequence ids [start, stop) reserved from an
+    EventSequence. It hands out ids like the sequence itself, so it can be
+    passed wherever an event_sequence is expected, and pickled to a worker.
+    """
+
+    __slots__ = ("start", "stop", "_counter")
+
+    def __init__(self, start: int, stop: int):
+        if stop < start:
+            raise ValueError(f"Invalid sequence block [{start}, {stop})")
+        self.start = start
+        self.stop = stop
+        self._counter = start
+
+    def __getstate__(self):
+        return self.start, self.stop, self._counter
+
+    def __setstate__(self, state):
+        self.start, self.stop, self._counter = state
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __repr__(self) -> str:
+        return f"SequenceBlock({self.start}, {self.stop})"
+
+    @property
+    def remaining(self) -> int:
+        return self.stop - self._counter
+
+    def next_id(self) -> int:
+        current = self._counter
+        if current >= self.stop:
+            raise ValueError(f"Sequence block [{self.start}, {self.stop}) is exhausted")
+        self._counter += 1
+        return current
+
+    def reserve(self, size: int) -> "SequenceBlock":
+        if size < 0 or self._counter + size > self.stop:
+            raise ValueError(
+                f"Cannot reserve {size} ids from sequence block "
+                f"[{self.start}, {self.stop}) with {self.remaining} left"
+            )
+        start = self._counter
+        self._counter += size
+        return SequenceBlock(start, start + size)
 
 
 class EventSequence:
     """
     Manages an auto-incrementing sequence counter for FeeEvent IDs.
+
+    reserve() hands out contiguous blocks of ids, so independent emitters
+    (threads, worker processes) produce globally unique ids; reserving
+    blocks in serial order with each emitter's exact event count gives the
+    same ids as emitting serially.
     """
 
     def __init__(self):
         self._counter = 1
+        self._lock = threading.Lock()
 
     def set_counter(self, counter: int):
-        self._counter = counter
+        with self._lock:
+            self._counter = counter
 
     def next_id(self) -> int:
-        current = self._counter
-        self._counter += 1
+        with self._lock:
+            current = self._counter
+            self._counter += 1
         return current
 
+    def reserve(self, size: int) -> SequenceBlock:
+        if size < 0:
+            raise ValueError(f"Block size must be non-negative, got {size}")
+        with self._lock:
+            start = self._counter
+            self._counter += size
+        return SequenceBlock(start, start + size)
+
+    def reserve_blocks(self, sizes: Iterable[int]) -> List[SequenceBlock]:
+        """
+        Reserve consecutive blocks at once, e.g. one per round in round order.
+        """
+        sizes = list(sizes)
+        if any(size < 0 for size in sizes):
+            raise ValueError(f"Block sizes must be non-negative, got {sizes}")
+        with self._lock:
+            start = self._counter
+            self._counter += sum(sizes)
+        blocks = []
+        for size in sizes:
+            blocks.append(SequenceBlock(start, start + size))
+            start += size
+        return blocks
+
 
 class Appeal(BaseModel):
     model_config = ConfigDict(frozen=True)
@@ -29,7 +381,7 @@ class Appeal(BaseModel):
 
     @field_validator("appealantAddress")
     def validate_address(cls, v):
-        if not re.match(ETH_ADDRESS_REGEX, v):
+        if not is_valid_address(v):
             raise ValueError(f"Invalid Ethereum address: {v}")
         return v
 
@@ -40,45 +392,95 @@ class Rotation(BaseModel):
     reserve_votes: Dict[str, Vote] = {}
 
     @field_validator("votes")
-    def validate_vote_addresses(cls, v):
-        for addr in v.keys():
-            if not re.match(ETH_ADDRESS_REGEX, addr):
+    def validate_votes(cls, v):
+        # Addresses and hashes in a single pass
+        for addr, vote in v.items():
+            if not is_valid_address(addr):
                 raise ValueError(f"Invalid Ethereum address: {addr}")
+            hash_value = _vote_hash(vote)
+            if hash_value is not None and not _HASH_PATTERN.match(hash_value):
+                raise ValueError(
+                    f"Invalid hash format for address {addr}: {hash_value}"
+                )
         return v
 
     @field_validator("reserve_votes")
     def validate_reserve_addresses(cls, v):
         for addr in v.keys():
-            if not re.match(ETH_ADDRESS_REGEX, addr):
+            if not is_valid_address(addr):
                 raise ValueError(f"Invalid reserve Ethereum address: {addr}")
         return v
 
-    @field_validator("votes")
-    def validate_vote_hashes(cls, v):
-        for addr, vote in v.items():
-            if isinstance(vote, list) and len(vote) > 1:
-                # Check if last element is a hash
-                if len(vote) == 3 or (
-                    len(vote) == 2
-                    and vote[0] not in ["LEADER_RECEIPT", "LEADER_TIMEOUT"]
-                ):
-                    hash_value = vote[-1]
-                    if not re.match(r"^0x[a-fA-F0-9]+$", hash_value):
-                        raise ValueError(
-                            f"Invalid hash format for address {addr}: {hash_value}"
-                        )
-        return v
+    @field_serializer("votes")
+    def serialize_votes(self, votes):
+        if isinstance(votes, (CompactVotes, OverlayVotes)):
+            return votes.to_dict()
+        return votes
+
+    @classmethod
+    def from_arrays(
+        cls,
+        addresses: Sequence[str],
+        vote_codes: Iterable[int],
+        hash_ids: Optional[Iterable[int]] = None,
+        leader_action: Optional[LeaderAction] = "LEADER_RECEIPT",
+        hash_values: Optional[Sequence[str]] = None,
+        reserve_votes: Optional[Dict[str, Vote]] = None,
+    ) -> "Rotation":
+        """
+        Build a rotation from vote columns without per-vote model validation.
+        See CompactVotes.from_arrays for the arguments.
+        """
+        votes = CompactVotes.from_arrays(
+            addresses, vote_codes, hash_ids, leader_action, hash_values
+        )
+        if reserve_votes:
+            # model_construct skips field validation, votes included
+            reserve_votes = cls.validate_votes(
+                _RESERVE_VOTES_ADAPTER.validate_python(dict(reserve_votes))
+            )
+        return cls.model_construct(votes=votes, reserve_votes=reserve_votes or {})
+
+
+_RESERVE_VOTES_ADAPTER = TypeAdapter(Dict[str, Vote])
 
 
 class Round(BaseModel):
     model_config = ConfigDict(frozen=True)
     rotations: List[Rotation]
 
+    @classmethod
+    def from_arrays(cls, *args: Any, **kwargs: Any) -> "Round":
+        """
+        A single-rotation round; takes the arguments of Rotation.from_arrays.
+        """
+        return cls.model_construct(rotations=[Rotation.from_arrays(*args, **kwargs)])
+
 
 class TransactionRoundResults(BaseModel):
     model_config = ConfigDict(frozen=True)
     rounds: List[Round]
 
+    @classmethod
+    def from_rounds(cls, rounds: Iterable[Round]) -> "TransactionRoundResults":
+        """
+        Assemble already validated rounds without validating them again.
+        """
+        rounds = list(rounds)
+        for round_obj in rounds:
+            if not isinstance(round_obj, Round):
+                raise TypeError(f"Expected Round, got {type(round_obj).__name__}")
+        return cls.model_construct(rounds=rounds)
+
+    @classmethod
+    def from_arrays(
+        cls, round_arrays: Iterable[Dict[str, Any]]
+    ) -> "TransactionRoundResults":
+        """
+        One round per dict of Rotation.from_arrays keyword arguments.
+        """
+        return cls.from_rounds(Round.from_arrays(**arrays) for arrays in round_arrays)
+
 
 class FeeEvent(BaseModel):
     model_config = ConfigDict(frozen=True)
@@ -95,6 +497,89 @@ class FeeEvent(BaseModel):
     slashed: int = Field(default=0, ge=0)
     burned: int = Field(default=0, ge=0)  # penalty
 
+    # Interface shared with BulkFeeEvent, for code that handles both
+    size: ClassVar[int] = 1
+
+    @property
+    def addresses(self) -> Tuple[str, ...]:
+        return (self.address,)
+
+    def expand(self) -> List["FeeEvent"]:
+        return [self]
+
+
+class BulkFeeEvent(BaseModel):
+    """
+    Identical FeeEvents for several addresses, with consecutive sequence ids
+    from sequence_id. Amounts are per address; multiply by size for totals.
+    """
+
+    model_config = ConfigDict(frozen=True)
+    sequence_id: int
+    addresses: Tuple[str, ...] = Field(min_length=1)
+    round_index: Optional[int] = None
+    round_label: Optional[RoundLabel] = None
+    role: Optional[Role] = None
+    vote: Optional[Vote] = None
+    hash: Optional[str] = None
+    cost: int = Field(default=0, ge=0)
+    staked: int = Field(default=0, ge=0)
+    earned: int = Field(default=0, ge=0)
+    slashed: int = Field(default=0, ge=0)
+    burned: int = Field(default=0, ge=0)
+
+    @property
+    def size(self) -> int:
+        return len(self.addresses)
+
+    def expand(self) -> List[FeeEvent]:
+        fields = self.model_dump(exclude={"sequence_id", "addresses"})
+        return [
+            FeeEvent(sequence_id=self.sequence_id + offset, address=address, **fields)
+            for offset, address in enumerate(self.addresses)
+        ]
+
+
+AnyFeeEvent = Union[FeeEvent, BulkFeeEvent]
+
+
+def expand_fee_events(fee_events: Iterable[AnyFeeEvent]) -> List[FeeEvent]:
+    """
+    Individual FeeEvents of a stream that may hold BulkFeeEvents.
+    """
+    expanded = []
+    for event in fee_events:
+        if isinstance(event, BulkFeeEvent):
+            expanded.extend(event.expand())
+        else:
+            expanded.append(event)
+    return expanded
+
+
+class ProtocolParams(BaseModel):
+    """
+    Protocol constants a transaction is processed under. Immutable and
+    hashable, so it can key caches and be sent to worker processes; the
+    defaults are the module constants.
+    """
+
+    model_config = ConfigDict(frozen=True)
+    round_sizes: Tuple[int, ...] = tuple(ROUND_SIZES)
+    penalty_reward_coefficient: int = Field(default=PENALTY_REWARD_COEFFICIENT, ge=0)
+    default_stake: int = Field(default=DEFAULT_STAKE, ge=0)
+    idle_slash_rate: float = Field(default=0.01, ge=0, le=1)
+    validator_slash_rate: float = Field(default=0.01, ge=0, le=1)
+    leader_slash_rate: float = Field(default=0.05, ge=0, le=1)
+
+    @field_validator("round_sizes")
+    def validate_round_sizes(cls, v):
+        if not v or any(size <= 0 for size in v):
+            raise ValueError("Round sizes must be a non-empty list of positive sizes")
+        return v
+
+
+DEFAULT_PROTOCOL_PARAMS = ProtocolParams()
+
 
 class TransactionBudget(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True, frozen=True)
@@ -104,13 +589,16 @@ class TransactionBudget(BaseModel):
     rotations: List[int]
     senderAddress: str
     appeals: Optional[List[Appeal]] = []
-    staking_distribution: Literal["constant", "normal"] = Field(default="constant")
+    staking_distribution: Literal["constant", "normal", "lognormal", "empirical"] = (
+        Field(default="constant")
+    )
     staking_mean: Optional[float] = Field(default=None, ge=0)
     staking_variance: Optional[float] = Field(default=None, ge=0)
+    staking_file: Optional[str] = None
 
     @field_validator("senderAddress")
     def validate_sender_address(cls, v):
-        if not re.match(ETH_ADDRESS_REGEX, v):
+        if not is_valid_address(v):
             raise ValueError(f"Invalid sender Ethereum address: {v}")
         return v
 
@@ -122,15 +610,23 @@ class TransactionBudget(BaseModel):
 
     @model_validator(mode="after")
     def validate_staking_params(self):
-        if self.staking_distribution == "normal":
+        if self.staking_distribution in ("normal", "lognormal"):
             if self.staking_mean is None or self.staking_variance is None:
                 raise ValueError(
-                    "staking_mean and staking_variance must be provided for normal distribution"
+                    f"staking_mean and staking_variance must be provided for {self.staking_distribution} distribution"
                 )
-        if self.staking_distribution == "constant" and (
+        if self.staking_distribution == "lognormal" and self.staking_mean == 0:
+            raise ValueError("staking_mean must be positive for lognormal distribution")
+        if self.staking_distribution in ("constant", "empirical") and (
             self.staking_mean is not None or self.staking_variance is not None
         ):
             raise ValueError(
-                "staking_mean and staking_variance should not be provided for constant distribution"
+                f"staking_mean and staking_variance should not be provided for {self.staking_distribution} distribution"
+            )
+        if (self.staking_distribution == "empirical") != (
+            self.staking_file is not None
+        ):
+            raise ValueError(
+                "staking_file must be provided for, and only for, empirical distribution"
             )
         return self
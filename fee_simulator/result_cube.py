@@ -0,0 +1,238 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Sequence, Tuple, get_args
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, field_validator
+
+from fee_simulator.types import RoundLabel
+from fee_simulator.core.summary import TransactionOutcome
+from fee_simulator.rng import chunk_ranges
+
+METADATA_FILE = "cube.json"
+FILLED = "_filled"
+
+LABEL_METRICS = tuple(f"label_{label}" for label in get_args(RoundLabel))
+DEFAULT_METRICS = (
+    "sender_refund",
+    "total_burned",
+    "leader_net",
+    "validator_net",
+    "appealant_net",
+) + LABEL_METRICS
+
+# Maps the coordinates of a cell (axis name to value) to its metrics
+CellEvaluator = Callable[[Dict[str, Any]], Dict[str, int]]
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise ValueError(f"Axis value {value!r} is not JSON-serializable")
+
+
+def _normalize(value: Any) -> Any:
+    # Axis values as they read back from the metadata file
+    return json.loads(json.dumps(value, default=_to_json))
+
+
+class CubeAxis(BaseModel):
+    """
+    A sweep axis: its name (e.g. leaderTimeout, params, scenario) and the
+    values along it. Values must be JSON-serializable, numpy scalars and
+    arrays (stored as Python numbers and lists) or pydantic models (stored
+    as their JSON dump).
+    """
+
+    model_config = ConfigDict(frozen=True)
+    name: str
+    values: Tuple[Any, ...]
+
+    @field_validator("values", mode="before")
+    def normalize_values(cls, v):
+        values = tuple(_normalize(value) for value in v)
+        if not values:
+            raise ValueError("An axis needs at least one value")
+        return values
+
+    def index_of(self, value: Any) -> int:
+        return self.values.index(_normalize(value))
+
+
+def outcome_metrics(outcome: TransactionOutcome) -> Dict[str, int]:
+    """
+    The default metrics of a transaction processed in summary mode: refund,
+    burned total, net (earned minus cost) per role and label counts.
+    """
+    metrics = {
+        "sender_refund": outcome.refund,
+        "total_burned": int(outcome.burned.sum()),
+    }
+    for role in ("LEADER", "VALIDATOR", "APPEALANT"):
+        totals = outcome.role_totals.get(role, {})
+        metrics[f"{role.lower()}_net"] = totals.get("earned", 0) - totals.get("cost", 0)
+    for label in outcome.labels:
+        name = f"label_{label}"
+        metrics[name] = metrics.get(name, 0) + 1
+    return metrics
+
+
+class ResultCube:
+    """
+    Sweep results as one N-d int64 array per metric, indexed by the sweep
+    axes and backed by numpy.memmap.
+
+    A cube is a directory holding cube.json (axes, metrics and shape) and
+    one raw file per metric, plus a mask of the cells written. Workers open
+    the cube in r+ mode and write their cells in place; readers slice it
+    without loading it. Unwritten cells are zero.
+    """
+
+    def __init__(self, directory: str, mode: str = "r"):
+        with open(os.path.join(directory, METADATA_FILE), encoding="utf-8") as f:
+            metadata = json.load(f)
+        self.directory = directory
+        self.axes = [CubeAxis(**axis) for axis in metadata["axes"]]
+        self.metrics: List[str] = metadata["metrics"]
+        self.shape = tuple(len(axis.values) for axis in self.axes)
+        self._arrays = {
+            name: np.memmap(
+                self._path(name), dtype=np.int64, mode=mode, shape=self.shape
+            )
+            for name in self.metrics
+        }
+        self.filled = np.memmap(
+            self._path(FILLED), dtype=np.bool_, mode=mode, shape=self.shape
+        )
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.dat")
+
+    @classmethod
+    def create(
+        cls,
+        directory: str,
+        axes: Sequence[CubeAxis],
+        metrics: Sequence[str] = DEFAULT_METRICS,
+    ) -> "ResultCube":
+        """
+        Lay out a zeroed cube in directory and open it for writing.
+        """
+        names = [axis.name for axis in axes]
+        if not names:
+            raise ValueError("A cube needs at least one axis")
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate axis names: {names}")
+        if len(set(metrics)) != len(metrics) or FILLED in metrics:
+            raise ValueError(f"Invalid metric names: {list(metrics)}")
+        os.makedirs(directory, exist_ok=True)
+        shape = tuple(len(axis.values) for axis in axes)
+        for name in list(metrics) + [FILLED]:
+            dtype = np.bool_ if name == FILLED else np.int64
+            # Sparse files: pages are only allocated once written
+            with open(os.path.join(directory, f"{name}.dat"), "wb") as f:
+                f.truncate(int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        with open(os.path.join(directory, METADATA_FILE), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "shape": list(shape),
+                    "dtype": "int64",
+                    "axes": [axis.model_dump() for axis in axes],
+                    "metrics": list(metrics),
+                },
+                f,
+                indent=2,
+            )
+        return cls(directory, mode="r+")
+
+    def __getitem__(self, metric: str) -> np.memmap:
+        return self._arrays[metric]
+
+    def axis(self, name: str) -> CubeAxis:
+        for axis in self.axes:
+            if axis.name == name:
+                return axis
+        raise KeyError(name)
+
+    def index(self, **coordinates: Any) -> Tuple[int, ...]:
+        """
+        Cell index of the given value on every axis.
+        """
+        if set(coordinates) != {axis.name for axis in self.axes}:
+            raise ValueError("A cell needs a value for every axis")
+        return tuple(axis.index_of(coordinates[axis.name]) for axis in self.axes)
+
+    def coordinates(self, index: Sequence[int]) -> Dict[str, Any]:
+        return {axis.name: axis.values[i] for axis, i in zip(self.axes, index)}
+
+    def write(self, index: Sequence[int], metrics: Dict[str, int]) -> None:
+        """
+        Write the metrics of one cell; metrics left out are zero.
+        """
+        unknown = set(metrics) - set(self.metrics)
+        if unknown:
+            raise KeyError(f"Unknown metrics: {sorted(unknown)}")
+        index = tuple(index)
+        for name in self.metrics:
+            self._arrays[name][index] = metrics.get(name, 0)
+        self.filled[index] = True
+
+    def select(self, metric: str, **coordinates: Any) -> np.ndarray:
+        """
+        The metric with the given axes fixed to a value; the other axes stay,
+        in order. A view on the file, read as it is sliced further.
+        """
+        key = tuple(
+            (
+                axis.index_of(coordinates[axis.name])
+                if axis.name in coordinates
+                else slice(None)
+            )
+            for axis in self.axes
+        )
+        return self._arrays[metric][key]
+
+    def flush(self) -> None:
+        for array in self._arrays.values():
+            array.flush()
+        self.filled.flush()
+
+
+def _fill_cells(directory: str, start: int, stop: int, evaluate: CellEvaluator) -> None:
+    cube = ResultCube(directory, mode="r+")
+    for flat in range(start, stop):
+        index = np.unravel_index(flat, cube.shape)
+        cube.write(index, evaluate(cube.coordinates(index)))
+    cube.flush()
+
+
+def sweep(
+    directory: str,
+    axes: Sequence[CubeAxis],
+    evaluate: CellEvaluator,
+    metrics: Sequence[str] = DEFAULT_METRICS,
+    workers: int = 1,
+    chunks_per_worker: int = 4,
+) -> ResultCube:
+    """
+    Evaluate every cell of the axes' grid into a new cube in directory.
+    Workers take contiguous chunks of cells and write them in place;
+    evaluate must be picklable to run on more than one worker.
+    """
+    n_cells = int(np.prod(ResultCube.create(directory, axes, metrics).shape))
+    if workers <= 1:
+        _fill_cells(directory, 0, n_cells, evaluate)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_fill_cells, directory, start, stop, evaluate)
+                for start, stop in chunk_ranges(n_cells, workers * chunks_per_worker)
+            ]
+            for future in futures:
+                future.result()
+    return ResultCube(directory)
@@ -0,0 +1,64 @@
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_ROOT_SEED = 0
+
+# First element of every spawn key, so the stream families never collide
+TRANSACTION_STREAM = 0
+WORKER_STREAM = 1
+CHUNK_STREAM = 2
+
+
+class RandomStreams:
+    """
+    Independent, reproducible random streams derived from one root seed.
+
+    Every stream is keyed by what it is for (transaction, worker or chunk and
+    its index), never by the order streams are requested in. A transaction's
+    stream is therefore the same whether a sweep runs on one process or on
+    many, and any transaction can be replayed on its own.
+    """
+
+    def __init__(self, root_seed: Optional[int] = DEFAULT_ROOT_SEED):
+        if root_seed is None:
+            root_seed = np.random.SeedSequence().entropy
+        self.root_seed = root_seed
+
+    def seed_sequence(self, *spawn_key: int) -> np.random.SeedSequence:
+        return np.random.SeedSequence(self.root_seed, spawn_key=spawn_key)
+
+    def for_transaction(self, transaction_index: int) -> np.random.Generator:
+        return np.random.default_rng(
+            self.seed_sequence(TRANSACTION_STREAM, transaction_index)
+        )
+
+    def for_worker(self, worker_index: int) -> np.random.Generator:
+        return np.random.default_rng(self.seed_sequence(WORKER_STREAM, worker_index))
+
+    def for_chunk(self, chunk_index: int) -> np.random.Generator:
+        return np.random.default_rng(self.seed_sequence(CHUNK_STREAM, chunk_index))
+
+    def transactions(
+        self, start: int, stop: int
+    ) -> Iterator[Tuple[int, np.random.Generator]]:
+        for transaction_index in range(start, stop):
+            yield transaction_index, self.for_transaction(transaction_index)
+
+
+def transaction_rng(root_seed: int, transaction_index: int) -> np.random.Generator:
+    return RandomStreams(root_seed).for_transaction(transaction_index)
+
+
+def chunk_ranges(n_items: int, n_chunks: int) -> List[Tuple[int, int]]:
+    """
+    Split range(n_items) into at most n_chunks contiguous (start, stop) ranges.
+    """
+    if n_chunks <= 0:
+        raise ValueError("Number of chunks must be positive")
+    bounds = np.linspace(0, n_items, min(n_chunks, max(n_items, 1)) + 1).astype(int)
+    return [
+        (int(start), int(stop))
+        for start, stop in zip(bounds[:-1], bounds[1:])
+        if stop > start
+    ]
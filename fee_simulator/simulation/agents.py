@@ -0,0 +1,532 @@
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field
+
+from fee_simulator.models import (
+    NO_HASH,
+    Appeal,
+    CompactVotes,
+    Round,
+    Rotation,
+    TransactionBudget,
+    TransactionRoundResults,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.types import MajorityOutcome, Vote
+from fee_simulator.constants import VOTE_CODES
+from fee_simulator.rng import DEFAULT_ROOT_SEED, RandomStreams
+from fee_simulator.utils import generate_eth_addresses
+from fee_simulator.core.majority import compute_majority_from_codes
+from fee_simulator.core.committee_selection import CommitteeSelector
+from fee_simulator.core.scenario_cache import PayoutTemplateCache
+from fee_simulator.core.summary import (
+    AMOUNT_FIELDS,
+    SettlementTemplateCache,
+    TransactionOutcome,
+    build_settlement_template,
+)
+
+MAJORITY_HASH_ID = 0
+MINORITY_HASH_ID = 1
+HASH_VALUES = ("0x" + "a" * 64, "0x" + "b" * 64)
+RESERVE_VOTE: Vote = ["AGREE", HASH_VALUES[MAJORITY_HASH_ID]]
+
+# Address streams of the simulation, apart from the transaction streams
+AGENT_STREAM = 1 << 32
+
+# Stakes carry over between transactions; these amounts accumulate
+FLOW_FIELDS = tuple(name for name in AMOUNT_FIELDS if name != "staked")
+
+# Participants, round results, budget and random stream of a played transaction
+PlayedTransaction = Tuple[
+    List[int], TransactionRoundResults, TransactionBudget, np.random.Generator
+]
+
+
+class Strategy(BaseModel):
+    """
+    How the validators following a strategy behave. Decisions are made for
+    every follower in a round at once: votes takes how many of them sit in
+    the committee and returns their vote codes and hash ids together.
+
+    The base strategy is honest: agree, with the majority hash.
+    """
+
+    model_config = ConfigDict(frozen=True)
+    name: str = "HONEST"
+
+    def votes(self, n: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        return (
+            np.full(n, VOTE_CODES["AGREE"], dtype=np.int8),
+            np.full(n, MAJORITY_HASH_ID, dtype=np.int64),
+        )
+
+    def leader_times_out(self, rng: np.random.Generator) -> bool:
+        return False
+
+    def wants_appeal(self, majority: MajorityOutcome, leader_timeout: bool) -> bool:
+        return False
+
+
+class Honest(Strategy):
+    name: str = "HONEST"
+
+
+class Lazy(Strategy):
+    """
+    Idles with probability idle_rate, as a validator or as a leader.
+    """
+
+    name: str = "LAZY"
+    idle_rate: float = Field(default=0.5, ge=0, le=1)
+
+    def votes(self, n: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        codes, hash_ids = super().votes(n, rng)
+        idle = rng.random(n) < self.idle_rate
+        codes[idle] = VOTE_CODES["IDLE"]
+        hash_ids[idle] = NO_HASH
+        return codes, hash_ids
+
+    def leader_times_out(self, rng: np.random.Generator) -> bool:
+        return bool(rng.random() < self.idle_rate)
+
+
+class AlwaysDisagree(Strategy):
+    name: str = "ALWAYS_DISAGREE"
+
+    def votes(self, n: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        codes, hash_ids = super().votes(n, rng)
+        codes[:] = VOTE_CODES["DISAGREE"]
+        return codes, hash_ids
+
+
+class HashDeviant(Strategy):
+    """
+    Agrees, but with a hash the honest majority does not share.
+    """
+
+    name: str = "HASH_DEVIANT"
+
+    def votes(self, n: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        codes, hash_ids = super().votes(n, rng)
+        hash_ids[:] = MINORITY_HASH_ID
+        return codes, hash_ids
+
+
+class OpportunisticAppealant(Strategy):
+    """
+    Votes honestly, and appeals every round whose leader timed out or whose
+    validators did not agree, betting on the appeal succeeding.
+    """
+
+    name: str = "OPPORTUNISTIC_APPEALANT"
+
+    def wants_appeal(self, majority: MajorityOutcome, leader_timeout: bool) -> bool:
+        return leader_timeout or majority in ("DISAGREE", "UNDETERMINED")
+
+
+class StrategyTotals(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    name: str
+    n_agents: int
+    cost: int
+    staked: int
+    earned: int
+    slashed: int
+    burned: int
+    stake: int
+
+
+class TransactionDraft:
+    """
+    A transaction of an AgentSimulation drawn round by round: each round
+    selects its committee, then closes with the members' votes and the
+    decision whether another round follows.
+    """
+
+    def __init__(
+        self,
+        simulation: "AgentSimulation",
+        rng: np.random.Generator,
+        max_appeals: int,
+    ):
+        self.simulation = simulation
+        self.rng = rng
+        self.max_appeals = max_appeals
+        self.participants: Dict[int, None] = {}
+        self.rounds: List[Round] = []
+        self.appealants: List[int] = []
+        self.round_index = 0
+        self.members = np.empty(0, dtype=np.intp)
+
+    def select_committee(self) -> np.ndarray:
+        simulation = self.simulation
+        # The draws of CommitteeSelector.select, kept as agent indexes
+        self.members = simulation.selector.sampler.sample_without_replacement(
+            self.rng,
+            simulation.params.round_sizes[self.round_index],
+            # Appeal rounds bring validators new to the appealed round
+            exclude=self.members if self.round_index % 2 == 1 else (),
+        ).astype(np.intp)
+        self.participants.update(dict.fromkeys(self.members.tolist()))
+        return self.members
+
+    def close_round(self) -> bool:
+        """
+        Vote the selected committee; True if another round follows.
+        """
+        simulation = self.simulation
+        rotation, reserves, majority, leader_timeout = simulation._rotation(
+            self.round_index, self.members, self.rng
+        )
+        self.rounds.append(Round.model_construct(rotations=[rotation]))
+        self.participants.update(dict.fromkeys(reserves.tolist()))
+        if self.round_index % 2 == 0:
+            if len(self.appealants) == self.max_appeals:
+                return False
+            appealant = simulation._appealant(majority, leader_timeout, self.rng)
+            if appealant is None:
+                return False
+            self.appealants.append(appealant)
+            self.participants[appealant] = None
+        self.round_index += 1
+        return True
+
+    def finish(
+        self,
+        leader_timeout: int,
+        validators_timeout: int,
+        appeal_rounds: Optional[int] = None,
+    ) -> Tuple[List[int], TransactionRoundResults, TransactionBudget]:
+        """
+        Participants, round results and budget; the budget prepays
+        appeal_rounds (by default the appeals made).
+        """
+        if appeal_rounds is None:
+            appeal_rounds = len(self.appealants)
+        simulation = self.simulation
+        budget = TransactionBudget(
+            leaderTimeout=leader_timeout,
+            validatorsTimeout=validators_timeout,
+            appealRounds=appeal_rounds,
+            rotations=[0] * (appeal_rounds + 1),
+            senderAddress=simulation.sender,
+            appeals=[
+                Appeal(appealantAddress=simulation.addresses[i])
+                for i in self.appealants
+            ],
+        )
+        return (
+            list(self.participants),
+            TransactionRoundResults.model_construct(rounds=self.rounds),
+            budget,
+        )
+
+
+class AgentSimulation:
+    """
+    Validators following strategies play transactions one after another,
+    each processed by the summary fee pipeline against the stakes left by
+    the ones before: committees are drawn by current stake and slashing
+    takes a share of it. Earnings are kept apart from stake. Transactions
+    that differ only in which agents play each part share a cached
+    SettlementTemplate.
+
+    Totals per agent and per strategy are updated after every transaction
+    from the participants only; every record_every transactions the stake
+    of each strategy is appended to its trajectory. Transaction i always
+    uses the random stream of i, so a run can be continued with run().
+    """
+
+    def __init__(
+        self,
+        population: Sequence[Tuple[Strategy, int]],
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+        leader_timeout: int = 100,
+        validators_timeout: int = 200,
+        max_appeals: int = 1,
+        root_seed: int = DEFAULT_ROOT_SEED,
+        record_every: int = 100,
+    ):
+        if not 0 <= 2 * max_appeals < len(params.round_sizes):
+            raise ValueError(f"Invalid appeal depth: {max_appeals}")
+        self.strategies = [strategy for strategy, _ in population]
+        self.params = params
+        self.leader_timeout = leader_timeout
+        self.validators_timeout = validators_timeout
+        self.max_appeals = max_appeals
+        self.record_every = record_every
+        self.streams = RandomStreams(root_seed)
+
+        counts = [count for _, count in population]
+        address_rng = np.random.default_rng(self.streams.seed_sequence(AGENT_STREAM))
+        self.addresses = generate_eth_addresses(sum(counts), address_rng)
+        self.sender = generate_eth_addresses(1, address_rng)[0]
+        self.index = {address: i for i, address in enumerate(self.addresses)}
+        self.strategy_ids = np.repeat(np.arange(len(counts)), counts)
+
+        n_agents = len(self.addresses)
+        self.stake = np.full(n_agents, params.default_stake, dtype=np.int64)
+        self.amounts = {
+            name: np.zeros(n_agents, dtype=np.int64) for name in FLOW_FIELDS
+        }
+        self.strategy_amounts = {
+            name: np.zeros(len(counts), dtype=np.int64) for name in FLOW_FIELDS
+        }
+        self.selector = CommitteeSelector(self.addresses, self.stake, params)
+        self.template_cache = PayoutTemplateCache()
+        self.settlement_cache = SettlementTemplateCache()
+        self._appeal_candidates: Dict[Tuple[MajorityOutcome, bool], np.ndarray] = {}
+        self.trajectory: List[np.ndarray] = []
+        self.n_transactions = 0
+        self.n_failed = 0
+        self.sender_cost = 0
+
+    def _rotation(
+        self,
+        round_index: int,
+        members: np.ndarray,
+        rng: np.random.Generator,
+    ) -> Tuple[Rotation, np.ndarray, MajorityOutcome, bool]:
+        # One votes call per strategy present in the committee
+        n = len(members)
+        codes = np.empty(n, dtype=np.int8)
+        hash_ids = np.empty(n, dtype=np.int64)
+        ids = self.strategy_ids[members]
+        for strategy_id in sorted(set(ids.tolist())):
+            mask = ids == strategy_id
+            codes[mask], hash_ids[mask] = self.strategies[strategy_id].votes(
+                int(mask.sum()), rng
+            )
+
+        is_normal = round_index % 2 == 0
+        leader_timeout = is_normal and self.strategies[ids[0]].leader_times_out(rng)
+        if leader_timeout:
+            codes[:] = VOTE_CODES["NA"]
+            hash_ids[:] = NO_HASH
+        elif is_normal and codes[0] == VOTE_CODES["IDLE"]:
+            # A leader that produced a receipt did not idle
+            codes[0], hash_ids[0] = VOTE_CODES["AGREE"], MAJORITY_HASH_ID
+
+        reserves = np.empty(0, dtype=np.intp)
+        n_idle = int(np.count_nonzero(codes == VOTE_CODES["IDLE"]))
+        if n_idle:
+            # Reserves stand in honestly for idle members
+            reserves = self.selector.sampler.sample_without_replacement(
+                rng, n_idle, exclude=members
+            ).astype(np.intp)
+        addresses = self.addresses
+
+        # The columns are valid by construction: skip Rotation.from_arrays checks
+        votes = CompactVotes(
+            tuple([addresses[i] for i in members.tolist()]),
+            codes,
+            hash_ids,
+            HASH_VALUES,
+            (
+                ("LEADER_TIMEOUT" if leader_timeout else "LEADER_RECEIPT")
+                if is_normal
+                else None
+            ),
+        )
+        rotation = Rotation.model_construct(
+            votes=votes,
+            reserve_votes={addresses[i]: RESERVE_VOTE for i in reserves.tolist()},
+        )
+        return rotation, reserves, compute_majority_from_codes(codes), leader_timeout
+
+    def _settlement_key(
+        self,
+        addresses: List[str],
+        transaction_results: TransactionRoundResults,
+        budget: TransactionBudget,
+    ) -> Optional[Hashable]:
+        # Everything a settlement depends on but stakes, with participants
+        # named by their position: transactions that only differ in which
+        # agents play each part share the key. None for votes this
+        # simulation did not draw.
+        position = {address: i for i, address in enumerate(addresses)}
+        rotations = []
+        for round_obj in transaction_results.rounds:
+            for rotation in round_obj.rotations:
+                votes = rotation.votes
+                if not isinstance(votes, CompactVotes):
+                    return None
+                rotations.append(
+                    (
+                        tuple([position.get(a, a) for a in votes.addresses]),
+                        votes.codes.tobytes(),
+                        None if votes.hash_ids is None else votes.hash_ids.tobytes(),
+                        votes.hash_values,
+                        votes.leader_action,
+                        tuple(
+                            [
+                                (position.get(a, a), str(vote))
+                                for a, vote in rotation.reserve_votes.items()
+                            ]
+                        ),
+                    )
+                )
+            rotations.append(None)  # round boundary
+        return (
+            tuple(rotations),
+            budget.leaderTimeout,
+            budget.validatorsTimeout,
+            budget.appealRounds,
+            tuple(budget.rotations),
+            position.get(budget.senderAddress, budget.senderAddress),
+            tuple(
+                [
+                    position.get(appeal.appealantAddress, appeal.appealantAddress)
+                    for appeal in budget.appeals or ()
+                ]
+            ),
+        )
+
+    def _appealant(
+        self, majority: MajorityOutcome, leader_timeout: bool, rng: np.random.Generator
+    ) -> Optional[int]:
+        # Agents of the strategies that want to appeal this round
+        candidates = self._appeal_candidates.get((majority, leader_timeout))
+        if candidates is None:
+            wanting = [
+                strategy_id
+                for strategy_id, strategy in enumerate(self.strategies)
+                if strategy.wants_appeal(majority, leader_timeout)
+            ]
+            candidates = np.flatnonzero(np.isin(self.strategy_ids, wanting))
+            self._appeal_candidates[(majority, leader_timeout)] = candidates
+        if not len(candidates):
+            return None
+        return int(rng.choice(candidates))
+
+    def build_transaction(
+        self, rng: np.random.Generator
+    ) -> Tuple[List[int], TransactionRoundResults, TransactionBudget]:
+        """
+        Draw the committees and votes of one transaction, appealing while an
+        appealant wants to and appeals are left.
+        """
+        draft = TransactionDraft(self, rng, self.max_appeals)
+        while True:
+            draft.select_committee()
+            if not draft.close_round():
+                break
+        return draft.finish(self.leader_timeout, self.validators_timeout)
+
+    def settle(
+        self,
+        participants: List[int],
+        transaction_results: TransactionRoundResults,
+        budget: TransactionBudget,
+        rng: np.random.Generator,
+    ) -> Optional[TransactionOutcome]:
+        """
+        Process a transaction against the current stakes and fold its outcome
+        into the totals; None if processing rejected it (e.g. a negative
+        sender refund).
+        """
+        return self.settle_batch([(participants, transaction_results, budget, rng)])[0]
+
+    def settle_batch(
+        self,
+        transactions: Sequence[PlayedTransaction],
+    ) -> List[Optional[TransactionOutcome]]:
+        """
+        settle for several transactions in order, each against the stakes
+        the ones before it left. Totals and the committee selector are
+        updated once for the whole batch.
+        """
+        outcomes: List[Optional[TransactionOutcome]] = []
+        indexes: List[np.ndarray] = []
+        amounts: Dict[str, List[np.ndarray]] = {name: [] for name in FLOW_FIELDS}
+        addresses, stake = self.addresses, self.stake
+        for participants, transaction_results, budget, _ in transactions:
+            positions = np.asarray(participants, dtype=np.intp)
+            participant_addresses = [addresses[i] for i in participants]
+            key = self._settlement_key(
+                participant_addresses, transaction_results, budget
+            )
+            try:
+                if key is None:
+                    template = build_settlement_template(
+                        participant_addresses,
+                        transaction_results,
+                        budget,
+                        self.template_cache,
+                        self.params,
+                    )
+                else:
+                    template = self.settlement_cache.template_for(
+                        key,
+                        participant_addresses,
+                        transaction_results,
+                        budget,
+                        self.template_cache,
+                        self.params,
+                    )
+            except ValueError:
+                self.n_failed += 1
+                outcomes.append(None)
+                continue
+            outcome = template.outcome(participant_addresses, stake[positions].tolist())
+            # The summary lists the staked addresses first, in the order
+            # given; every agent in the outcome is a participant
+            n = len(positions)
+            indexes.append(positions)
+            for name in FLOW_FIELDS:
+                amounts[name].append(
+                    np.asarray(getattr(outcome, name)[:n], dtype=np.int64)
+                )
+            stake[positions] -= amounts["slashed"][-1]
+            self.sender_cost -= int(outcome.net[outcome.index[self.sender]])
+            outcomes.append(outcome)
+
+        if not indexes:
+            return outcomes
+        all_indexes = np.concatenate(indexes)
+        strategy_ids = self.strategy_ids[all_indexes]
+        columns = {name: np.concatenate(amounts[name]) for name in FLOW_FIELDS}
+        for name, column in columns.items():
+            np.add.at(self.amounts[name], all_indexes, column)
+            np.add.at(self.strategy_amounts[name], strategy_ids, column)
+        for index in np.unique(all_indexes[columns["slashed"] > 0]).tolist():
+            self.selector.set_stake(self.addresses[index], self.stake[index])
+        return outcomes
+
+    def play(self, transaction_index: int) -> Optional[TransactionOutcome]:
+        """
+        Play one transaction; None if processing rejected it.
+        """
+        rng = self.streams.for_transaction(transaction_index)
+        return self.settle(*self.build_transaction(rng), rng)
+
+    def run(self, n_transactions: int) -> None:
+        for transaction_index in range(
+            self.n_transactions, self.n_transactions + n_transactions
+        ):
+            self.play(transaction_index)
+            self.n_transactions += 1
+            if self.n_transactions % self.record_every == 0:
+                self.trajectory.append(self.strategy_stakes())
+
+    def strategy_stakes(self) -> np.ndarray:
+        return np.bincount(
+            self.strategy_ids, weights=self.stake, minlength=len(self.strategies)
+        ).astype(np.int64)
+
+    def totals(self) -> List[StrategyTotals]:
+        n_agents = np.bincount(self.strategy_ids, minlength=len(self.strategies))
+        stakes = self.strategy_stakes()
+        return [
+            StrategyTotals(
+                name=strategy.name,
+                n_agents=int(n_agents[i]),
+                stake=int(stakes[i]),
+                staked=int(n_agents[i]) * self.params.default_stake,
+                **{name: int(self.strategy_amounts[name][i]) for name in FLOW_FIELDS},
+            )
+            for i, strategy in enumerate(self.strategies)
+        ]
@@ -0,0 +1,258 @@
+import contextlib
+import glob
+import io
+import os
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict
+
+from fee_simulator.models import (
+    TransactionBudget,
+    TransactionRoundResults,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.core.scenario_cache import PayoutTemplateCache
+
+# Addresses to stake, round results and budget of one transaction
+Transaction = Tuple[List[str], TransactionRoundResults, TransactionBudget]
+
+# Transactions of an epoch, given the epoch index and the stakes it starts with
+TransactionSource = Callable[[int, np.ndarray], Iterable[Transaction]]
+
+# Per-validator arrays saved in checkpoints
+STATE_ARRAYS = ("stake", "rewards", "slashed")
+
+# Amounts below this bound can be added in int64 without overflowing
+_INT64_SAFE_BOUND = 2**62
+
+
+def _fits_int64(*arrays: np.ndarray) -> bool:
+    return (
+        all(array.dtype != object for array in arrays)
+        and sum(int(np.abs(array).max(initial=0)) for array in arrays)
+        < _INT64_SAFE_BOUND
+    )
+
+
+class EpochSummary(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    epoch: int
+    n_transactions: int
+    n_failed: int
+    slashed: int
+    rewards: int
+    total_stake: int
+
+
+class EpochEngine:
+    """
+    Stakes of a validator population kept in one array and updated once per
+    epoch.
+
+    Every transaction of an epoch is processed in summary mode against the
+    stakes the epoch started with, so idle and hash-minority slashes are
+    their rates times those stakes. The slashes and earnings of all its
+    transactions are then summed per validator with one np.add.at and
+    applied in a single update; stakes never go below zero. Amounts stay
+    exact: int64 while no sum can overflow it, Python ints past that (wei
+    stakes, say), as in summary mode. Earnings are
+    added to stake when restake_rewards is set and kept in rewards either
+    way. Addresses outside the population (senders, say) are not tracked.
+
+    With a checkpoint directory, the state and settings are saved every
+    checkpoint_every epochs and resume() continues from the latest
+    checkpoint.
+    """
+
+    def __init__(
+        self,
+        addresses: Sequence[str],
+        params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+        stakes: Optional[Sequence[int]] = None,
+        restake_rewards: bool = False,
+        checkpoint_dir: Optional[str] = None,
+        checkpoint_every: int = 0,
+    ):
+        if stakes is not None and len(stakes) != len(addresses):
+            raise ValueError("Addresses and stakes must have the same length")
+        if checkpoint_every and checkpoint_dir is None:
+            raise ValueError("Checkpoints need a directory")
+        self.addresses = list(addresses)
+        self.index = {address: i for i, address in enumerate(self.addresses)}
+        self.params = params
+        self.restake_rewards = restake_rewards
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        n_validators = len(self.addresses)
+        if stakes is None:
+            stakes = [params.default_stake] * n_validators
+        self.stake = np.array([int(stake) for stake in stakes], dtype=object)
+        if max(self.stake, default=0) < _INT64_SAFE_BOUND:
+            self.stake = self.stake.astype(np.int64)
+        self.rewards = np.zeros(n_validators, dtype=self.stake.dtype)
+        self.slashed = np.zeros(n_validators, dtype=self.stake.dtype)
+        self.epoch = 0
+        self.template_cache = PayoutTemplateCache()
+
+    def _positions(self, addresses: Sequence[str]) -> np.ndarray:
+        # Index in the population of each address, -1 outside it
+        return np.fromiter(
+            (self.index.get(address, -1) for address in addresses),
+            dtype=np.intp,
+            count=len(addresses),
+        )
+
+    def process_epoch(self, transactions: Iterable[Transaction]) -> EpochSummary:
+        stake = self.stake
+        indexes: List[np.ndarray] = []
+        slashes: List[np.ndarray] = []
+        earnings: List[np.ndarray] = []
+        n_transactions = n_failed = 0
+        for addresses, transaction_results, budget in transactions:
+            n_transactions += 1
+            positions = self._positions(addresses)
+            known = positions >= 0
+            stakes = np.where(
+                known, stake[positions], self.params.default_stake
+            ).tolist()
+            try:
+                # Refund errors dump the fee table before raising
+                with contextlib.redirect_stdout(io.StringIO()):
+                    outcome = process_transaction(
+                        addresses,
+                        transaction_results,
+                        budget,
+                        mode="summary",
+                        template_cache=self.template_cache,
+                        params=self.params,
+                        stakes=stakes,
+                    )
+            except ValueError:
+                n_failed += 1
+                continue
+            positions = self._positions(outcome.addresses)
+            known = positions >= 0
+            indexes.append(positions[known])
+            slashes.append(outcome.slashed[known])
+            earnings.append(outcome.earned[known])
+
+        n_validators = len(self.addresses)
+        if indexes:
+            index = np.concatenate(indexes)
+            slashed = self._totals(index, np.concatenate(slashes), n_validators)
+            earned = self._totals(index, np.concatenate(earnings), n_validators)
+        else:
+            slashed = earned = np.zeros(n_validators, dtype=np.int64)
+        if not _fits_int64(slashed, earned, *(getattr(self, n) for n in STATE_ARRAYS)):
+            # Python ints from here on, as summary mode does past int64
+            slashed, earned = slashed.astype(object), earned.astype(object)
+            for name in STATE_ARRAYS:
+                setattr(self, name, getattr(self, name).astype(object))
+            stake = self.stake
+        slashed = np.minimum(slashed, stake)
+        self.stake = stake - slashed
+        if self.restake_rewards:
+            self.stake += earned
+        self.slashed += slashed
+        self.rewards += earned
+        self.epoch += 1
+        if self.checkpoint_every and self.epoch % self.checkpoint_every == 0:
+            self.checkpoint()
+        return EpochSummary(
+            epoch=self.epoch,
+            n_transactions=n_transactions,
+            n_failed=n_failed,
+            slashed=int(slashed.sum()),
+            rewards=int(earned.sum()),
+            total_stake=int(self.stake.sum()),
+        )
+
+    @staticmethod
+    def _totals(index: np.ndarray, amounts: np.ndarray, size: int) -> np.ndarray:
+        # Exact per-validator sums: int64 while no sum can overflow it,
+        # Python ints otherwise
+        dtype = (
+            np.int64
+            if _fits_int64(amounts)
+            and int(np.abs(amounts).max(initial=0)) * len(amounts) < _INT64_SAFE_BOUND
+            else object
+        )
+        totals = np.zeros(size, dtype=dtype)
+        np.add.at(totals, index, amounts.astype(dtype))
+        return totals
+
+    def run(self, source: TransactionSource, n_epochs: int) -> List[EpochSummary]:
+        """
+        Process n_epochs more epochs, drawing each epoch's transactions from
+        source. A source that depends only on its arguments gives the same
+        run whether or not it was interrupted and resumed.
+        """
+        return [
+            self.process_epoch(source(self.epoch, self.stake)) for _ in range(n_epochs)
+        ]
+
+    def checkpoint(self) -> str:
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        path = os.path.join(self.checkpoint_dir, f"epoch-{self.epoch:08d}.npz")
+        # Written aside and renamed, so a crash never leaves a partial file
+        partial = path + ".partial"
+        with open(partial, "wb") as f:
+            np.savez(
+                f,
+                epoch=self.epoch,
+                addresses=np.array(self.addresses, dtype=str),
+                params=self.params.model_dump_json(),
+                restake_rewards=self.restake_rewards,
+                # Python int columns as decimal strings, to load without pickle
+                **{
+                    name: (
+                        getattr(self, name).astype(str)
+                        if getattr(self, name).dtype == object
+                        else getattr(self, name)
+                    )
+                    for name in STATE_ARRAYS
+                },
+            )
+        os.replace(partial, path)
+        return path
+
+    @classmethod
+    def resume(
+        cls,
+        checkpoint_dir: str,
+        params: Optional[ProtocolParams] = None,
+        restake_rewards: Optional[bool] = None,
+        checkpoint_every: int = 0,
+    ) -> "EpochEngine":
+        """
+        An engine in the state of the latest checkpoint in checkpoint_dir,
+        with the params and restake_rewards it was saved with. Passing
+        different ones raises ValueError, as the run would change.
+        """
+        paths = sorted(glob.glob(os.path.join(checkpoint_dir, "epoch-*.npz")))
+        if not paths:
+            raise FileNotFoundError(f"No checkpoints in {checkpoint_dir}")
+        with np.load(paths[-1]) as checkpoint:
+            saved_params = ProtocolParams.model_validate_json(str(checkpoint["params"]))
+            saved_restake = bool(checkpoint["restake_rewards"])
+            if params is not None and params != saved_params:
+                raise ValueError("params differ from those of the checkpoint")
+            if restake_rewards is not None and restake_rewards != saved_restake:
+                raise ValueError("restake_rewards differs from the checkpoint's")
+            engine = cls(
+                checkpoint["addresses"].tolist(),
+                saved_params,
+                restake_rewards=saved_restake,
+                checkpoint_dir=checkpoint_dir,
+                checkpoint_every=checkpoint_every,
+            )
+            engine.epoch = int(checkpoint["epoch"])
+            for name in STATE_ARRAYS:
+                column = checkpoint[name]
+                if column.dtype.kind == "U":
+                    column = np.array([int(x) for x in column.tolist()], dtype=object)
+                setattr(engine, name, column)
+        return engine
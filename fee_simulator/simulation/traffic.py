@@ -0,0 +1,416 @@
+import heapq
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, ConfigDict, model_validator
+
+from fee_simulator.utils import compute_total_cost
+from fee_simulator.simulation.agents import (
+    AGENT_STREAM,
+    AgentSimulation,
+    TransactionDraft,
+)
+
+# Stream of the arrival process, apart from the agent and transaction streams
+ARRIVAL_STREAM = AGENT_STREAM + 1
+
+# Event kinds, in the order simultaneous events are handled
+ROUND_END = 0
+BLOCK = 1
+ARRIVAL = 2
+
+# Exponential gaps drawn per refill of the arrival buffer
+_GAP_BATCH = 4096
+
+WINDOW_FIELDS = (
+    "arrived",
+    "included",
+    "completed",
+    "failed",
+    "fees",
+    "rewards",
+    "burned",
+    "busy",
+    "waiting",
+    "latency",
+    "mempool_peak",
+)
+
+
+class DiscreteDistribution(BaseModel):
+    """
+    Integer values drawn with the given weights (uniformly without them).
+    """
+
+    model_config = ConfigDict(frozen=True)
+    values: Tuple[int, ...]
+    weights: Optional[Tuple[float, ...]] = None
+
+    @model_validator(mode="after")
+    def validate_weights(self):
+        if not self.values:
+            raise ValueError("A distribution needs at least one value")
+        if self.weights is not None:
+            if len(self.weights) != len(self.values):
+                raise ValueError("Values and weights must have the same length")
+            if min(self.weights) < 0 or sum(self.weights) <= 0:
+                raise ValueError("Weights must be non-negative with a positive sum")
+        return self
+
+    def sample(self, rng: np.random.Generator) -> int:
+        if len(self.values) == 1:
+            return self.values[0]
+        p = None
+        if self.weights is not None:
+            p = np.asarray(self.weights) / sum(self.weights)
+        return int(self.values[rng.choice(len(self.values), p=p)])
+
+
+class Scheduler:
+    """
+    Heap of timed events. Events at the same time pop by kind, then in the
+    order they were pushed.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, int, Any]] = []
+        self._order = itertools.count()
+        self.n_events = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, time: float, kind: int, payload: Any = None) -> None:
+        heapq.heappush(self._heap, (time, kind, next(self._order), payload))
+
+    def next_time(self) -> float:
+        return self._heap[0][0]
+
+    def pop(self) -> Tuple[float, int, Any]:
+        time, kind, _, payload = heapq.heappop(self._heap)
+        self.n_events += 1
+        return time, kind, payload
+
+
+class WindowStats:
+    """
+    Totals per time window of bucket_width: arrivals, inclusions and
+    completions, fees paid by senders, rewards of leaders and validators,
+    burned fees, validator-time spent in committees, summed waiting (arrival
+    to inclusion) of the transactions included and latency (arrival to
+    completion) of those completed, and the largest mempool a block saw.
+    """
+
+    def __init__(self, bucket_width: float, n_validators: int):
+        self.bucket_width = bucket_width
+        self.n_validators = n_validators
+        self._size = 0
+        self._arrays = {name: np.zeros(64) for name in WINDOW_FIELDS}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        if name in WINDOW_FIELDS:
+            return self._arrays[name][: self._size]
+        raise AttributeError(name)
+
+    def bucket(self, time: float) -> int:
+        bucket = int(time // self.bucket_width)
+        if bucket >= self._size:
+            capacity = len(self._arrays["busy"])
+            if bucket >= capacity:
+                capacity = max(2 * capacity, bucket + 1)
+                for name, array in self._arrays.items():
+                    grown = np.zeros(capacity)
+                    grown[: len(array)] = array
+                    self._arrays[name] = grown
+            self._size = bucket + 1
+        return bucket
+
+    def add(self, name: str, time: float, amount: float = 1) -> None:
+        self._arrays[name][self.bucket(time)] += amount
+
+    def add_at(self, name: str, times: np.ndarray, amounts: np.ndarray) -> None:
+        if not len(times):
+            return
+        self.bucket(float(times.max()))  # grows the arrays
+        buckets = (times // self.bucket_width).astype(np.intp)
+        np.add.at(self._arrays[name], buckets, amounts)
+
+    def peak(self, name: str, time: float, amount: float) -> None:
+        array = self._arrays[name]
+        bucket = self.bucket(time)
+        array[bucket] = max(array[bucket], amount)
+
+    def spread(self, name: str, start: float, stop: float, rate: float) -> None:
+        # Split rate * (stop - start) over the windows the interval covers
+        first, last = self.bucket(start), self.bucket(stop)
+        array = self._arrays[name]
+        if first == last:
+            array[first] += rate * (stop - start)
+            return
+        width = self.bucket_width
+        array[first] += rate * ((first + 1) * width - start)
+        array[first + 1 : last] += rate * width
+        array[last] += rate * (stop - last * width)
+
+    @property
+    def starts(self) -> np.ndarray:
+        return np.arange(self._size) * self.bucket_width
+
+    @property
+    def utilization(self) -> np.ndarray:
+        """
+        Mean number of committees a validator sits in over each window.
+        """
+        return self.busy / (self.n_validators * self.bucket_width)
+
+
+class _Transaction:
+    __slots__ = (
+        "index",
+        "arrival",
+        "included",
+        "completed",
+        "rng",
+        "timeouts",
+        "draft",
+        "fee",
+    )
+
+    def __init__(self, index, arrival, rng, timeouts, draft, fee):
+        self.index = index
+        self.arrival = arrival
+        self.included = None
+        self.completed = None
+        self.rng = rng
+        self.timeouts = timeouts
+        self.draft = draft
+        self.fee = fee
+
+
+class TrafficSimulation:
+    """
+    Discrete-event simulation of transactions arriving over time and
+    processed by the validators of an AgentSimulation.
+
+    Transactions arrive as a Poisson process until horizon and wait in a
+    mempool; every block_time a block includes up to block_capacity of them,
+    highest prepaid fee first. Each round of an included transaction holds
+    its committee for round_duration, after which its members vote and the
+    transaction appeals or completes.
+
+    Settlement is kept off the event loop: completed transactions wait, and
+    every block first settles those completed since the block before, in
+    completion order, through the fee pipeline in one batch (see
+    AgentSimulation.settle_batch). Committees drawn between two blocks thus
+    see the stakes as of the last block. Fees, rewards and burns count in
+    the window a transaction completed in; whatever is left unsettled when
+    the queue drains is settled then.
+
+    Committees are drawn by stake whether or not their members already sit
+    in other committees; concurrent assignments are counted per validator.
+    """
+
+    def __init__(
+        self,
+        agents: AgentSimulation,
+        arrival_rate: float,
+        horizon: float,
+        block_time: float = 1.0,
+        block_capacity: int = 100,
+        round_duration: float = 1.0,
+        leader_timeouts: DiscreteDistribution = DiscreteDistribution(values=(100,)),
+        validators_timeouts: DiscreteDistribution = DiscreteDistribution(values=(200,)),
+        appeal_rounds: DiscreteDistribution = DiscreteDistribution(values=(1,)),
+        bucket_width: Optional[float] = None,
+        process_fees: bool = True,
+    ):
+        if arrival_rate <= 0 or block_time <= 0 or round_duration <= 0:
+            raise ValueError("Rates and durations must be positive")
+        if block_capacity < 1:
+            raise ValueError("Blocks must hold at least one transaction")
+        if not all(
+            0 <= 2 * rounds < len(agents.params.round_sizes)
+            for rounds in appeal_rounds.values
+        ):
+            raise ValueError(f"Invalid appeal rounds: {appeal_rounds.values}")
+        self.agents = agents
+        self.arrival_rate = arrival_rate
+        self.horizon = horizon
+        self.block_time = block_time
+        self.block_capacity = block_capacity
+        self.round_duration = round_duration
+        self.leader_timeouts = leader_timeouts
+        self.validators_timeouts = validators_timeouts
+        self.appeal_rounds = appeal_rounds
+        self.process_fees = process_fees
+
+        n_agents = len(agents.addresses)
+        self.windows = WindowStats(bucket_width or block_time, n_agents)
+        self.load = np.zeros(n_agents, dtype=np.int64)
+        self.max_load = np.zeros(n_agents, dtype=np.int64)
+        self.assignments = np.zeros(n_agents, dtype=np.int64)
+        self.busy_time = np.zeros(n_agents)
+
+        self.scheduler = Scheduler()
+        self.mempool: List[Tuple[int, int, _Transaction]] = []
+        self.now = 0.0
+        self.n_arrived = 0
+        self.n_in_flight = 0
+        self.n_completed = 0
+        self._arrivals_done = False
+        self._unsettled: List[_Transaction] = []
+        # Prepaid fee of each (timeouts, appeal rounds) drawn so far
+        self._fees: Dict[Tuple[int, int, int], int] = {}
+
+        self._arrival_rng = np.random.default_rng(
+            agents.streams.seed_sequence(ARRIVAL_STREAM, agents.n_transactions)
+        )
+        self._gaps = np.empty(0)
+        self._next_gap = 0
+        self._schedule_arrival(0.0)
+        self.scheduler.push(block_time, BLOCK)
+
+    def _schedule_arrival(self, time: float) -> None:
+        if self._next_gap == len(self._gaps):
+            self._gaps = self._arrival_rng.exponential(
+                1 / self.arrival_rate, _GAP_BATCH
+            )
+            self._next_gap = 0
+        time += float(self._gaps[self._next_gap])
+        self._next_gap += 1
+        if time < self.horizon:
+            self.scheduler.push(time, ARRIVAL)
+        else:
+            self._arrivals_done = True
+
+    def _arrive(self, time: float) -> None:
+        # Share the transaction counter so later runs draw fresh streams
+        index = self.agents.n_transactions
+        self.agents.n_transactions += 1
+        rng = self.agents.streams.for_transaction(index)
+        timeouts = (
+            self.leader_timeouts.sample(rng),
+            self.validators_timeouts.sample(rng),
+        )
+        appeal_rounds = self.appeal_rounds.sample(rng)
+        draft = TransactionDraft(self.agents, rng, appeal_rounds)
+        fee = self._fees.get((*timeouts, appeal_rounds))
+        if fee is None:
+            fee = self._fees[(*timeouts, appeal_rounds)] = compute_total_cost(
+                draft.finish(*timeouts, appeal_rounds)[2], self.agents.params
+            )
+        transaction = _Transaction(index, time, rng, timeouts, draft, fee)
+        heapq.heappush(self.mempool, (-fee, index, transaction))
+        self.n_arrived += 1
+        self.windows.add("arrived", time)
+        self._schedule_arrival(time)
+
+    def _start_round(self, time: float, transaction: _Transaction) -> None:
+        members = transaction.draft.select_committee()
+        self.load[members] += 1
+        self.max_load[members] = np.maximum(self.max_load[members], self.load[members])
+        self.assignments[members] += 1
+        self.busy_time[members] += self.round_duration
+        stop = time + self.round_duration
+        self.windows.spread("busy", time, stop, len(members))
+        self.scheduler.push(stop, ROUND_END, transaction)
+
+    def _block(self, time: float) -> None:
+        self.settle()
+        windows = self.windows
+        windows.peak("mempool_peak", time, len(self.mempool))
+        for _ in range(min(self.block_capacity, len(self.mempool))):
+            _, _, transaction = heapq.heappop(self.mempool)
+            transaction.included = time
+            self.n_in_flight += 1
+            windows.add("included", time)
+            windows.add("waiting", time, time - transaction.arrival)
+            self._start_round(time, transaction)
+        if self.mempool or not self._arrivals_done:
+            self.scheduler.push(time + self.block_time, BLOCK)
+
+    def _end_round(self, time: float, transaction: _Transaction) -> None:
+        draft = transaction.draft
+        self.load[draft.members] -= 1
+        if draft.close_round():
+            self._start_round(time, transaction)
+            return
+        self.n_in_flight -= 1
+        self.n_completed += 1
+        windows = self.windows
+        windows.add("completed", time)
+        windows.add("latency", time, time - transaction.arrival)
+        if self.process_fees:
+            transaction.completed = time
+            self._unsettled.append(transaction)
+
+    def settle(self) -> None:
+        """
+        Settle the transactions completed and not settled yet, in one batch.
+        """
+        if not self._unsettled:
+            return
+        transactions, self._unsettled = self._unsettled, []
+        outcomes = self.agents.settle_batch(
+            [
+                (
+                    *transaction.draft.finish(
+                        *transaction.timeouts, transaction.draft.max_appeals
+                    ),
+                    transaction.rng,
+                )
+                for transaction in transactions
+            ]
+        )
+        times = np.array([transaction.completed for transaction in transactions])
+        settled = np.array([outcome is not None for outcome in outcomes])
+        rows = [outcome for outcome in outcomes if outcome is not None]
+        sender = self.agents.sender
+        windows = self.windows
+        windows.add_at("failed", times[~settled], np.ones(len(outcomes) - len(rows)))
+        windows.add_at(
+            "fees",
+            times[settled],
+            np.array([-int(outcome.net[outcome.index[sender]]) for outcome in rows]),
+        )
+        windows.add_at(
+            "rewards",
+            times[settled],
+            np.array(
+                [
+                    sum(
+                        outcome.role_totals.get(role, {}).get("earned", 0)
+                        for role in ("LEADER", "VALIDATOR")
+                    )
+                    for outcome in rows
+                ]
+            ),
+        )
+        windows.add_at(
+            "burned",
+            times[settled],
+            np.array([int(outcome.burned.sum()) for outcome in rows]),
+        )
+
+    def run(self, until: Optional[float] = None) -> None:
+        """
+        Handle events in time order until the queue drains, or up to time
+        until; a run can be continued with a later until.
+        """
+        scheduler = self.scheduler
+        handlers = {
+            ARRIVAL: lambda time, _: self._arrive(time),
+            BLOCK: lambda time, _: self._block(time),
+            ROUND_END: self._end_round,
+        }
+        while len(scheduler):
+            if until is not None and scheduler.next_time() > until:
+                return
+            time, kind, payload = scheduler.pop()
+            self.now = time
+            handlers[kind](time, payload)
+        self.settle()
@@ -28,3 +28,5 @@ RoundLabel = Literal[
     "LEADER_TIMEOUT_50_PREVIOUS_APPEAL_BOND",
     "LEADER_TIMEOUT_150_PREVIOUS_NORMAL_ROUND",
 ]
+
+ProcessingMode = Literal["events", "symbolic", "summary"]
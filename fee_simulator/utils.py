@@ -1,28 +1,37 @@
 import random
 import string
 import hashlib
-from typing import Union
+from functools import lru_cache
+from math import floor
+from typing import Callable, Dict, Optional, Sequence, Tuple, Union
 from decimal import Decimal, ROUND_DOWN
 from typing import List
+import numpy as np
 from fee_simulator.models import (
     FeeEvent,
     TransactionBudget,
     EventSequence,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
 )
-from fee_simulator.constants import (
-    ROUND_SIZES,
-    DEFAULT_STAKE,
-)
+from fee_simulator.constants import DEFAULT_STAKE
 
 
-def generate_random_eth_address() -> str:
+def generate_random_eth_address(rng: Optional[np.random.Generator] = None) -> str:
+    if rng is not None:
+        return "0x" + rng.bytes(20).hex()
     seed = "".join(random.choices(string.ascii_letters + string.digits, k=32))
     hashed = hashlib.sha256(seed.encode()).hexdigest()
     return "0x" + hashed[:40]
 
 
+def generate_eth_addresses(count: int, rng: np.random.Generator) -> List[str]:
+    raw = rng.bytes(20 * count).hex()
+    return ["0x" + raw[i * 40 : (i + 1) * 40] for i in range(count)]
+
+
 def initialize_constant_stakes(
-    event_sequence: EventSequence, addresses: List[str]
+    event_sequence: EventSequence, addresses: List[str], stake: int = DEFAULT_STAKE
 ) -> List[FeeEvent]:
     events = []
     for addr in addresses:
@@ -30,13 +39,95 @@ def initialize_constant_stakes(
             FeeEvent(
                 sequence_id=event_sequence.next_id(),
                 address=addr,
-                staked=DEFAULT_STAKE,
+                staked=stake,
             )
         )
     return events
 
 
-def compute_total_cost(transaction_budget: TransactionBudget) -> int:
+@lru_cache(maxsize=16)
+def load_empirical_stakes(path: str) -> np.ndarray:
+    if path.endswith(".npy"):
+        stakes = np.load(path)
+    else:
+        stakes = np.loadtxt(path, delimiter=",", ndmin=1)
+    stakes = np.asarray(stakes, dtype=float).ravel()
+    if stakes.size == 0:
+        raise ValueError(f"No stakes found in {path}")
+    stakes.setflags(write=False)
+    return stakes
+
+
+def sample_stakes(
+    count: int,
+    transaction_budget: TransactionBudget,
+    rng: np.random.Generator,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> np.ndarray:
+    """
+    Draw the stakes of `count` addresses in one vectorized call.
+
+    Samples are truncated at zero and rounded to whole units.
+    """
+    distribution = transaction_budget.staking_distribution
+    if distribution == "constant":
+        return np.full(count, params.default_stake, dtype=np.int64)
+    if distribution == "normal":
+        samples = rng.normal(
+            transaction_budget.staking_mean,
+            np.sqrt(transaction_budget.staking_variance),
+            size=count,
+        )
+    elif distribution == "lognormal":
+        # Parametrized by the mean and variance of the stake itself
+        mean = transaction_budget.staking_mean
+        sigma2 = np.log1p(transaction_budget.staking_variance / mean**2)
+        samples = rng.lognormal(np.log(mean) - sigma2 / 2, np.sqrt(sigma2), size=count)
+    elif distribution == "empirical":
+        samples = rng.choice(
+            load_empirical_stakes(transaction_budget.staking_file), size=count
+        )
+    else:
+        raise ValueError(f"Unknown staking distribution: {distribution}")
+    return np.rint(np.maximum(samples, 0)).astype(np.int64)
+
+
+def initialize_stakes(
+    event_sequence: EventSequence,
+    addresses: List[str],
+    transaction_budget: TransactionBudget,
+    rng: np.random.Generator,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+    stakes: Optional[Sequence[int]] = None,
+) -> List[FeeEvent]:
+    """
+    Staking events of the addresses: the given stakes, or else stakes drawn
+    from the budget's staking distribution.
+    """
+    if stakes is not None:
+        if len(stakes) != len(addresses):
+            raise ValueError("Addresses and stakes must have the same length")
+    elif transaction_budget.staking_distribution == "constant":
+        return initialize_constant_stakes(
+            event_sequence, addresses, params.default_stake
+        )
+    else:
+        stakes = sample_stakes(len(addresses), transaction_budget, rng, params).tolist()
+    return [
+        FeeEvent(
+            sequence_id=event_sequence.next_id(),
+            address=addr,
+            staked=stake,
+        )
+        for addr, stake in zip(addresses, stakes)
+    ]
+
+
+def compute_total_cost(
+    transaction_budget: TransactionBudget,
+    params: ProtocolParams = DEFAULT_PROTOCOL_PARAMS,
+) -> int:
+    round_sizes = params.round_sizes
     max_round_price = 0
     max_appealant_reward = (
         transaction_budget.appealRounds * transaction_budget.leaderTimeout
@@ -45,14 +136,14 @@ def compute_total_cost(transaction_budget: TransactionBudget) -> int:
     for i in range(num_rounds):
         if i % 2 == 0:
             max_round_price += (
-                ROUND_SIZES[i]
+                round_sizes[i]
                 * (transaction_budget.rotations[i // 2] + 1)
                 * transaction_budget.validatorsTimeout
                 + transaction_budget.leaderTimeout
             )
         else:
             max_round_price += (
-                ROUND_SIZES[i] * transaction_budget.validatorsTimeout
+                round_sizes[i] * transaction_budget.validatorsTimeout
                 + transaction_budget.leaderTimeout
             )
     total_cost = max_appealant_reward + max_round_price
@@ -79,3 +170,20 @@ def split_amount(amount: int, num_recipients: int, decimals: int = 18) -> int:
         Decimal("1."), rounding=ROUND_DOWN
     )
     return to_wei(per_recipient, decimals)
+
+
+def apply_slash_rates(
+    rates: Sequence[Tuple[str, float]], current_stake: Callable[[str], int]
+) -> List[Tuple[str, int]]:
+    """
+    The (address, slashed) amounts of (address, rate) slashes taken in order,
+    each from the stake the slashes before it left.
+    """
+    slashes = []
+    slashed_here: Dict[str, int] = {}
+    for addr, rate in rates:
+        stake = current_stake(addr) - slashed_here.get(addr, 0)
+        slashed = floor(stake * rate)
+        slashed_here[addr] = slashed_here.get(addr, 0) + slashed
+        slashes.append((addr, slashed))
+    return slashes
@@ -0,0 +1,80 @@
+from fee_simulator.models import (
+    TransactionRoundResults,
+    Round,
+    Rotation,
+    EventSequence,
+    OverlayVotes,
+)
+from fee_simulator.ledger import FeeEventLedger
+from fee_simulator.core.idleness import replace_idle_participants
+from fee_simulator.core.majority import encode_votes
+from fee_simulator.utils import initialize_constant_stakes, generate_random_eth_address
+from fee_simulator.constants import DEFAULT_STAKE
+
+addresses_pool = [generate_random_eth_address() for _ in range(10)]
+
+rotation = Rotation(
+    votes={
+        addresses_pool[0]: ["LEADER_RECEIPT", "AGREE"],
+        addresses_pool[1]: "IDLE",
+        addresses_pool[2]: "AGREE",
+        addresses_pool[3]: "IDLE",
+        addresses_pool[4]: "DISAGREE",
+    },
+    reserve_votes={
+        addresses_pool[2]: "AGREE",  # already voting, never a replacement
+        addresses_pool[5]: "AGREE",
+        addresses_pool[6]: "TIMEOUT",
+        addresses_pool[7]: "AGREE",
+    },
+)
+
+
+def test_idle_replacement_overlays_original_votes():
+    transaction_results = TransactionRoundResults(
+        rounds=[Round(rotations=[rotation]), Round(rotations=[rotation])]
+    )
+    fee_events = FeeEventLedger(
+        initialize_constant_stakes(EventSequence(), addresses_pool)
+    )
+    n_events = len(fee_events)
+
+    replaced, idle_events = replace_idle_participants(
+        EventSequence(), fee_events, transaction_results
+    )
+
+    assert len(fee_events) == n_events  # the input is only read
+    votes = replaced.rounds[0].rotations[-1].votes
+    assert isinstance(votes, OverlayVotes)
+    assert votes.base is rotation.votes
+    assert votes.removed == {1, 3}
+    assert list(votes) == [
+        addresses_pool[0],
+        addresses_pool[2],
+        addresses_pool[4],
+        addresses_pool[5],
+        addresses_pool[6],
+    ]
+    assert addresses_pool[1] not in votes
+    assert votes[addresses_pool[6]] == "TIMEOUT"
+
+    addresses, normalized, codes = encode_votes(votes)
+    assert addresses == list(votes)
+    assert normalized == ["AGREE", "AGREE", "DISAGREE", "AGREE", "TIMEOUT"]
+    assert codes.tolist() == encode_votes(votes.to_dict())[2].tolist()
+
+    # Idle in both rounds: the second slash applies to the reduced stake
+    slashes = [e.slashed for e in idle_events if e.address == addresses_pool[1]]
+    assert slashes == [DEFAULT_STAKE // 100, (DEFAULT_STAKE * 99 // 100) // 100]
+
+
+def test_rounds_without_idle_validators_are_untouched():
+    clean = Rotation(votes={addresses_pool[0]: ["LEADER_RECEIPT", "AGREE"]})
+    transaction_results = TransactionRoundResults(rounds=[Round(rotations=[clean])])
+
+    replaced, idle_events = replace_idle_participants(
+        EventSequence(), FeeEventLedger(), transaction_results
+    )
+
+    assert replaced is transaction_results
+    assert idle_events == []
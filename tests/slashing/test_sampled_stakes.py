@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+from fee_simulator.models import (
+    TransactionRoundResults,
+    Round,
+    Rotation,
+    TransactionBudget,
+)
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.utils import generate_random_eth_address, sample_stakes
+from fee_simulator.rng import transaction_rng
+from fee_simulator.fee_aggregators.address_metrics import (
+    compute_current_stake,
+    compute_total_slashed,
+)
+
+addresses_pool = [generate_random_eth_address() for _ in range(20)]
+
+
+def make_budget(**staking):
+    return TransactionBudget(
+        leaderTimeout=100,
+        validatorsTimeout=200,
+        appealRounds=0,
+        rotations=[0],
+        senderAddress=addresses_pool[19],
+        appeals=[],
+        **staking,
+    )
+
+
+def test_sample_stakes_distributions(tmp_path):
+    normal = sample_stakes(
+        10000,
+        make_budget(
+            staking_distribution="normal", staking_mean=1000, staking_variance=250000
+        ),
+        transaction_rng(3, 0),
+    )
+    assert normal.min() == 0  # truncated at zero
+    assert abs(normal.mean() - 1000) < 50
+
+    lognormal = sample_stakes(
+        10000,
+        make_budget(
+            staking_distribution="lognormal", staking_mean=1000, staking_variance=10000
+        ),
+        transaction_rng(3, 0),
+    )
+    assert lognormal.min() > 0
+    assert abs(lognormal.mean() - 1000) < 10
+
+    stakes_file = tmp_path / "stakes.csv"
+    stakes_file.write_text("10\n20\n30\n")
+    empirical = sample_stakes(
+        100,
+        make_budget(staking_distribution="empirical", staking_file=str(stakes_file)),
+        transaction_rng(3, 0),
+    )
+    assert set(empirical.tolist()) <= {10, 20, 30}
+
+
+def test_staking_params_validation():
+    with pytest.raises(ValueError):
+        make_budget(staking_distribution="lognormal", staking_mean=1000)
+    with pytest.raises(ValueError):
+        make_budget(staking_distribution="empirical")
+    with pytest.raises(ValueError):
+        make_budget(staking_file="stakes.csv")
+
+
+def test_slashing_acts_on_sampled_stakes():
+    budget = make_budget(
+        staking_distribution="normal", staking_mean=2000000, staking_variance=10**10
+    )
+    rotation = Rotation(
+        votes={
+            addresses_pool[0]: ["LEADER_RECEIPT", "AGREE", "0xaa"],
+            addresses_pool[1]: ["AGREE", "0xaa"],
+            addresses_pool[2]: ["AGREE", "0xaa"],
+            addresses_pool[3]: ["AGREE", "0xbb"],
+            addresses_pool[4]: "IDLE",
+        },
+        reserve_votes={addresses_pool[5]: ["AGREE", "0xaa"]},
+    )
+    transaction_results = TransactionRoundResults(rounds=[Round(rotations=[rotation])])
+
+    fee_events, _ = process_transaction(
+        addresses_pool, transaction_results, budget, rng=transaction_rng(11, 0)
+    )
+    replayed, _ = process_transaction(
+        addresses_pool, transaction_results, budget, rng=transaction_rng(11, 0)
+    )
+    assert fee_events == replayed
+
+    stakes = sample_stakes(len(addresses_pool), budget, transaction_rng(11, 0))
+    assert len(set(stakes.tolist())) > 1
+    # Idle validator loses 1%, hash-minority validator loses 1%
+    for i in (3, 4):
+        assert compute_total_slashed(fee_events, addresses_pool[i]) == int(
+            stakes[i] * 0.01
+        )
+        assert compute_current_stake(addresses_pool[i], fee_events) == stakes[i] - int(
+            stakes[i] * 0.01
+        )
+    assert compute_total_slashed(fee_events, addresses_pool[1]) == 0
+
+
+def test_slashing_acts_on_given_stakes():
+    rotation = Rotation(
+        votes={
+            addresses_pool[0]: ["LEADER_RECEIPT", "AGREE", "0xaa"],
+            addresses_pool[1]: ["AGREE", "0xaa"],
+            addresses_pool[2]: ["AGREE", "0xaa"],
+            addresses_pool[3]: ["AGREE", "0xbb"],
+            addresses_pool[4]: "IDLE",
+        },
+        reserve_votes={addresses_pool[5]: ["AGREE", "0xaa"]},
+    )
+    transaction_results = TransactionRoundResults(rounds=[Round(rotations=[rotation])])
+    stakes = [1000 * (i + 1) for i in range(len(addresses_pool))]
+
+    fee_events, _ = process_transaction(
+        addresses_pool, transaction_results, make_budget(), stakes=stakes
+    )
+    outcome = process_transaction(
+        addresses_pool,
+        transaction_results,
+        make_budget(),
+        mode="summary",
+        stakes=stakes,
+    )
+    for i in (3, 4):
+        assert compute_total_slashed(fee_events, addresses_pool[i]) == int(
+            stakes[i] * 0.01
+        )
+        position = outcome.index[addresses_pool[i]]
+        assert outcome.staked[position] == stakes[i]
+        assert outcome.slashed[position] == int(stakes[i] * 0.01)
+
+    with pytest.raises(ValueError):
+        process_transaction(
+            addresses_pool, transaction_results, make_budget(), stakes=stakes[:5]
+        )
+
+
+def test_sampled_stakes_need_an_rng():
+    budget = make_budget(
+        staking_distribution="normal", staking_mean=2000000, staking_variance=10**10
+    )
+    rotation = Rotation(
+        votes={
+            addresses_pool[0]: ["LEADER_RECEIPT", "AGREE", "0xaa"],
+            addresses_pool[1]: ["AGREE", "0xaa"],
+        }
+    )
+    transaction_results = TransactionRoundResults(rounds=[Round(rotations=[rotation])])
+    for mode in ("events", "summary"):
+        with pytest.raises(ValueError, match="needs an rng"):
+            process_transaction(addresses_pool, transaction_results, budget, mode=mode)
+        # Given stakes draw nothing
+        process_transaction(
+            addresses_pool,
+            transaction_results,
+            budget,
+            mode=mode,
+            stakes=[1000] * len(addresses_pool),
+        )
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from fee_simulator.models import ProtocolParams
+from fee_simulator.core.summary import AMOUNT_FIELDS
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.simulation.agents import (
+    AgentSimulation,
+    AlwaysDisagree,
+    HashDeviant,
+    Honest,
+    Lazy,
+    OpportunisticAppealant,
+)
+
+params = ProtocolParams(round_sizes=(5, 7, 11, 13, 23))
+population = [
+    (Honest(), 30),
+    (Lazy(idle_rate=0.3), 6),
+    (AlwaysDisagree(), 6),
+    (HashDeviant(), 4),
+    (OpportunisticAppealant(), 4),
+]
+
+
+def make_simulation(**kwargs):
+    return AgentSimulation(
+        population, params=params, max_appeals=2, record_every=10, **kwargs
+    )
+
+
+def test_resumed_run_matches_single_run():
+    whole = make_simulation()
+    whole.run(60)
+    resumed = make_simulation()
+    resumed.run(25)
+    resumed.run(35)
+
+    assert resumed.totals() == whole.totals()
+    assert resumed.sender_cost == whole.sender_cost
+    assert len(whole.trajectory) == 6
+    for a, b in zip(resumed.trajectory, whole.trajectory):
+        assert np.array_equal(a, b)
+
+    other_seed = make_simulation(root_seed=7)
+    other_seed.run(60)
+    assert other_seed.totals() != whole.totals()
+
+
+def test_totals_track_per_agent_amounts_and_stakes():
+    simulation = make_simulation()
+    simulation.run(80)
+    totals = {total.name: total for total in simulation.totals()}
+    assert simulation.n_failed == 0
+
+    for strategy_id, total in enumerate(simulation.totals()):
+        agents = simulation.strategy_ids == strategy_id
+        assert total.n_agents == population[strategy_id][1]
+        assert total.earned == simulation.amounts["earned"][agents].sum()
+        assert total.slashed == simulation.amounts["slashed"][agents].sum()
+        assert total.stake == simulation.stake[agents].sum()
+        assert total.stake == total.staked - total.slashed
+    assert np.array_equal(simulation.trajectory[-1], simulation.strategy_stakes())
+
+    # Deviating hashes and idling are slashed, honest votes are not
+    assert totals["HONEST"].slashed == 0
+    assert totals["HASH_DEVIANT"].slashed > 0
+    assert totals["LAZY"].slashed > 0
+    assert totals["ALWAYS_DISAGREE"].slashed == 0
+    # Only the opportunistic appealant appeals, and appeal bonds are costs
+    assert totals["OPPORTUNISTIC_APPEALANT"].cost > 0
+    assert totals["HONEST"].cost == 0
+    assert simulation.sender_cost > 0
+
+
+def test_cached_settlements_match_the_fee_pipeline():
+    simulation = make_simulation()
+    for transaction_index in range(60):
+        rng = simulation.streams.for_transaction(transaction_index)
+        participants, transaction_results, budget = simulation.build_transaction(rng)
+        try:
+            expected = process_transaction(
+                [simulation.addresses[i] for i in participants],
+                transaction_results,
+                budget,
+                mode="summary",
+                params=params,
+                stakes=simulation.stake[participants].tolist(),
+            )
+        except ValueError:
+            expected = None
+        outcome = simulation.settle(participants, transaction_results, budget, rng)
+        if expected is None:
+            assert outcome is None
+            continue
+        assert outcome.addresses == expected.addresses
+        for name in AMOUNT_FIELDS:
+            assert np.array_equal(getattr(outcome, name), getattr(expected, name))
+        assert outcome.role_totals == expected.role_totals
+        assert outcome.refund == expected.refund
+    # Transactions played by other agents reuse settlements
+    assert simulation.settlement_cache.hits > 0
+
+
+def test_slashing_lowers_committee_odds():
+    simulation = make_simulation()
+    deviant = int(np.flatnonzero(simulation.strategy_ids == 3)[0])
+    simulation.run(40)
+    assert simulation.stake[deviant] < params.default_stake
+    assert simulation.selector.stake_of(simulation.addresses[deviant]) == (
+        simulation.stake[deviant]
+    )
+
+
+def test_invalid_appeal_depth():
+    with pytest.raises(ValueError):
+        AgentSimulation(population, params=params, max_appeals=3)
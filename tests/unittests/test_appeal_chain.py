@@ -0,0 +1,161 @@
+import itertools
+from collections import Counter
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from fee_simulator.analysis.explorer import RoundPattern, ScenarioBuilder
+from fee_simulator.analysis.appeal_chain import (
+    MAX_CHAIN_APPEALS,
+    AppealChain,
+    AppealProcess,
+    round_outcome_probabilities,
+)
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.utils import compute_total_cost
+
+VOTES = (0.6, 0.25, 0.05)
+LEADER_TIMEOUT = RoundPattern(leader="TIMEOUT", majority="UNDETERMINED")
+
+
+def make_process(max_appeals):
+    return AppealProcess(
+        normal_outcomes=tuple(
+            round_outcome_probabilities(2 * k, VOTES, 0.1)
+            for k in range(max_appeals + 1)
+        ),
+        appeal_outcomes=tuple(
+            round_outcome_probabilities(2 * k + 1, VOTES) for k in range(max_appeals)
+        ),
+        appeal_rates={
+            LEADER_TIMEOUT: 0.8,
+            RoundPattern(majority="DISAGREE"): 0.5,
+            RoundPattern(majority="UNDETERMINED"): 0.5,
+            RoundPattern(majority="AGREE"): 0.1,
+        },
+    )
+
+
+chain = AppealChain(max_appeals=1)
+process = make_process(1)
+report = chain.evaluate(process)
+
+
+def sample_path(rng):
+    def draw(outcomes):
+        patterns = list(outcomes)
+        return patterns[rng.choice(len(patterns), p=list(outcomes.values()))]
+
+    path = (draw(process.normal_outcomes[0]),)
+    for k in range(process.max_appeals):
+        if rng.random() >= process.appeal_rates.get(path[-1], 0.0):
+            break
+        path += (draw(process.appeal_outcomes[k]), draw(process.normal_outcomes[k + 1]))
+    return path
+
+
+def test_outcome_probabilities_follow_round_sizes():
+    normal = round_outcome_probabilities(0, VOTES, 0.1)
+    appeal = round_outcome_probabilities(1, VOTES)
+    assert sum(normal.values()) == pytest.approx(1)
+    assert sum(appeal.values()) == pytest.approx(1)
+    assert normal[LEADER_TIMEOUT] == 0.1
+    assert all(pattern.leader == "RECEIPT" for pattern in appeal)
+    # Larger committees make the likely majority likelier
+    agree = RoundPattern(majority="AGREE")
+    assert appeal[agree] > normal[agree] / 0.9
+
+
+def test_chain_matches_enumeration_of_paths():
+    totals = Counter()
+    sequences = Counter()
+    for normal, p in process.normal_outcomes[0].items():
+        rate = process.appeal_rates.get(normal, 0.0)
+        paths = [((normal,), p * (1 - rate))]
+        for (appeal, q), (second, r) in itertools.product(
+            process.appeal_outcomes[0].items(), process.normal_outcomes[1].items()
+        ):
+            paths.append(((normal, appeal, second), p * rate * q * r))
+        for path, probability in paths:
+            labels, cost, refund = chain.path_outcome(path)
+            totals["cost"] += probability * cost
+            totals["refund"] += probability * refund
+            totals["appeals"] += probability * (len(path) // 2)
+            sequences[labels] += probability
+
+    assert report.failed_probability == 0
+    assert sum(report.appeal_distribution) == pytest.approx(1)
+    assert report.expected_sender_cost == pytest.approx(totals["cost"])
+    assert report.expected_refund == pytest.approx(totals["refund"])
+    assert report.expected_appeals == pytest.approx(totals["appeals"])
+    assert set(report.label_sequences) == set(sequences)
+    for labels, probability in sequences.items():
+        assert report.label_sequences[labels] == pytest.approx(probability)
+
+
+def test_chain_matches_monte_carlo():
+    rng = np.random.default_rng(3)
+    builder = ScenarioBuilder(1)
+    processed = {}
+    n_samples = 3000
+    samples = []
+    for _ in range(n_samples):
+        path = sample_path(rng)
+        if path not in processed:
+            # The full fee event pipeline, independent of the chain
+            transaction_results, budget = builder.build(path)
+            fee_events, labels = process_transaction(
+                builder.addresses(), transaction_results, budget
+            )
+            processed[path] = (
+                tuple(labels),
+                compute_total_cost(budget),
+                # The refund is the last event
+                fee_events[-1].earned,
+            )
+        samples.append((len(path) // 2,) + processed[path])
+
+    appeals, labels, costs, refunds = zip(*samples)
+    for values, exact in [
+        (appeals, report.expected_appeals),
+        (costs, report.expected_sender_cost),
+        (refunds, report.expected_refund),
+    ]:
+        values = np.array(values, dtype=float)
+        assert abs(values.mean() - exact) <= 4 * values.std() / np.sqrt(n_samples)
+    counts = Counter(labels)
+    for sequence, probability in report.label_sequences.items():
+        sigma = np.sqrt(probability * (1 - probability) / n_samples)
+        assert abs(counts[sequence] / n_samples - probability) <= 4 * sigma + 1e-3
+
+
+def test_reevaluation_reuses_paths_and_deeper_chains():
+    deeper = AppealChain(max_appeals=2)
+    two_appeals = deeper.evaluate(make_process(2))
+    assert len(two_appeals.appeal_distribution) == 3
+    assert two_appeals.expected_appeals > report.expected_appeals
+    assert deeper.evaluate(make_process(1)) == report
+
+    with pytest.raises(ValueError):
+        chain.evaluate(make_process(2))
+
+
+def test_invalid_process():
+    with pytest.raises(ValidationError):
+        AppealProcess(normal_outcomes=({RoundPattern(): 0.5},))
+    with pytest.raises(ValidationError):
+        AppealProcess(
+            normal_outcomes=({RoundPattern(): 1.0}, {RoundPattern(): 1.0}),
+            appeal_outcomes=({LEADER_TIMEOUT: 1.0},),
+        )
+    with pytest.raises(ValidationError):
+        AppealProcess(normal_outcomes=({RoundPattern(): 1.0},) * 2)
+
+
+def test_states_are_bounded_and_depth_is_capped():
+    n_normal = len(process.normal_outcomes[0])
+    n_appeal = len(process.appeal_outcomes[0])
+    assert report.n_states <= n_normal + n_normal * n_appeal * n_normal
+    with pytest.raises(ValueError):
+        AppealChain(max_appeals=MAX_CHAIN_APPEALS + 1)
@@ -0,0 +1,108 @@
+import itertools
+
+import pytest
+
+from fee_simulator.analysis.explorer import (
+    ScenarioBuilder,
+    enumerate_patterns,
+    check_pattern,
+)
+from fee_simulator.analysis.budget_optimizer import (
+    BudgetCandidate,
+    evaluate_candidate,
+    optimize_budget,
+    pareto_frontier,
+)
+
+LEADER_TIMEOUTS = [1, 50, 100]
+VALIDATORS_TIMEOUTS = [40, 200]
+APPEAL_ROUNDS = [0, 1, 2, 3]
+
+
+def make_corpus():
+    builder = ScenarioBuilder(max_appeals=1)
+    patterns = itertools.chain(
+        itertools.islice(enumerate_patterns(0), 0, None, 11),
+        itertools.islice(enumerate_patterns(1), 39, None, 1201),
+    )
+    addresses = builder.addresses()
+    # Patterns that break an invariant at any budget would reject every candidate
+    return [
+        (addresses, *builder.build(pattern))
+        for pattern in patterns
+        if check_pattern(builder, pattern) is None
+    ]
+
+
+corpus = make_corpus()
+
+
+def test_optimizer_matches_exhaustive_search():
+    report = optimize_budget(
+        corpus, LEADER_TIMEOUTS, VALIDATORS_TIMEOUTS, APPEAL_ROUNDS
+    )
+    exhaustive = [
+        evaluate_candidate(
+            corpus,
+            BudgetCandidate(
+                leaderTimeout=leader, validatorsTimeout=validators, appealRounds=rounds
+            ),
+        )
+        for leader, validators, rounds in itertools.product(
+            LEADER_TIMEOUTS, VALIDATORS_TIMEOUTS, APPEAL_ROUNDS
+        )
+    ]
+
+    assert report.n_candidates == len(exhaustive)
+    assert report.n_evaluated < report.n_candidates
+    assert report.frontier == pareto_frontier(exhaustive)
+    assert report.cheapest == min(
+        (result for result in exhaustive if result.safe),
+        key=lambda result: result.sender_cost,
+    )
+
+    # Every evaluated candidate agrees with the exhaustive search
+    by_candidate = {result.candidate: result for result in exhaustive}
+    for result in report.results:
+        assert by_candidate[result.candidate] == result
+
+    # Safety is monotone in the prepaid appeal rounds, which the search relies on
+    for start in range(0, len(exhaustive), len(APPEAL_ROUNDS)):
+        verdicts = [r.safe for r in exhaustive[start : start + len(APPEAL_ROUNDS)]]
+        assert verdicts == sorted(verdicts)
+
+    # Odd leader timeouts cannot be split; the first scenario already fails
+    for result in exhaustive:
+        if result.candidate.leaderTimeout == 1:
+            assert not result.safe and result.failing_scenario == 0
+        elif result.candidate.appealRounds == 0:
+            assert result.invariant == "appeal_rounds"
+
+
+def test_frontier_is_not_dominated():
+    report = optimize_budget(
+        corpus, LEADER_TIMEOUTS, VALIDATORS_TIMEOUTS, APPEAL_ROUNDS
+    )
+    assert len(report.frontier) > 1
+    for result in report.frontier:
+        assert result.safe and result.candidate.appealRounds == 1
+        for other in report.results:
+            if other.safe and other != result:
+                assert not (
+                    other.sender_cost <= result.sender_cost
+                    and other.validator_reward >= result.validator_reward
+                    and (other.sender_cost, other.validator_reward)
+                    != (result.sender_cost, result.validator_reward)
+                )
+
+
+def test_parallel_search_matches_serial():
+    serial = optimize_budget(
+        corpus, LEADER_TIMEOUTS, VALIDATORS_TIMEOUTS, APPEAL_ROUNDS
+    )
+    parallel = optimize_budget(
+        corpus, LEADER_TIMEOUTS, VALIDATORS_TIMEOUTS, APPEAL_ROUNDS, workers=2
+    )
+    assert parallel == serial
+    with pytest.raises(ValueError):
+        optimize_budget(corpus, LEADER_TIMEOUTS, VALIDATORS_TIMEOUTS, [100])
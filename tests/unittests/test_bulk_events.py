@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from fee_simulator.models import (
+    TransactionRoundResults,
+    TransactionBudget,
+    Appeal,
+    BulkFeeEvent,
+    expand_fee_events,
+)
+from fee_simulator.constants import ROUND_SIZES, VOTE_CODES
+from fee_simulator.ledger import FeeEventLedger, merge_ledgers
+from fee_simulator.fee_aggregators.aggregated import (
+    compute_agg_costs,
+    compute_agg_earnings,
+    compute_agg_burnt,
+)
+from fee_simulator.fee_aggregators.address_metrics import (
+    compute_total_earnings,
+    compute_total_burnt,
+    compute_current_stake,
+)
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.core.scenario_cache import PayoutTemplateCache
+from fee_simulator.invariants import InvariantViolation, check_invariants
+from fee_simulator.utils import generate_random_eth_address
+
+N_APPEALS = 3
+round_sizes = ROUND_SIZES[: 2 * N_APPEALS + 1]
+addresses_pool = [generate_random_eth_address() for _ in range(sum(round_sizes) + 5)]
+
+budget = TransactionBudget(
+    leaderTimeout=100,
+    validatorsTimeout=200,
+    appealRounds=N_APPEALS,
+    rotations=[0] * (N_APPEALS + 1),
+    senderAddress=addresses_pool[-1],
+    appeals=[Appeal(appealantAddress=addresses_pool[-2 - i]) for i in range(N_APPEALS)],
+)
+
+
+def make_results(seed):
+    rng = np.random.default_rng(seed)
+    vote_choices = np.array([VOTE_CODES[v] for v in ("AGREE", "DISAGREE", "TIMEOUT")])
+    round_arrays = []
+    first = 0
+    for size in round_sizes:
+        round_arrays.append(
+            dict(
+                addresses=addresses_pool[first : first + size],
+                vote_codes=np.sort(rng.choice(vote_choices, size=size)),
+            )
+        )
+        first += size
+    return TransactionRoundResults.from_arrays(round_arrays)
+
+
+def invariant_verdict(fee_events, results):
+    try:
+        check_invariants(fee_events, budget, results)
+    except InvariantViolation as violation:
+        return violation.invariant, violation.message
+    return None
+
+
+def dumped(fee_events):
+    return [event.model_dump() for event in fee_events]
+
+
+def test_grouped_events_expand_to_individual_events():
+    for seed in range(3):
+        results = make_results(seed)
+        events, labels = process_transaction(addresses_pool, results, budget)
+        grouped, grouped_labels = process_transaction(
+            addresses_pool, results, budget, grouped=True
+        )
+
+        assert grouped_labels == labels
+        assert any(isinstance(event, BulkFeeEvent) for event in grouped)
+        assert len(grouped) < len(events) == grouped.event_count()
+        assert dumped(expand_fee_events(grouped)) == dumped(events)
+        assert dumped(grouped.expanded()) == dumped(events)
+        # The refund is computed on the grouped ledger
+        assert grouped[-1] == events[-1]
+
+
+def test_aggregators_and_invariants_read_grouped_events():
+    results = make_results(7)
+    events, _ = process_transaction(addresses_pool, results, budget)
+    grouped, _ = process_transaction(addresses_pool, results, budget, grouped=True)
+
+    for fee_events in (grouped, list(grouped)):
+        assert compute_agg_costs(fee_events) == compute_agg_costs(events)
+        assert compute_agg_earnings(fee_events) == compute_agg_earnings(events)
+        assert compute_agg_burnt(fee_events) == compute_agg_burnt(events)
+        for address in addresses_pool[:20]:
+            assert compute_total_earnings(fee_events, address) == (
+                compute_total_earnings(events, address)
+            )
+            assert compute_total_burnt(fee_events, address) == (
+                compute_total_burnt(events, address)
+            )
+            assert compute_current_stake(address, fee_events) == (
+                compute_current_stake(address, events)
+            )
+        assert invariant_verdict(fee_events, results) == invariant_verdict(
+            events, results
+        )
+
+
+def test_grouped_events_with_cache_executor_and_merge():
+    results = make_results(3)
+    events, _ = process_transaction(addresses_pool, results, budget)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        grouped, _ = process_transaction(
+            addresses_pool,
+            results,
+            budget,
+            template_cache=PayoutTemplateCache(),
+            executor=executor,
+            grouped=True,
+        )
+    assert dumped(grouped.expanded()) == dumped(events)
+
+    # Bulk events span their sequence ids when merging
+    odd = FeeEventLedger(grouped[1::2])
+    even = FeeEventLedger(grouped[0::2])
+    assert merge_ledgers(odd, even) == grouped
@@ -0,0 +1,180 @@
+import json
+
+import numpy as np
+
+from fee_simulator.cli import main
+from fee_simulator.models import (
+    TransactionRoundResults,
+    Round,
+    Rotation,
+    TransactionBudget,
+)
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.rng import transaction_rng
+from fee_simulator.utils import generate_random_eth_address
+
+addresses_pool = [generate_random_eth_address() for _ in range(10)]
+
+budget = TransactionBudget(
+    leaderTimeout=100,
+    validatorsTimeout=200,
+    appealRounds=0,
+    rotations=[0],
+    senderAddress=addresses_pool[9],
+    appeals=[],
+)
+
+
+def make_results(minority_vote):
+    rotation = Rotation(
+        votes={
+            addresses_pool[0]: ["LEADER_RECEIPT", "AGREE"],
+            addresses_pool[1]: "AGREE",
+            addresses_pool[2]: "AGREE",
+            addresses_pool[3]: "AGREE",
+            addresses_pool[4]: minority_vote,
+        }
+    )
+    return TransactionRoundResults(rounds=[Round(rotations=[rotation])])
+
+
+def write_input(path, n):
+    lines = []
+    for i in range(n):
+        results = make_results(["DISAGREE", "TIMEOUT", "AGREE"][i % 3])
+        lines.append(
+            json.dumps(
+                {
+                    "id": f"tx-{i}",
+                    "transaction_budget": budget.model_dump(mode="json"),
+                    "transaction_results": results.model_dump(mode="json"),
+                    "addresses": addresses_pool,
+                }
+            )
+        )
+    lines.insert(2, '{"id": "broken", "transaction_budget": {}}')
+    path.write_text("\n".join(lines) + "\n")
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_run_writes_summaries_in_input_order(tmp_path):
+    source = tmp_path / "input.jsonl"
+    write_input(source, 7)
+    output = tmp_path / "output.jsonl"
+
+    exit_code = main(["run", str(source), "-o", str(output), "--chunk-size", "3"])
+
+    records = read_jsonl(output)
+    assert exit_code == 1  # the broken line
+    assert [r["index"] for r in records] == list(range(8))
+    assert records[2]["id"] == "broken" and "error" in records[2]
+    valid = [r for r in records if "error" not in r]
+    assert [r["id"] for r in valid] == [f"tx-{i}" for i in range(7)]
+
+    # Transaction i gets the random stream of its input line
+    fee_events, labels = process_transaction(
+        addresses_pool,
+        make_results("DISAGREE"),
+        budget,
+        rng=transaction_rng(0, 0),
+    )
+    assert valid[0]["labels"] == labels
+    assert valid[0]["n_events"] == len(fee_events)
+    assert valid[0]["sender_cost"] == 1100
+    assert valid[0]["refund"] == fee_events[-1].earned
+
+
+def test_run_is_independent_of_workers_and_chunking(tmp_path):
+    source = tmp_path / "input.jsonl"
+    write_input(source, 9)
+    serial = tmp_path / "serial.jsonl"
+    parallel = tmp_path / "parallel.jsonl"
+
+    main(["run", str(source), "-o", str(serial), "--events"])
+    main(
+        [
+            "run",
+            str(source),
+            "-o",
+            str(parallel),
+            "--events",
+            "--workers",
+            "2",
+            "--chunk-size",
+            "2",
+        ]
+    )
+
+    assert read_jsonl(serial) == read_jsonl(parallel)
+
+
+def test_run_columnar_output(tmp_path):
+    source = tmp_path / "input.jsonl"
+    write_input(source, 5)
+    output = tmp_path / "columns"
+
+    main(
+        [
+            "run",
+            str(source),
+            "-o",
+            str(output),
+            "--format",
+            "columnar",
+            "--events",
+            "--chunk-size",
+            "4",
+        ]
+    )
+
+    parts = sorted(output.glob("part-*.npz"))
+    assert len(parts) == 2
+    with np.load(parts[0]) as part:
+        assert part["index"].tolist() == [0, 1, 2, 3]
+        assert part["error"][2] != ""
+        assert set(part["event_index"].tolist()) == {0, 1, 3}
+        assert part["sender_cost"][0] == 1100
+
+
+def test_run_reports_lines_holding_several_scenarios(tmp_path):
+    source = tmp_path / "input.jsonl"
+    write_input(source, 4)
+    lines = source.read_text().splitlines()
+    del lines[2]  # the broken line
+    # Two scenarios on one line must not shift the ones after it
+    lines[0:2] = [lines[0] + "," + lines[1]]
+    source.write_text("\n".join(lines) + "\n")
+    output = tmp_path / "output.jsonl"
+
+    exit_code = main(["run", str(source), "-o", str(output)])
+
+    records = read_jsonl(output)
+    assert exit_code == 1
+    assert [r["index"] for r in records] == [0, 1, 2]
+    assert "error" in records[0]
+    assert [r["id"] for r in records[1:]] == ["tx-2", "tx-3"]
+
+
+def test_run_keeps_only_the_error_record_of_failing_lines(
+    tmp_path, monkeypatch, capsys
+):
+    def failing(*args, **kwargs):
+        print("fee distribution table")
+        raise ValueError("Total paid from sender is greater than sender cost")
+
+    monkeypatch.setattr("fee_simulator.cli.process_transaction", failing)
+    source = tmp_path / "input.jsonl"
+    write_input(source, 2)
+    output = tmp_path / "output.jsonl"
+
+    exit_code = main(["run", str(source), "-o", str(output)])
+
+    captured = capsys.readouterr()
+    assert exit_code == 1
+    assert "fee distribution table" not in captured.out + captured.err
+    assert captured.err.splitlines() == ["Processed 3 transactions (3 failed)"]
+    records = read_jsonl(output)
+    assert records[0]["error"].startswith("ValueError: Total paid")
@@ -0,0 +1,129 @@
+import itertools
+import random
+
+import pytest
+
+from fee_simulator.models import DEFAULT_PROTOCOL_PARAMS
+from fee_simulator.analysis.explorer import (
+    ScenarioBuilder,
+    enumerate_patterns,
+    round_patterns,
+)
+from fee_simulator.analysis.coalitions import _CoalitionSearch, search_coalitions
+from fee_simulator.core.transaction_processing import process_transaction
+
+
+def plain_patterns(round_index):
+    # Outcome classes without idleness or hash minorities
+    return [
+        pattern
+        for pattern in round_patterns(round_index)
+        if pattern.idle == "NONE" and pattern.hash_minority == "NONE"
+    ]
+
+
+def brute_force(kind, max_appeals, max_validators):
+    builder = ScenarioBuilder(max_appeals)
+    search = _CoalitionSearch(
+        kind,
+        builder,
+        max_appeals,
+        max_validators,
+        plain_patterns,
+        DEFAULT_PROTOCOL_PARAMS,
+    )
+    for appeals in range(max_appeals + 1):
+        for pattern in itertools.product(
+            *(plain_patterns(i) for i in range(2 * appeals + 1))
+        ):
+            search.evaluate(pattern)
+    return search.best, search.n_evaluated
+
+
+@pytest.mark.parametrize(
+    "kind, max_validators",
+    [
+        ("VALIDATORS", 1),
+        ("VALIDATORS", 3),
+        ("LEADER_APPEALANT", 3),
+        ("SENDER_VALIDATORS", 1),
+        ("SENDER_VALIDATORS", 3),
+    ],
+)
+def test_branch_and_bound_finds_the_brute_force_optimum(kind, max_validators):
+    best, n_patterns = brute_force(kind, 1, max_validators)
+    report = search_coalitions(
+        kind,
+        max_appeals=1,
+        max_validators=max_validators,
+        round_choices=plain_patterns,
+    )
+    assert report.best is not None
+    assert report.best.extraction == best.extraction
+    assert report.n_evaluated <= n_patterns
+
+
+def test_search_prunes_and_plan_replays():
+    report = search_coalitions(
+        "SENDER_VALIDATORS",
+        max_appeals=1,
+        max_validators=1,
+        round_choices=plain_patterns,
+    )
+    _, n_patterns = brute_force("SENDER_VALIDATORS", 1, 1)
+    assert report.n_pruned > 0
+    assert report.n_evaluated < n_patterns
+
+    plan = report.best
+    assert plan.members[0] == plan.transaction_budget.senderAddress
+    assert len(plan.members) <= 2
+    builder = ScenarioBuilder(1)
+    fee_events, labels = process_transaction(
+        builder.addresses(), plan.transaction_results, plan.transaction_budget
+    )
+    assert tuple(labels) == plan.labels
+    extraction = 0
+    for address in plan.members:
+        bucket = fee_events.address_bucket(address)
+        extraction += bucket.earned - bucket.cost - bucket.slashed
+    assert extraction == plan.extraction
+
+
+def test_leader_appealant_coalition_needs_an_appeal():
+    report = search_coalitions("LEADER_APPEALANT", max_appeals=0)
+    assert report.best is None
+    with pytest.raises(ValueError):
+        search_coalitions("VALIDATORS", max_validators=0)
+
+
+@pytest.mark.parametrize(
+    "kind", ["VALIDATORS", "LEADER_APPEALANT", "SENDER_VALIDATORS"]
+)
+def test_search_prunes_every_outcome_class(kind):
+    report = search_coalitions(kind, max_appeals=1)
+    n_patterns = len(list(enumerate_patterns(1)))
+    assert report.n_pruned > 0
+    assert report.n_evaluated < n_patterns // 10
+
+    # No sampled pattern beats the plan the search settled on
+    builder = ScenarioBuilder(1)
+    sampled = _CoalitionSearch(
+        kind, builder, 1, 3, round_patterns, DEFAULT_PROTOCOL_PARAMS
+    )
+    for pattern in random.Random(0).sample(list(enumerate_patterns(1)), 200):
+        sampled.evaluate(pattern)
+    assert sampled.best.extraction <= report.best.extraction
+
+
+def test_labels_follow_label_keys():
+    builder = ScenarioBuilder(1)
+    search = _CoalitionSearch(
+        "VALIDATORS", builder, 1, 3, round_patterns, DEFAULT_PROTOCOL_PARAMS
+    )
+    for pattern in random.Random(1).sample(list(enumerate_patterns(1)), 200):
+        keys = tuple(search.label_key(i, p) for i, p in enumerate(pattern))
+        transaction_results, budget = builder.build(pattern)
+        outcome = process_transaction(
+            builder.addresses(), transaction_results, budget, mode="summary"
+        )
+        assert search.labels(keys) == tuple(outcome.labels)
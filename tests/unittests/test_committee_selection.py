@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+from fee_simulator.models import FeeEvent
+from fee_simulator.core.committee_selection import (
+    MIN_ACCEPTANCE_RATE,
+    CommitteeSelector,
+    StakeWeightedSampler,
+)
+from fee_simulator.constants import ROUND_SIZES
+from fee_simulator.rng import transaction_rng
+from fee_simulator.utils import generate_eth_addresses
+
+
+def test_draws_follow_stake():
+    sampler = StakeWeightedSampler([1, 2, 3, 4, 0])
+    counts = np.bincount(sampler.draw(transaction_rng(0, 0), 200000), minlength=5)
+    assert counts[4] == 0
+    assert np.allclose(counts[:4] / counts.sum(), [0.1, 0.2, 0.3, 0.4], atol=0.01)
+
+
+def test_slashing_updates_without_rebuild():
+    sampler = StakeWeightedSampler([10, 10, 10, 10])
+    sampler.update(0, 2)
+    counts = np.bincount(sampler.draw(transaction_rng(0, 1), 100000), minlength=4)
+    assert np.allclose(
+        counts / counts.sum(), [2 / 32, 10 / 32, 10 / 32, 10 / 32], atol=0.01
+    )
+    sampler.update(1, 50)  # above the table bound, forces a rebuild
+    counts = np.bincount(sampler.draw(transaction_rng(0, 2), 100000), minlength=4)
+    assert np.allclose(
+        counts / counts.sum(), [2 / 72, 50 / 72, 10 / 72, 10 / 72], atol=0.01
+    )
+
+
+def test_sample_without_replacement():
+    sampler = StakeWeightedSampler([5, 1, 1, 0, 1])
+    drawn = sampler.sample_without_replacement(transaction_rng(0, 3), 4)
+    assert sorted(drawn.tolist()) == [0, 1, 2, 4]
+    with pytest.raises(ValueError):
+        sampler.sample_without_replacement(transaction_rng(0, 3), 5)
+
+
+def redraw_on_duplicates(sampler, rng, size, exclude=()):
+    # One draw at a time, redrawing duplicates: what the batched
+    # sample_without_replacement must reproduce draw for draw
+    seen = set(exclude)
+    selected = []
+    taken = float(sum(sampler.stakes[i] for i in seen))
+    while len(selected) < size:
+        if taken > (1 - MIN_ACCEPTANCE_RATE) * float(sampler.stakes.sum()):
+            remaining = np.ones(len(sampler), dtype=bool)
+            remaining[list(seen)] = False
+            candidates = np.flatnonzero(remaining & (sampler.stakes > 0))
+            weights = sampler.stakes[candidates]
+            selected.extend(
+                rng.choice(
+                    candidates,
+                    size=size - len(selected),
+                    replace=False,
+                    p=weights / weights.sum(),
+                ).tolist()
+            )
+            break
+        for index in sampler.draw(rng, size - len(selected)).tolist():
+            if index not in seen:
+                seen.add(index)
+                selected.append(index)
+                taken += sampler.stakes[index]
+    return selected
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_sample_without_replacement_matches_redrawing(seed):
+    stakes = transaction_rng(seed, 0).integers(0, 100, size=60)
+    sampler = StakeWeightedSampler(stakes)
+    sampler.update(0, 0)  # a slashed-out validator
+    exclude = [1, 2, 3]
+    for size in (1, 5, 20, 40, int(np.count_nonzero(sampler.stakes[4:] > 0))):
+        for excluded in ((), exclude):
+            drawn = sampler.sample_without_replacement(
+                transaction_rng(seed, size), size, exclude=iter(excluded)
+            )
+            assert drawn.tolist() == redraw_on_duplicates(
+                sampler, transaction_rng(seed, size), size, excluded
+            )
+
+
+def test_large_committee_selection():
+    rng = transaction_rng(5, 0)
+    addresses = generate_eth_addresses(20000, rng)
+    stakes = rng.integers(1, 10**6, size=len(addresses))
+    selector = CommitteeSelector(addresses, stakes)
+    committee = selector.select(len(ROUND_SIZES) - 1, rng, reserves=50)
+    assert len(committee.members) == ROUND_SIZES[-1]
+    assert len(committee.reserves) == 50
+    assert len(set(committee.members + committee.reserves)) == ROUND_SIZES[-1] + 50
+    assert committee.leader == committee.members[0]
+
+    appeal = selector.select(1, rng, exclude=committee.members)
+    assert not set(appeal.members) & set(committee.members)
+
+    selector.apply_fee_events(
+        [FeeEvent(sequence_id=1, address=committee.leader, slashed=10)]
+    )
+    assert (
+        selector.stake_of(committee.leader)
+        == stakes[addresses.index(committee.leader)] - 10
+    )
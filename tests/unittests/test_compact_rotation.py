@@ -0,0 +1,173 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from fee_simulator.models import (
+    TransactionRoundResults,
+    Round,
+    Rotation,
+    Appeal,
+    TransactionBudget,
+    CompactVotes,
+    OverlayVotes,
+    NO_HASH,
+)
+from fee_simulator.constants import VOTE_CODES
+from fee_simulator.core.majority import (
+    compute_majority_hash,
+    encode_hashes,
+    encode_votes,
+    extract_hash,
+    who_is_in_hash_majority,
+)
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.utils import generate_random_eth_address
+
+addresses_pool = [generate_random_eth_address() for _ in range(30)]
+
+AGREE, DISAGREE, TIMEOUT, IDLE, NA = (
+    VOTE_CODES[vote] for vote in ("AGREE", "DISAGREE", "TIMEOUT", "IDLE", "NA")
+)
+
+
+def test_rotation_from_arrays_decodes_votes():
+    rotation = Rotation.from_arrays(
+        addresses_pool[:4],
+        [AGREE, DISAGREE, TIMEOUT, IDLE],
+        hash_ids=[0, 0, 1, NO_HASH],
+        hash_values=["0xaa", "0xbb"],
+    )
+    assert isinstance(rotation.votes, CompactVotes)
+    assert rotation.votes == {
+        addresses_pool[0]: ["LEADER_RECEIPT", "AGREE", "0xaa"],
+        addresses_pool[1]: ["DISAGREE", "0xaa"],
+        addresses_pool[2]: ["TIMEOUT", "0xbb"],
+        addresses_pool[3]: "IDLE",
+    }
+    assert rotation == Rotation(votes=rotation.votes.to_dict())
+    assert (
+        rotation.model_dump() == Rotation(votes=rotation.votes.to_dict()).model_dump()
+    )
+
+    addresses, normalized, codes = encode_votes(rotation.votes)
+    assert addresses == addresses_pool[:4]
+    assert normalized == ["AGREE", "DISAGREE", "TIMEOUT", "IDLE"]
+    assert codes.tolist() == [AGREE, DISAGREE, TIMEOUT, IDLE]
+
+    timeout = Rotation.from_arrays(
+        addresses_pool[:2], [NA, NA], leader_action="LEADER_TIMEOUT"
+    )
+    assert timeout.votes[addresses_pool[0]] == ["LEADER_TIMEOUT", "NA"]
+
+
+def test_rotation_from_arrays_validates_columns():
+    with pytest.raises(ValueError, match="Invalid Ethereum address"):
+        Rotation.from_arrays(["0x123", addresses_pool[0]], [AGREE, AGREE])
+    with pytest.raises(ValueError, match="Duplicate"):
+        Rotation.from_arrays([addresses_pool[0]] * 2, [AGREE, AGREE])
+    with pytest.raises(ValueError, match="Vote codes"):
+        Rotation.from_arrays(addresses_pool[:2], [AGREE, 9])
+    with pytest.raises(ValueError, match="hash_ids"):
+        Rotation.from_arrays(
+            addresses_pool[:2], [AGREE, AGREE], hash_ids=[0, 2], hash_values=["0xaa"]
+        )
+    with pytest.raises(ValueError, match="Invalid hash"):
+        Rotation.from_arrays(
+            addresses_pool[:1], [AGREE], hash_ids=[0], hash_values=["aa"]
+        )
+    # Two addresses in one entry must not pass as a column of two
+    with pytest.raises(ValueError, match="Invalid Ethereum address"):
+        Rotation.from_arrays(["\n".join(addresses_pool[:2])], [AGREE])
+    with pytest.raises(ValueError, match="Invalid Ethereum address"):
+        Rotation.from_arrays([addresses_pool[0] + "\n"], [AGREE])
+    with pytest.raises(ValueError):
+        Rotation.from_arrays(
+            addresses_pool[:1], [AGREE], reserve_votes={addresses_pool[1]: "BOGUS"}
+        )
+    with pytest.raises(ValueError, match="Invalid hash"):
+        Rotation.from_arrays(
+            addresses_pool[:1],
+            [AGREE],
+            reserve_votes={addresses_pool[1]: ["AGREE", "aa"]},
+        )
+    rotation = Rotation.from_arrays(
+        addresses_pool[:1], [AGREE], reserve_votes={addresses_pool[1]: "AGREE"}
+    )
+    assert rotation.reserve_votes == {addresses_pool[1]: "AGREE"}
+
+
+def test_bulk_results_process_like_dict_results():
+    budget = TransactionBudget(
+        leaderTimeout=100,
+        validatorsTimeout=200,
+        appealRounds=1,
+        rotations=[0, 0],
+        senderAddress=addresses_pool[29],
+        appeals=[Appeal(appealantAddress=addresses_pool[28])],
+    )
+    round_arrays = [
+        dict(
+            addresses=addresses_pool[0:5],
+            vote_codes=np.array([AGREE, DISAGREE, DISAGREE, TIMEOUT, AGREE]),
+            hash_ids=np.array([0, 0, 1, 0, 0]),
+            hash_values=["0xaa", "0xbb"],
+        ),
+        dict(
+            addresses=addresses_pool[5:12],
+            vote_codes=np.full(7, NA),
+            leader_action=None,
+        ),
+        dict(
+            addresses=addresses_pool[1:12],
+            vote_codes=np.array([AGREE] * 8 + [DISAGREE] * 3),
+        ),
+    ]
+    compact = TransactionRoundResults.from_arrays(round_arrays)
+    plain = TransactionRoundResults(
+        rounds=[
+            Round(rotations=[Rotation(votes=round_obj.rotations[0].votes.to_dict())])
+            for round_obj in compact.rounds
+        ]
+    )
+
+    compact_events, compact_labels = process_transaction(
+        addresses_pool, compact, budget
+    )
+    plain_events, plain_labels = process_transaction(addresses_pool, plain, budget)
+
+    assert compact_labels == plain_labels
+    assert [e.model_dump() for e in compact_events] == [
+        e.model_dump() for e in plain_events
+    ]
+
+
+def test_hash_majority_of_encoded_votes_matches_dicts():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        n = int(rng.integers(1, 12))
+        votes = Rotation.from_arrays(
+            addresses_pool[:n],
+            rng.choice([AGREE, DISAGREE, TIMEOUT, IDLE], size=n),
+            hash_ids=rng.choice([NO_HASH, 0, 1, 2], size=n, p=[0.2, 0.5, 0.2, 0.1]),
+            # The last hash duplicates the first one
+            hash_values=["0xaa", "0xbb", "0xaa"],
+        ).votes
+        reserves = {addresses_pool[20]: ["AGREE", "0xaa"], addresses_pool[21]: "AGREE"}
+        removed = frozenset(rng.choice(n, size=min(n, 2), replace=False).tolist())
+        for mapping in (votes, OverlayVotes(votes, removed, reserves)):
+            plain = mapping.to_dict()
+            hashes_by_address = {a: extract_hash(v) for a, v in plain.items()}
+            counts = Counter(h for h in hashes_by_address.values() if h != "0xdefault")
+            majority_hash = next(
+                (h for h, count in counts.items() if count > len(plain) // 2), None
+            )
+            assert compute_majority_hash(mapping) == majority_hash
+            hash_ids, hashes = encode_hashes(mapping)
+            assert len(hash_ids) == len(plain)
+            assert set(counts) <= set(hashes) and len(set(hashes)) == len(hashes)
+            for candidate in ("0xaa", "0xbb", "0xcc"):
+                assert who_is_in_hash_majority(mapping, candidate) == (
+                    [a for a, h in hashes_by_address.items() if h == candidate],
+                    [a for a, h in hashes_by_address.items() if h != candidate],
+                )
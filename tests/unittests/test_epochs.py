@@ -0,0 +1,151 @@
+import numpy as np
+import pytest
+
+from fee_simulator.models import DEFAULT_PROTOCOL_PARAMS
+from fee_simulator.analysis.explorer import RoundPattern, ScenarioBuilder
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.fee_aggregators.address_metrics import (
+    compute_total_earnings,
+    compute_total_slashed,
+)
+from fee_simulator.simulation.epochs import EpochEngine
+from fee_simulator.utils import generate_eth_addresses
+
+builder = ScenarioBuilder(max_appeals=1)
+PATTERNS = [
+    (RoundPattern(idle="UNREPLACED"),),
+    (RoundPattern(hash_minority="VALIDATOR"),),
+    (RoundPattern(hash_minority="LEADER", idle="REPLACED"),),
+    (
+        RoundPattern(majority="UNDETERMINED"),
+        RoundPattern(hash_minority="VALIDATOR"),
+        RoundPattern(idle="UNREPLACED"),
+    ),
+]
+population = builder.addresses()[:-1] + generate_eth_addresses(
+    1000, np.random.default_rng(1)
+)
+initial_stake = np.full(len(population), DEFAULT_PROTOCOL_PARAMS.default_stake)
+
+
+def source(epoch, stake):
+    # Deterministic in the epoch, so interrupted runs can be replayed
+    patterns = PATTERNS[epoch % 2 :] + PATTERNS[: epoch % 3]
+    return [(builder.addresses(), *builder.build(pattern)) for pattern in patterns]
+
+
+def test_epoch_update_matches_fee_events():
+    engine = EpochEngine(population)
+    for epoch in range(3):
+        start = engine.stake.copy()
+        summary = engine.process_epoch(source(epoch, start))
+        assert summary.epoch == epoch + 1 and summary.n_failed == 0
+
+        slashed = {}
+        earned = {}
+        for addresses, transaction_results, budget in source(epoch, start):
+            stakes = [
+                start[engine.index[a]] if a in engine.index else 0 for a in addresses
+            ]
+            fee_events, _ = process_transaction(
+                addresses, transaction_results, budget, stakes=stakes
+            )
+            for address in addresses:
+                slashed[address] = slashed.get(address, 0) + compute_total_slashed(
+                    fee_events, address
+                )
+                earned[address] = earned.get(address, 0) + compute_total_earnings(
+                    fee_events, address
+                )
+        for address, i in engine.index.items():
+            assert start[i] - engine.stake[i] == slashed.get(address, 0)
+        assert summary.slashed == sum(slashed.get(a, 0) for a in engine.index)
+        assert summary.rewards == sum(earned.get(a, 0) for a in engine.index)
+
+    assert engine.slashed.sum() > 0
+    assert (engine.stake + engine.slashed == initial_stake).all()
+    # Only offenders lose stake, and outsiders such as the sender are ignored
+    assert (engine.slashed == 0).sum() > 1000
+    assert builder.sender not in engine.index
+
+
+def test_restaked_rewards_grow_stake():
+    engine = EpochEngine(population, restake_rewards=True)
+    engine.run(source, 2)
+    assert (engine.stake == initial_stake - engine.slashed + engine.rewards).all()
+    rewarded = (engine.rewards > 0) & (engine.slashed == 0)
+    assert rewarded.any()
+    assert (engine.stake[rewarded] > initial_stake[rewarded]).all()
+
+
+def test_checkpoints_resume_the_run(tmp_path):
+    whole = EpochEngine(population)
+    summaries = whole.run(source, 5)
+
+    interrupted = EpochEngine(
+        population, checkpoint_dir=str(tmp_path), checkpoint_every=2
+    )
+    interrupted.run(source, 3)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["epoch-00000002.npz"]
+
+    resumed = EpochEngine.resume(str(tmp_path), checkpoint_every=2)
+    assert resumed.epoch == 2
+    assert resumed.addresses == population
+    resumed_summaries = resumed.run(source, 3)
+    assert resumed_summaries == summaries[2:]
+    for name in ("stake", "rewards", "slashed"):
+        assert np.array_equal(getattr(resumed, name), getattr(whole, name))
+    assert (tmp_path / "epoch-00000004.npz").exists()
+
+    with pytest.raises(FileNotFoundError):
+        EpochEngine.resume(str(tmp_path / "missing"))
+
+
+def test_wei_scale_stakes_stay_exact(tmp_path):
+    # Stakes past int64, with a unit digit a float sum would lose
+    stakes = [10**24 + 7 * i + 1 for i in range(len(population))]
+    engine = EpochEngine(
+        population, stakes=stakes, checkpoint_dir=str(tmp_path), checkpoint_every=1
+    )
+    engine.process_epoch(source(0, engine.stake))
+    assert engine.stake.dtype == object
+
+    slashed = dict.fromkeys(population, 0)
+    for addresses, transaction_results, budget in source(0, stakes):
+        fee_events, _ = process_transaction(
+            addresses,
+            transaction_results,
+            budget,
+            stakes=[
+                stakes[engine.index[a]] if a in engine.index else 0 for a in addresses
+            ],
+        )
+        for address in addresses:
+            if address in slashed:
+                slashed[address] += compute_total_slashed(fee_events, address)
+    assert engine.stake.tolist() == [
+        stake - slashed[a] for a, stake in zip(population, stakes)
+    ]
+    assert sum(slashed.values()) > 0
+
+    resumed = EpochEngine.resume(str(tmp_path))
+    assert resumed.stake.tolist() == engine.stake.tolist()
+
+
+def test_resume_keeps_checkpoint_settings(tmp_path):
+    params = DEFAULT_PROTOCOL_PARAMS.model_copy(update={"idle_slash_rate": 0.02})
+    engine = EpochEngine(
+        population,
+        params,
+        restake_rewards=True,
+        checkpoint_dir=str(tmp_path),
+        checkpoint_every=1,
+    )
+    engine.run(source, 1)
+
+    resumed = EpochEngine.resume(str(tmp_path))
+    assert resumed.params == params and resumed.restake_rewards
+    with pytest.raises(ValueError):
+        EpochEngine.resume(str(tmp_path), restake_rewards=False)
+    with pytest.raises(ValueError):
+        EpochEngine.resume(str(tmp_path), params=DEFAULT_PROTOCOL_PARAMS)
@@ -0,0 +1,101 @@
+import itertools
+import math
+import time
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from fee_simulator.models import TransactionBudget, Appeal
+from fee_simulator.utils import generate_random_eth_address
+from fee_simulator.core.round_fee_distribution.distribute_round import FEE_RULES
+from fee_simulator.analysis.expected_payouts import (
+    expected_round_payouts,
+    majority_probabilities,
+    vote_count_distributions,
+)
+
+budget = TransactionBudget(
+    leaderTimeout=100,
+    validatorsTimeout=200,
+    appealRounds=1,
+    rotations=[0, 0],
+    senderAddress=generate_random_eth_address(),
+    appeals=[Appeal(appealantAddress=generate_random_eth_address())],
+)
+
+
+def brute_force(label, probabilities, round_index):
+    # Every vote combination, weighted by its probability
+    full = np.column_stack([probabilities, 1 - probabilities.sum(axis=1)])
+    kernel = FEE_RULES[label]
+    totals = defaultdict(float)
+    for combination in itertools.product(range(4), repeat=len(full)):
+        probability = np.prod([full[i, c] for i, c in enumerate(combination)])
+        codes = np.array(combination, dtype=np.int8)
+        plan = kernel.plan(codes, round_index, budget)
+        for rule, amount, size in plan.entries:
+            totals[(rule.field, rule.role)] += probability * amount * size
+    return totals
+
+
+@pytest.mark.parametrize(
+    "label, round_index",
+    [
+        ("NORMAL_ROUND", 0),
+        ("APPEAL_LEADER_SUCCESSFUL", 1),
+        ("APPEAL_LEADER_TIMEOUT_SUCCESSFUL", 1),
+        ("APPEAL_VALIDATOR_SUCCESSFUL", 1),
+        ("APPEAL_VALIDATOR_UNSUCCESSFUL", 1),
+        ("LEADER_TIMEOUT_50_PERCENT", 0),
+        ("SPLIT_PREVIOUS_APPEAL_BOND", 2),
+        ("LEADER_TIMEOUT_150_PREVIOUS_NORMAL_ROUND", 2),
+    ],
+)
+def test_matches_enumeration_of_every_vote(label, round_index):
+    rng = np.random.default_rng(5)
+    probabilities = rng.dirichlet([2, 2, 1, 1], size=5)[:, :3]
+    expected = expected_round_payouts(label, probabilities, budget, round_index)
+    totals = brute_force(label, probabilities, round_index)
+
+    computed = {("earned", role): v for role, v in expected.earned.items()}
+    computed.update({("burned", role): v for role, v in expected.burned.items()})
+    assert set(computed) <= set(totals)
+    for key, amount in totals.items():
+        assert computed.get(key, 0) == pytest.approx(amount, abs=1e-9)
+
+
+def test_identical_voters_follow_the_binomial():
+    n, p = 11, 0.55
+    pmf = vote_count_distributions(np.tile([p, 0.3, 0.1], (n, 1)))
+    binomial = [math.comb(n, k) * p**k * (1 - p) ** (n - k) for k in range(n + 1)]
+    assert np.allclose(pmf[0], binomial)
+    assert np.allclose(pmf.sum(axis=1), 1)
+
+    majority = majority_probabilities(pmf)
+    assert majority["AGREE"] == pytest.approx(sum(binomial[6:]))
+    assert sum(majority.values()) == pytest.approx(1)
+
+
+def test_large_round_is_fast_and_consistent():
+    rng = np.random.default_rng(0)
+    probabilities = rng.dirichlet([6, 2, 1, 1], size=1000)[:, :3]
+    start = time.perf_counter()
+    expected = expected_round_payouts("NORMAL_ROUND", probabilities, budget)
+    assert time.perf_counter() - start < 1.0
+
+    # The leader is paid whatever the outcome; each voter is either paid
+    # or penalized once a majority forms
+    assert expected.earned["LEADER"] == pytest.approx(100)
+    majority = expected.majority["AGREE"]
+    assert majority == pytest.approx(1)
+    agree_votes = probabilities[:, 0].sum()
+    assert expected.earned["VALIDATOR"] == pytest.approx(200 * agree_votes)
+    assert expected.burned["VALIDATOR"] == pytest.approx(200 * (1000 - agree_votes))
+
+
+def test_invalid_probabilities():
+    with pytest.raises(ValueError):
+        vote_count_distributions(np.array([[0.6, 0.6, 0.0]]))
+    with pytest.raises(ValueError):
+        vote_count_distributions(np.array([[0.5, 0.5]]))
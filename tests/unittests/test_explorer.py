@@ -0,0 +1,114 @@
+from fee_simulator.analysis.explorer import (
+    SIMPLEST,
+    RoundPattern,
+    ScenarioBuilder,
+    check_pattern,
+    enumerate_patterns,
+    explore_outcome_space,
+    pattern_key,
+    round_patterns,
+    shrink,
+)
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.invariants import check_invariants
+
+
+def test_round_patterns_cover_outcome_classes():
+    normal = round_patterns(0)
+    appeal = round_patterns(1)
+    assert len(normal) == 3 + 4 * 3 * 3
+    assert len(appeal) == 4 * 3 * 2
+    assert all(pattern.leader == "RECEIPT" for pattern in appeal)
+    assert len(list(enumerate_patterns(1))) == 39 + 39 * 24 * 39
+
+
+def test_builder_matches_pattern():
+    builder = ScenarioBuilder(max_appeals=1)
+    pattern = (
+        RoundPattern(majority="DISAGREE"),
+        RoundPattern(majority="AGREE"),
+        RoundPattern(),
+    )
+    transaction_results, budget = builder.build(pattern)
+    fee_events, labels = process_transaction(
+        builder.addresses(), transaction_results, budget
+    )
+    assert labels == [
+        "SKIP_ROUND",
+        "APPEAL_LEADER_SUCCESSFUL",
+        "NORMAL_ROUND",
+    ]
+    check_invariants(fee_events, budget, transaction_results)
+
+
+def test_explorer_reports_minimal_reproducers():
+    report = explore_outcome_space(max_appeals=0)
+    assert report.n_patterns == 39
+    assert report.n_checked <= report.n_patterns
+    assert report.ok  # single rounds satisfy every invariant
+
+    builder = ScenarioBuilder(max_appeals=0)
+    for reproducer in report.reproducers:
+        assert len(reproducer.pattern) == 1
+        rerun = check_pattern(builder, reproducer.pattern)
+        assert rerun is not None and rerun.invariant == reproducer.invariant
+
+
+def test_replaced_and_unreplaced_idleness_are_both_checked():
+    builder = ScenarioBuilder(max_appeals=0)
+    pairs = [
+        (pattern, pattern.model_copy(update={"idle": "UNREPLACED"}))
+        for pattern in round_patterns(0)
+        if pattern.idle == "REPLACED"
+    ]
+    assert pairs
+    for replaced, unreplaced in pairs:
+        assert pattern_key(builder, (replaced,)) != pattern_key(builder, (unreplaced,))
+    # Every single-round pattern then gets its own check
+    report = explore_outcome_space(max_appeals=0)
+    assert report.n_checked == report.n_patterns
+
+
+def test_shrink_reaches_a_minimal_reproducer():
+    builder = ScenarioBuilder(max_appeals=1)
+    # A successful leader appeal followed by a leader timeout breaks cost
+    # balance; the extra idleness and hash minorities play no part in it
+    decorated = (
+        RoundPattern(majority="DISAGREE", idle="REPLACED", hash_minority="VALIDATOR"),
+        RoundPattern(majority="AGREE", idle="UNREPLACED"),
+        RoundPattern(leader="TIMEOUT", majority="UNDETERMINED", idle="REPLACED"),
+    )
+    violation = check_pattern(builder, decorated)
+    assert violation is not None
+    assert violation.invariant == "costs_equal_earnings"
+
+    minimal = shrink(builder, violation)
+    assert minimal.invariant == violation.invariant
+    assert minimal.pattern == (
+        RoundPattern(majority="DISAGREE"),
+        RoundPattern(majority="AGREE"),
+        RoundPattern(leader="TIMEOUT", majority="UNDETERMINED"),
+    )
+    rerun = check_pattern(builder, minimal.pattern)
+    assert rerun is not None and rerun.invariant == minimal.invariant
+
+    # No single simplification keeps the violation
+    assert check_pattern(builder, minimal.pattern[:1]) is None
+    for i, round_pattern in enumerate(minimal.pattern):
+        for field in ("leader", "majority"):
+            if getattr(round_pattern, field) == getattr(SIMPLEST, field):
+                continue
+            if round_pattern.leader == "TIMEOUT" and field == "majority":
+                continue  # a timed out leader leaves no majority
+            simpler = round_pattern.model_copy(update={field: getattr(SIMPLEST, field)})
+            result = check_pattern(
+                builder, minimal.pattern[:i] + (simpler,) + minimal.pattern[i + 1 :]
+            )
+            assert result is None or result.invariant != minimal.invariant
+
+
+def test_parallel_exploration_matches_serial():
+    serial = explore_outcome_space(max_appeals=0)
+    parallel = explore_outcome_space(max_appeals=0, workers=2)
+    assert parallel.n_checked == serial.n_checked
+    assert set(parallel.violations) == set(serial.violations)
@@ -0,0 +1,159 @@
+import copy
+import pickle
+
+import pytest
+from fee_simulator.models import (
+    FeeEvent,
+    EventSequence,
+    TransactionRoundResults,
+    TransactionBudget,
+    Round,
+    Rotation,
+    Appeal,
+)
+from fee_simulator.ledger import (
+    FeeEventLedger,
+    LabelClass,
+    label_class,
+    merge_ledgers,
+)
+from fee_simulator.core.scenario_cache import build_payout_template
+from fee_simulator.core.burns import compute_unsuccessful_leader_appeal_burn
+from fee_simulator.utils import generate_random_eth_address
+
+addresses = [generate_random_eth_address() for _ in range(20)]
+
+
+def test_label_classes():
+    assert LabelClass.UNSUCCESSFUL in label_class("APPEAL_LEADER_UNSUCCESSFUL")
+    assert LabelClass.SUCCESSFUL not in label_class("APPEAL_LEADER_UNSUCCESSFUL")
+    assert LabelClass.BOND_SPLIT in label_class("SPLIT_PREVIOUS_APPEAL_BOND")
+    assert LabelClass.LEADER_TIMEOUT in label_class("LEADER_TIMEOUT_50_PERCENT")
+    assert label_class(None) == LabelClass.NONE
+
+
+def test_ledger_buckets_track_totals():
+    ledger = FeeEventLedger()
+    ledger.append(FeeEvent(sequence_id=1, address=addresses[0], staked=10))
+    ledger.extend(
+        [
+            FeeEvent(
+                sequence_id=2,
+                address=addresses[1],
+                round_index=1,
+                round_label="APPEAL_LEADER_UNSUCCESSFUL",
+                role="APPEALANT",
+                cost=300,
+            ),
+            FeeEvent(
+                sequence_id=3,
+                address=addresses[2],
+                round_index=2,
+                round_label="NORMAL_ROUND",
+                role="VALIDATOR",
+                earned=100,
+            ),
+        ]
+    )
+    assert len(ledger) == 3
+    assert ledger.round_bucket(2).earned == 100
+    assert ledger.label_bucket("APPEAL_LEADER_UNSUCCESSFUL").cost == 300
+    assert ledger.address_bucket(addresses[0]).staked == 10
+    assert ledger.round_bucket(7).events == []
+    assert [label for label, _ in ledger.label_buckets(exclude=LabelClass.APPEAL)] == [
+        None,
+        "NORMAL_ROUND",
+    ]
+    assert isinstance(ledger.copy(), FeeEventLedger)
+    assert compute_unsuccessful_leader_appeal_burn(1, addresses[1], ledger) == 200
+    assert compute_unsuccessful_leader_appeal_burn(1, addresses[1], list(ledger)) == 200
+
+
+def test_ledger_survives_pickling_and_deepcopy():
+    ledger = FeeEventLedger(
+        [
+            FeeEvent(sequence_id=1, address=addresses[0], staked=10),
+            FeeEvent(
+                sequence_id=2,
+                address=addresses[1],
+                round_index=0,
+                round_label="NORMAL_ROUND",
+                role="LEADER",
+                earned=100,
+            ),
+        ]
+    )
+    for copied in (pickle.loads(pickle.dumps(ledger)), copy.deepcopy(ledger)):
+        assert isinstance(copied, FeeEventLedger)
+        assert list(copied) == list(ledger)
+        assert copied.round_bucket(0).earned == 100
+        assert copied.address_bucket(addresses[0]).staked == 10
+        copied.append(FeeEvent(sequence_id=3, address=addresses[0], staked=5))
+        assert copied.address_bucket(addresses[0]).staked == 15
+        assert ledger.address_bucket(addresses[0]).staked == 10
+
+
+def test_ledger_is_append_only():
+    ledger = FeeEventLedger([FeeEvent(sequence_id=1, address=addresses[0])])
+    with pytest.raises(TypeError):
+        ledger.pop()
+    with pytest.raises(TypeError):
+        ledger[0] = FeeEvent(sequence_id=2, address=addresses[1])
+
+
+def test_sequence_blocks_are_contiguous():
+    sequence = EventSequence()
+    assert sequence.next_id() == 1
+    first, empty, second = sequence.reserve_blocks([3, 0, 2])
+    assert (first.start, first.stop, len(empty), second.start) == (2, 5, 0, 5)
+    assert sequence.reserve(4).start == 7
+    assert sequence.next_id() == 11
+
+    assert [second.next_id(), second.next_id()] == [5, 6]
+    with pytest.raises(ValueError, match="exhausted"):
+        second.next_id()
+
+    first.next_id()
+    copied = pickle.loads(pickle.dumps(first))
+    assert (copied.next_id(), copied.remaining) == (3, 1)
+
+
+def test_merged_round_ledgers_match_serial_emission():
+    votes = [
+        {addresses[0]: ["LEADER_RECEIPT", "AGREE"], addresses[1]: "AGREE"},
+        {addr: "AGREE" for addr in addresses[2:9]},
+        {addr: "DISAGREE" for addr in addresses[9:20]},
+    ]
+    votes[2].update({addresses[0]: ["LEADER_RECEIPT", "AGREE"]})
+    results = TransactionRoundResults(
+        rounds=[Round(rotations=[Rotation(votes=round_votes)]) for round_votes in votes]
+    )
+    budget = TransactionBudget(
+        leaderTimeout=100,
+        validatorsTimeout=200,
+        appealRounds=1,
+        rotations=[0, 0],
+        senderAddress=addresses[19],
+        appeals=[Appeal(appealantAddress=addresses[18])],
+    )
+    template = build_payout_template(results, budget)
+    n_rounds = len(template.plans)
+
+    sequence = EventSequence()
+    serial = FeeEventLedger()
+    for i in range(n_rounds):
+        serial.extend(template.round_events(results, i, budget, sequence))
+
+    # Emit rounds out of order into their own ledgers, then merge
+    blocks = EventSequence().reserve_blocks(p.event_count for p in template.plans)
+    round_ledgers = [
+        FeeEventLedger(template.round_events(results, i, budget, blocks[i]))
+        for i in reversed(range(n_rounds))
+    ]
+    assert all(block.remaining == 0 for block in blocks)
+    merged = merge_ledgers(*round_ledgers)
+    assert merged == serial
+    assert merged.round_bucket(0).earned == serial.round_bucket(0).earned
+
+    with pytest.raises(ValueError, match="duplicated"):
+        merge_ledgers(serial, serial)
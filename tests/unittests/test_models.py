@@ -0,0 +1,38 @@
+import pytest
+from pydantic import ValidationError
+
+from fee_simulator.models import Appeal, Rotation, is_valid_address
+from fee_simulator.utils import generate_random_eth_address
+
+addresses_pool = [generate_random_eth_address() for _ in range(5)]
+
+
+def test_rotation_validates_addresses_and_hashes():
+    rotation = Rotation(
+        votes={
+            addresses_pool[0]: ["LEADER_RECEIPT", "AGREE", "0xabc"],
+            addresses_pool[1]: ["AGREE", "0xabc"],
+            addresses_pool[2]: "TIMEOUT",
+        },
+        reserve_votes={addresses_pool[3]: "AGREE"},
+    )
+    assert len(rotation.votes) == 3
+
+    with pytest.raises(ValidationError, match="Invalid Ethereum address"):
+        Rotation(votes={"0x123": "AGREE"})
+    with pytest.raises(ValidationError, match="Invalid hash format"):
+        Rotation(votes={addresses_pool[0]: ["AGREE", "abc"]})
+    with pytest.raises(ValidationError, match="Invalid reserve Ethereum address"):
+        Rotation(votes={}, reserve_votes={"0x123": "AGREE"})
+    with pytest.raises(ValidationError, match="Invalid Ethereum address"):
+        Appeal(appealantAddress=addresses_pool[4] + "0")
+
+
+def test_address_validation_is_cached():
+    address = generate_random_eth_address()
+    before = is_valid_address.cache_info()
+    assert is_valid_address(address)
+    assert is_valid_address(address)
+    after = is_valid_address.cache_info()
+    assert after.misses == before.misses + 1
+    assert after.hits == before.hits + 1
@@ -0,0 +1,73 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from fee_simulator.models import (
+    TransactionRoundResults,
+    TransactionBudget,
+    Appeal,
+)
+from fee_simulator.constants import ROUND_SIZES, VOTE_CODES
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.core.scenario_cache import PayoutTemplateCache
+from fee_simulator.utils import generate_random_eth_address
+
+N_APPEALS = 4
+round_sizes = ROUND_SIZES[: 2 * N_APPEALS + 1]
+addresses_pool = [generate_random_eth_address() for _ in range(sum(round_sizes) + 5)]
+
+
+def deep_appeal_scenario(seed):
+    rng = np.random.default_rng(seed)
+    vote_choices = np.array([VOTE_CODES[v] for v in ("AGREE", "DISAGREE", "TIMEOUT")])
+    round_arrays = []
+    first = 0
+    for size in round_sizes:
+        round_arrays.append(
+            dict(
+                addresses=addresses_pool[first : first + size],
+                vote_codes=rng.choice(vote_choices, size=size, p=[0.6, 0.3, 0.1]),
+            )
+        )
+        first += size
+    budget = TransactionBudget(
+        leaderTimeout=100,
+        validatorsTimeout=200,
+        appealRounds=N_APPEALS,
+        rotations=[0] * (N_APPEALS + 1),
+        senderAddress=addresses_pool[-1],
+        appeals=[
+            Appeal(appealantAddress=addresses_pool[-2 - i]) for i in range(N_APPEALS)
+        ],
+    )
+    return TransactionRoundResults.from_arrays(round_arrays), budget
+
+
+def dumped(fee_events):
+    return [event.model_dump() for event in fee_events]
+
+
+def test_concurrent_rounds_match_serial_path():
+    scenarios = [deep_appeal_scenario(seed) for seed in range(3)]
+    serial = [
+        process_transaction(addresses_pool, results, budget)
+        for results, budget in scenarios
+    ]
+
+    with ThreadPoolExecutor(max_workers=3) as threads, ProcessPoolExecutor(
+        max_workers=2
+    ) as processes:
+        for executor in (threads, processes):
+            for (results, budget), (events, labels) in zip(scenarios, serial):
+                concurrent_events, concurrent_labels = process_transaction(
+                    addresses_pool, results, budget, executor=executor
+                )
+                assert concurrent_labels == labels
+                assert dumped(concurrent_events) == dumped(events)
+
+        cache = PayoutTemplateCache()
+        results, budget = scenarios[0]
+        cached_events, _ = process_transaction(
+            addresses_pool, results, budget, template_cache=cache, executor=threads
+        )
+        assert dumped(cached_events) == dumped(serial[0][0])
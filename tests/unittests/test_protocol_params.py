@@ -0,0 +1,136 @@
+import pickle
+
+import pytest
+from pydantic import ValidationError
+
+from fee_simulator.models import (
+    TransactionRoundResults,
+    TransactionBudget,
+    Round,
+    Rotation,
+    Appeal,
+    ProtocolParams,
+    DEFAULT_PROTOCOL_PARAMS,
+)
+from fee_simulator.constants import ROUND_SIZES, PENALTY_REWARD_COEFFICIENT
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.core.scenario_cache import PayoutTemplateCache, scenario_signature
+from fee_simulator.core.bond_computing import compute_appeal_bond
+from fee_simulator.fee_aggregators.address_metrics import (
+    compute_total_earnings,
+    compute_total_costs,
+)
+from fee_simulator.utils import compute_total_cost, generate_random_eth_address
+
+addresses_pool = [generate_random_eth_address() for _ in range(40)]
+
+budget = TransactionBudget(
+    leaderTimeout=100,
+    validatorsTimeout=200,
+    appealRounds=1,
+    rotations=[0, 0],
+    senderAddress=addresses_pool[-1],
+    appeals=[Appeal(appealantAddress=addresses_pool[-2])],
+)
+
+
+def make_results(normal_votes, appeal_votes=None):
+    rounds = [
+        Round(rotations=[Rotation(votes=dict(zip(addresses_pool, normal_votes)))])
+    ]
+    if appeal_votes is not None:
+        rounds.append(
+            Round(
+                rotations=[Rotation(votes=dict(zip(addresses_pool[5:], appeal_votes)))]
+            )
+        )
+    return TransactionRoundResults(rounds=rounds)
+
+
+def test_params_are_frozen_hashable_and_picklable():
+    params = ProtocolParams(round_sizes=[3, 5, 9], leader_slash_rate=0.1)
+    assert params.round_sizes == (3, 5, 9)
+    assert hash(params) == hash(
+        ProtocolParams(round_sizes=(3, 5, 9), leader_slash_rate=0.1)
+    )
+    assert params != DEFAULT_PROTOCOL_PARAMS
+    assert pickle.loads(pickle.dumps(params)) == params
+    with pytest.raises(ValidationError):
+        params.leader_slash_rate = 0.2
+    with pytest.raises(ValidationError):
+        ProtocolParams(round_sizes=())
+    assert DEFAULT_PROTOCOL_PARAMS.round_sizes == tuple(ROUND_SIZES)
+    assert (
+        DEFAULT_PROTOCOL_PARAMS.penalty_reward_coefficient == PENALTY_REWARD_COEFFICIENT
+    )
+
+
+def test_default_params_match_implicit_defaults():
+    results = make_results([["LEADER_RECEIPT", "AGREE"], "DISAGREE", "AGREE", "AGREE"])
+    implicit, labels = process_transaction(addresses_pool, results, budget)
+    explicit, explicit_labels = process_transaction(
+        addresses_pool, results, budget, params=DEFAULT_PROTOCOL_PARAMS
+    )
+    assert explicit_labels == labels
+    assert [e.model_dump() for e in explicit] == [e.model_dump() for e in implicit]
+
+
+def test_custom_params_change_costs_bonds_and_slashes():
+    params = ProtocolParams(
+        round_sizes=(3, 5, 9),
+        penalty_reward_coefficient=3,
+        default_stake=500,
+        idle_slash_rate=0.1,
+    )
+    assert compute_total_cost(budget, params) != compute_total_cost(budget)
+    assert compute_appeal_bond(0, 100, 200, params) != compute_appeal_bond(0, 100, 200)
+
+    results = make_results([["LEADER_RECEIPT", "AGREE"], "DISAGREE", "IDLE", "AGREE"])
+    fee_events, _ = process_transaction(addresses_pool, results, budget, params=params)
+    default_events, _ = process_transaction(addresses_pool, results, budget)
+
+    idle_slashes = [e.slashed for e in fee_events if e.slashed]
+    default_idle_slashes = [e.slashed for e in default_events if e.slashed]
+    assert idle_slashes == [50]
+    assert idle_slashes != default_idle_slashes
+    assert compute_total_costs(fee_events, budget.senderAddress) == (
+        compute_total_cost(budget, params)
+    )
+    # The sender refund follows the cheaper rounds
+    assert fee_events[-1].earned != default_events[-1].earned
+
+
+def test_params_key_the_template_cache():
+    params = ProtocolParams(round_sizes=(3, 5, 9), penalty_reward_coefficient=3)
+    results = make_results(
+        [["LEADER_RECEIPT", "AGREE"], "DISAGREE", "AGREE", "AGREE"],
+        ["AGREE", "DISAGREE", "AGREE", "AGREE", "DISAGREE", "AGREE", "AGREE"],
+    )
+    assert scenario_signature(results, budget, params) != scenario_signature(
+        results, budget, DEFAULT_PROTOCOL_PARAMS
+    )
+
+    cache = PayoutTemplateCache()
+    for chosen in (DEFAULT_PROTOCOL_PARAMS, params, DEFAULT_PROTOCOL_PARAMS, params):
+        uncached, labels = process_transaction(
+            addresses_pool, results, budget, params=chosen
+        )
+        cached, cached_labels = process_transaction(
+            addresses_pool, results, budget, template_cache=cache, params=chosen
+        )
+        assert cached_labels == labels
+        assert [e.model_dump() for e in cached] == [e.model_dump() for e in uncached]
+
+        summary = process_transaction(
+            addresses_pool,
+            results,
+            budget,
+            mode="summary",
+            template_cache=cache,
+            params=chosen,
+        )
+        assert summary.refund == uncached[-1].earned
+        for address in addresses_pool[:8]:
+            assert summary.totals(address)["earned"] == (
+                compute_total_earnings(uncached, address)
+            )
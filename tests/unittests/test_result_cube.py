@@ -0,0 +1,121 @@
+import json
+
+import numpy as np
+import pytest
+
+from fee_simulator.models import ProtocolParams, DEFAULT_PROTOCOL_PARAMS
+from fee_simulator.analysis.explorer import RoundPattern, ScenarioBuilder
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.result_cube import (
+    CubeAxis,
+    ResultCube,
+    outcome_metrics,
+    sweep,
+)
+
+PATTERNS = [
+    (RoundPattern(),),
+    (RoundPattern(majority="UNDETERMINED"), RoundPattern(), RoundPattern()),
+    (RoundPattern(leader="TIMEOUT", majority="UNDETERMINED"),),
+]
+AXES = [
+    CubeAxis(name="leaderTimeout", values=[100, 200]),
+    CubeAxis(name="validatorsTimeout", values=[200, 400, 600]),
+    CubeAxis(
+        name="params",
+        values=[DEFAULT_PROTOCOL_PARAMS, ProtocolParams(penalty_reward_coefficient=2)],
+    ),
+    CubeAxis(name="scenario", values=list(range(len(PATTERNS)))),
+]
+
+
+def evaluate(coordinates):
+    params = ProtocolParams(**coordinates["params"])
+    builder = ScenarioBuilder(
+        1, params, coordinates["leaderTimeout"], coordinates["validatorsTimeout"]
+    )
+    transaction_results, budget = builder.build(PATTERNS[coordinates["scenario"]])
+    outcome = process_transaction(
+        builder.addresses(),
+        transaction_results,
+        budget,
+        mode="summary",
+        params=params,
+    )
+    return outcome_metrics(outcome)
+
+
+def test_sweep_fills_the_cube(tmp_path):
+    cube = sweep(str(tmp_path / "serial"), AXES, evaluate)
+    assert cube.shape == (2, 3, 2, 3)
+    assert cube.filled.all()
+
+    metadata = json.loads((tmp_path / "serial" / "cube.json").read_text())
+    assert metadata["shape"] == [2, 3, 2, 3]
+    assert metadata["axes"][2]["values"][1]["penalty_reward_coefficient"] == 2
+
+    coordinates = dict(
+        leaderTimeout=200,
+        validatorsTimeout=400,
+        params=ProtocolParams(penalty_reward_coefficient=2),
+        scenario=1,
+    )
+    index = cube.index(**coordinates)
+    assert index == (1, 1, 1, 1)
+    expected = evaluate(cube.coordinates(index))
+    for name in cube.metrics:
+        assert cube[name][index] == expected.get(name, 0)
+    assert cube["label_APPEAL_LEADER_SUCCESSFUL"][index] == 1
+
+    # Slicing by axis values keeps the other axes in order
+    refunds = cube.select("sender_refund", params=DEFAULT_PROTOCOL_PARAMS, scenario=0)
+    assert refunds.shape == (2, 3)
+    assert refunds[1, 2] == cube["sender_refund"][1, 2, 0, 0]
+    assert (cube["label_NORMAL_ROUND"][..., 0] == 1).all()
+
+    parallel = sweep(str(tmp_path / "parallel"), AXES, evaluate, workers=2)
+    for name in cube.metrics:
+        assert np.array_equal(parallel[name], cube[name])
+
+
+def test_cells_are_written_in_place(tmp_path):
+    directory = str(tmp_path / "cube")
+    cube = ResultCube.create(
+        directory,
+        [CubeAxis(name="scenario", values=["a", "b"]), AXES[0]],
+        metrics=["sender_refund", "total_burned"],
+    )
+    assert not cube.filled.any()
+
+    writer = ResultCube(directory, mode="r+")
+    writer.write(writer.index(scenario="b", leaderTimeout=100), {"sender_refund": 7})
+    writer.flush()
+
+    reader = ResultCube(directory)
+    assert reader["sender_refund"].tolist() == [[0, 0], [7, 0]]
+    assert reader.filled.tolist() == [[False, False], [True, False]]
+    with pytest.raises(ValueError):
+        reader["sender_refund"][0, 0] = 1
+    with pytest.raises(KeyError):
+        writer.write((0, 0), {"refund": 1})
+    with pytest.raises(ValueError):
+        writer.index(scenario="a")
+    with pytest.raises(ValueError):
+        ResultCube.create(str(tmp_path / "bad"), [AXES[0], AXES[0]])
+
+
+def test_axes_take_numpy_values(tmp_path):
+    axis = CubeAxis(name="x", values=np.arange(3))
+    assert axis.values == (0, 1, 2)
+    assert all(type(value) is int for value in axis.values)
+    assert axis.index_of(np.int64(1)) == 1
+    assert axis.index_of(1) == 1
+    grid = CubeAxis(name="grid", values=[np.array([0.5, 1.0]), (np.float32(2),)])
+    assert grid.values == ([0.5, 1.0], [2.0])
+    assert grid.index_of(np.array([0.5, 1.0])) == 0
+    with pytest.raises(ValueError):
+        CubeAxis(name="x", values=[object()])
+
+    cube = ResultCube.create(str(tmp_path / "cube"), [axis], ["leader_net"])
+    assert ResultCube(str(tmp_path / "cube")).axis("x") == axis
+    assert cube.index(x=np.int64(2)) == (2,)
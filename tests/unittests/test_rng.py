@@ -0,0 +1,45 @@
+import numpy as np
+from fee_simulator.rng import RandomStreams, chunk_ranges, transaction_rng
+from fee_simulator.utils import generate_eth_addresses, generate_random_eth_address
+
+
+def draw_chunked(root_seed, n_transactions, n_chunks):
+    streams = RandomStreams(root_seed)
+    draws = []
+    for start, stop in chunk_ranges(n_transactions, n_chunks):
+        for _, rng in streams.transactions(start, stop):
+            draws.append(rng.integers(0, 2**32, size=3))
+    return np.stack(draws)
+
+
+def test_transaction_streams_do_not_depend_on_chunking():
+    serial = draw_chunked(7, 50, 1)
+    assert np.array_equal(serial, draw_chunked(7, 50, 4))
+    assert np.array_equal(serial, draw_chunked(7, 50, 64))
+    assert not np.array_equal(serial, draw_chunked(8, 50, 1))
+
+
+def test_single_transaction_replay():
+    replayed = transaction_rng(7, 31).integers(0, 2**32, size=3)
+    assert np.array_equal(replayed, draw_chunked(7, 50, 3)[31])
+
+
+def test_stream_families_are_independent():
+    streams = RandomStreams(7)
+    assert streams.for_transaction(0).integers(2**32) != streams.for_worker(
+        0
+    ).integers(2**32)
+
+
+def test_seeded_addresses():
+    addresses = generate_eth_addresses(10, transaction_rng(1, 0))
+    assert addresses == generate_eth_addresses(10, transaction_rng(1, 0))
+    assert len(set(addresses)) == 10
+    assert all(len(address) == 42 for address in addresses)
+    assert generate_random_eth_address(transaction_rng(1, 0)) == addresses[0]
+
+
+def test_chunk_ranges_cover_everything():
+    assert chunk_ranges(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert chunk_ranges(2, 8) == [(0, 1), (1, 2)]
+    assert chunk_ranges(0, 4) == []
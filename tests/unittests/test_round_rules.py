@@ -0,0 +1,94 @@
+from fee_simulator.models import (
+    TransactionRoundResults,
+    Round,
+    Rotation,
+    TransactionBudget,
+    EventSequence,
+)
+from fee_simulator.core.round_fee_distribution.rules import (
+    PayoutRule,
+    RoundRuleSpec,
+    compile_round_rules,
+    validators_timeout,
+    minority_penalty,
+)
+from fee_simulator.core.round_fee_distribution.distribute_round import FEE_RULES
+from fee_simulator.core.majority import compute_majority_from_codes, encode_votes
+from fee_simulator.utils import generate_random_eth_address
+
+addresses = [generate_random_eth_address() for _ in range(6)]
+
+budget = TransactionBudget(
+    leaderTimeout=100,
+    validatorsTimeout=200,
+    appealRounds=0,
+    rotations=[0],
+    senderAddress=addresses[5],
+    appeals=[],
+)
+
+transaction_results = TransactionRoundResults(
+    rounds=[
+        Round(
+            rotations=[
+                Rotation(
+                    votes={
+                        addresses[0]: ["LEADER_RECEIPT", "AGREE"],
+                        addresses[1]: "TIMEOUT",
+                        addresses[2]: "AGREE",
+                        addresses[3]: "DISAGREE",
+                        addresses[4]: "AGREE",
+                    }
+                )
+            ]
+        )
+    ]
+)
+
+
+def test_majority_from_codes():
+    _, normalized, codes = encode_votes(
+        transaction_results.rounds[0].rotations[-1].votes
+    )
+    assert normalized == ["AGREE", "TIMEOUT", "AGREE", "DISAGREE", "AGREE"]
+    assert compute_majority_from_codes(codes) == "AGREE"
+    assert compute_majority_from_codes(codes[:4]) == "UNDETERMINED"
+
+
+def test_every_label_has_a_compiled_kernel():
+    payouts = FEE_RULES["NORMAL_ROUND"].payouts(transaction_results, 0, budget)
+    assert list(payouts.address) == [
+        addresses[0],
+        addresses[2],
+        addresses[4],
+        addresses[1],
+        addresses[3],
+        addresses[0],
+    ]
+    assert list(payouts.earned) == [200, 200, 200, 0, 0, 100]
+    assert list(payouts.burned) == [0, 0, 0, 200, 200, 0]
+    assert len(FEE_RULES["SKIP_ROUND"].payouts(transaction_results, 0, budget)) == 0
+
+
+def test_custom_spec_compiles_to_kernel():
+    kernel = compile_round_rules(
+        RoundRuleSpec(
+            label="VALIDATORS_PENALTY_ONLY_ROUND",
+            rules=[
+                PayoutRule(
+                    recipients="MAJORITY", role="VALIDATOR", amount=validators_timeout
+                ),
+                PayoutRule(
+                    recipients="MINORITY",
+                    role="VALIDATOR",
+                    field="burned",
+                    amount=minority_penalty,
+                ),
+            ],
+        )
+    )
+    events = kernel(transaction_results, 0, budget, EventSequence())
+    assert [event.sequence_id for event in events] == [1, 2, 3, 4, 5]
+    assert sum(event.earned for event in events) == 600
+    assert sum(event.burned for event in events) == 400
+    assert all(event.round_label == "VALIDATORS_PENALTY_ONLY_ROUND" for event in events)
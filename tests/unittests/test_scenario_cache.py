@@ -0,0 +1,90 @@
+from fee_simulator.models import (
+    TransactionRoundResults,
+    Round,
+    Rotation,
+    Appeal,
+    TransactionBudget,
+)
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.core.scenario_cache import PayoutTemplateCache, scenario_signature
+from fee_simulator.utils import generate_random_eth_address
+
+addresses_pool = [generate_random_eth_address() for _ in range(80)]
+
+
+def make_results(first, round_votes):
+    rounds = []
+    for votes in round_votes:
+        members = addresses_pool[first : first + len(votes)]
+        rotation = {members[0]: ["LEADER_RECEIPT", votes[0]]}
+        rotation.update({addr: vote for addr, vote in zip(members[1:], votes[1:])})
+        rounds.append(Round(rotations=[Rotation(votes=rotation)]))
+        first += len(votes)
+    return TransactionRoundResults(rounds=rounds)
+
+
+budget = TransactionBudget(
+    leaderTimeout=100,
+    validatorsTimeout=200,
+    appealRounds=1,
+    rotations=[0, 0],
+    senderAddress=addresses_pool[79],
+    appeals=[Appeal(appealantAddress=addresses_pool[78])],
+)
+
+# Unsuccessful validator appeal, then the same pattern with other validators
+# and the minority votes in other positions
+round_votes = [
+    ["AGREE", "AGREE", "AGREE", "DISAGREE", "TIMEOUT"],
+    ["AGREE"] * 5 + ["DISAGREE"] * 2,
+    ["AGREE"] * 11,
+]
+shuffled_votes = [
+    ["AGREE", "TIMEOUT", "AGREE", "AGREE", "DISAGREE"],
+    ["DISAGREE", "AGREE", "AGREE", "DISAGREE", "AGREE", "AGREE", "AGREE"],
+    ["AGREE"] * 11,
+]
+
+
+def event_rows(fee_events):
+    return [
+        (e.address, e.round_index, e.round_label, e.role, e.cost, e.earned, e.burned)
+        for e in fee_events
+    ]
+
+
+def test_signature_ignores_addresses_and_vote_order():
+    first = make_results(0, round_votes)
+    second = make_results(30, shuffled_votes)
+    assert scenario_signature(first, budget) == scenario_signature(second, budget)
+
+    different = make_results(0, [["DISAGREE"] * 5] + round_votes[1:])
+    assert scenario_signature(first, budget) != scenario_signature(different, budget)
+    cheaper = budget.model_copy(update={"leaderTimeout": 50})
+    assert scenario_signature(first, budget) != scenario_signature(first, cheaper)
+
+
+def test_cached_processing_matches_uncached():
+    cache = PayoutTemplateCache(maxsize=8)
+    for first, votes in [(0, round_votes), (30, shuffled_votes), (0, round_votes)]:
+        results = make_results(first, votes)
+        expected, expected_labels = process_transaction(addresses_pool, results, budget)
+        cached, labels = process_transaction(
+            addresses_pool, results, budget, template_cache=cache
+        )
+        assert labels == expected_labels
+        assert event_rows(cached) == event_rows(expected)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = PayoutTemplateCache(maxsize=1)
+    process_transaction(
+        addresses_pool, make_results(0, round_votes), budget, template_cache=cache
+    )
+    cheaper = budget.model_copy(update={"leaderTimeout": 50})
+    process_transaction(
+        addresses_pool, make_results(0, round_votes), cheaper, template_cache=cache
+    )
+    assert len(cache) == 1
+    assert scenario_signature(make_results(0, round_votes), budget) not in cache
@@ -0,0 +1,168 @@
+import contextlib
+import io
+import itertools
+
+import numpy as np
+import pytest
+
+from fee_simulator.models import TransactionBudget, TransactionRoundResults, Appeal
+from fee_simulator.constants import ROUND_SIZES, VOTE_CODES
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.core.scenario_cache import PayoutTemplateCache
+from fee_simulator.core.summary import (
+    AMOUNT_FIELDS,
+    TransactionOutcome,
+    build_settlement_template,
+)
+from fee_simulator.analysis.explorer import ScenarioBuilder, enumerate_patterns
+from fee_simulator.rng import transaction_rng
+from fee_simulator.utils import generate_random_eth_address
+
+
+def run_both(addresses, transaction_results, budget, seed=0, template_cache=None):
+    """
+    Run the full and summary paths; either result may be the exception raised.
+    """
+    results = []
+    for mode in ("events", "summary"):
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results.append(
+                    process_transaction(
+                        addresses,
+                        transaction_results,
+                        budget,
+                        rng=transaction_rng(seed, 0),
+                        mode=mode,
+                        template_cache=template_cache,
+                    )
+                )
+        except ValueError as error:
+            results.append(error)
+    return results
+
+
+def assert_same_outcome(full, summary):
+    if isinstance(full, Exception):
+        assert type(summary) is type(full) and str(summary) == str(full)
+        return
+    fee_events, labels = full
+    assert isinstance(summary, TransactionOutcome)
+    assert summary.labels == labels
+    assert summary.refund == fee_events[-1].earned
+    assert set(summary.addresses) == set(fee_events.addresses())
+    for address in summary.addresses:
+        bucket = fee_events.address_bucket(address)
+        assert summary.totals(address) == {
+            name: getattr(bucket, name) for name in AMOUNT_FIELDS
+        }
+    for role, totals in summary.role_totals.items():
+        bucket = fee_events.role_bucket(role)
+        assert totals == {name: getattr(bucket, name) for name in AMOUNT_FIELDS}
+    i = summary.index[summary.sender_address]
+    assert summary.net[i] == fee_events.address_bucket(
+        summary.sender_address
+    ).earned - (fee_events.address_bucket(summary.sender_address).cost)
+
+
+def test_summary_matches_full_path_over_outcome_patterns():
+    builder = ScenarioBuilder(max_appeals=1)
+    cache = PayoutTemplateCache()
+    # Every single-round pattern and a stride through the one-appeal patterns
+    patterns = itertools.chain(
+        enumerate_patterns(0),
+        itertools.islice(enumerate_patterns(1), 39, None, 37),
+    )
+    n_errors = 0
+    n_fractional = 0
+    for pattern in patterns:
+        transaction_results, budget = builder.build(pattern)
+        full, summary = run_both(builder.addresses(), transaction_results, budget)
+        assert_same_outcome(full, summary)
+        n_errors += isinstance(full, Exception)
+        assert_same_outcome(
+            full,
+            run_both(
+                builder.addresses(), transaction_results, budget, template_cache=cache
+            )[1],
+        )
+        # Odd timeouts make some shares fractional, which fee events reject
+        odd_budget = budget.model_copy(
+            update={"leaderTimeout": 7, "validatorsTimeout": 3}
+        )
+        full, summary = run_both(builder.addresses(), transaction_results, odd_budget)
+        assert_same_outcome(full, summary)
+        n_fractional += "int_from_float" in str(full)
+    assert n_errors < 10
+    assert n_fractional > 0
+
+
+def test_summary_matches_full_path_on_sampled_stakes_and_deep_appeals():
+    n_appeals = 3
+    round_sizes = ROUND_SIZES[: 2 * n_appeals + 1]
+    addresses = [generate_random_eth_address() for _ in range(sum(round_sizes) + 4)]
+    budget = TransactionBudget(
+        leaderTimeout=100,
+        validatorsTimeout=200,
+        appealRounds=n_appeals,
+        rotations=[0] * (n_appeals + 1),
+        senderAddress=addresses[-1],
+        appeals=[Appeal(appealantAddress=addresses[-2 - i]) for i in range(n_appeals)],
+        staking_distribution="lognormal",
+        staking_mean=1000,
+        staking_variance=100,
+    )
+    vote_choices = np.array([VOTE_CODES[v] for v in ("AGREE", "DISAGREE", "TIMEOUT")])
+    for seed in range(5):
+        rng = np.random.default_rng(seed)
+        round_arrays = []
+        first = 0
+        for size in round_sizes:
+            round_arrays.append(
+                dict(
+                    addresses=addresses[first : first + size],
+                    vote_codes=rng.choice(vote_choices, size=size),
+                )
+            )
+            first += size
+        transaction_results = TransactionRoundResults.from_arrays(round_arrays)
+        full, summary = run_both(addresses, transaction_results, budget, seed=seed)
+        assert_same_outcome(full, summary)
+
+
+def test_settlement_template_settles_other_stakes():
+    builder = ScenarioBuilder(max_appeals=1)
+    addresses = builder.addresses()
+    rng = np.random.default_rng(0)
+    n_checked = 0
+    for pattern in itertools.islice(enumerate_patterns(1), 0, None, 401):
+        transaction_results, budget = builder.build(pattern)
+        try:
+            template = build_settlement_template(addresses, transaction_results, budget)
+        except ValueError:
+            continue
+        for _ in range(2):
+            stakes = rng.integers(1, 10**18, size=len(addresses)).tolist()
+            full = process_transaction(
+                addresses, transaction_results, budget, stakes=stakes
+            )
+            assert_same_outcome(full, template.outcome(addresses, stakes))
+        n_checked += 1
+    assert n_checked > 5
+
+
+def test_modes_reject_options_they_cannot_honor():
+    builder = ScenarioBuilder(max_appeals=0)
+    transaction_results, budget = builder.build(next(enumerate_patterns(0)))
+    addresses = builder.addresses()
+    for mode, options in [
+        ("summary", {"grouped": True}),
+        ("summary", {"executor": object()}),
+        ("symbolic", {"rng": transaction_rng(0, 0)}),
+        ("symbolic", {"template_cache": PayoutTemplateCache()}),
+        ("symbolic", {"stakes": [1] * len(addresses)}),
+    ]:
+        with pytest.raises(ValueError, match="does not support"):
+            process_transaction(
+                addresses, transaction_results, budget, mode=mode, **options
+            )
@@ -0,0 +1,127 @@
+import random
+
+import numpy as np
+from fee_simulator.models import (
+    TransactionRoundResults,
+    Round,
+    Rotation,
+    Appeal,
+    TransactionBudget,
+)
+from fee_simulator.analysis.explorer import ScenarioBuilder, enumerate_patterns
+from fee_simulator.core.transaction_processing import process_transaction
+from fee_simulator.core.symbolic import LinearForm, LEADER_TIMEOUT, VALIDATORS_TIMEOUT
+from fee_simulator.fee_aggregators.address_metrics import (
+    compute_total_costs,
+    compute_total_earnings,
+    compute_total_burnt,
+)
+from fee_simulator.utils import generate_random_eth_address
+
+addresses_pool = [generate_random_eth_address() for _ in range(40)]
+
+
+def make_rotation(first, size, votes, leader_action="LEADER_RECEIPT"):
+    members = addresses_pool[first : first + size]
+    rotation = {members[0]: [leader_action, votes[0]]}
+    rotation.update({addr: vote for addr, vote in zip(members[1:], votes[1:])})
+    return Rotation(votes=rotation)
+
+
+# Normal round with a disagreeing minority, unsuccessful validator appeal, normal round
+transaction_results = TransactionRoundResults(
+    rounds=[
+        Round(rotations=[make_rotation(0, 5, ["AGREE"] * 3 + ["DISAGREE", "TIMEOUT"])]),
+        Round(rotations=[make_rotation(5, 7, ["AGREE"] * 5 + ["DISAGREE"] * 2)]),
+        Round(rotations=[make_rotation(12, 11, ["AGREE"] * 11)]),
+    ]
+)
+
+
+def make_budget(leader_timeout, validators_timeout):
+    return TransactionBudget(
+        leaderTimeout=leader_timeout,
+        validatorsTimeout=validators_timeout,
+        appealRounds=1,
+        rotations=[0, 0],
+        senderAddress=addresses_pool[39],
+        appeals=[Appeal(appealantAddress=addresses_pool[38])],
+    )
+
+
+def test_linear_form_arithmetic():
+    form = 3 * LEADER_TIMEOUT + VALIDATORS_TIMEOUT / 2 - 4
+    assert form == LinearForm(3, 0.5, -4)
+    assert form.evaluate(10, 6) == 29
+    assert sum([LEADER_TIMEOUT, LEADER_TIMEOUT]) == 2 * LEADER_TIMEOUT
+    assert not LinearForm()
+
+
+def test_symbolic_matches_numeric_over_budget_grid():
+    outcome = process_transaction(
+        addresses_pool, transaction_results, make_budget(100, 200), mode="symbolic"
+    )
+    leader_timeouts = [100, 300, 1000, 0]
+    validators_timeouts = [200, 50, 1000, 7]
+    priced = outcome.evaluate(leader_timeouts, validators_timeouts)
+
+    for column, (lt, vt) in enumerate(zip(leader_timeouts, validators_timeouts)):
+        fee_events, labels = process_transaction(
+            addresses_pool, transaction_results, make_budget(lt, vt)
+        )
+        assert labels == outcome.labels
+        for address in addresses_pool:
+            row = outcome.index.get(address)
+            expected = [
+                compute_total_earnings(fee_events, address),
+                compute_total_costs(fee_events, address),
+                compute_total_burnt(fee_events, address),
+            ]
+            if row is None:
+                assert expected == [0, 0, 0]
+                continue
+            got = [priced[name][row, column] for name in ("earned", "cost", "burned")]
+            assert np.allclose(got, expected), address
+
+
+SPLIT_LABELS = {
+    "LEADER_TIMEOUT_150_PREVIOUS_NORMAL_ROUND",
+    "SPLIT_PREVIOUS_APPEAL_BOND",
+}
+
+
+def test_symbolic_matches_numeric_or_refuses_splits():
+    builder = ScenarioBuilder(max_appeals=1)
+    patterns = random.Random(0).sample(list(enumerate_patterns(1)), 300)
+    n_refused = 0
+    for pattern in patterns:
+        transaction_results, budget = builder.build(pattern)
+        fee_events, labels = process_transaction(
+            builder.addresses(), transaction_results, budget
+        )
+        try:
+            outcome = process_transaction(
+                builder.addresses(), transaction_results, budget, mode="symbolic"
+            )
+        except ValueError:
+            # Rounds down per budget, which a linear form cannot follow
+            assert SPLIT_LABELS & set(labels), labels
+            n_refused += 1
+            continue
+        assert labels == outcome.labels
+        priced = outcome.evaluate([budget.leaderTimeout], [budget.validatorsTimeout])
+        for address in builder.addresses():
+            row = outcome.index.get(address)
+            expected = [
+                compute_total_earnings(fee_events, address),
+                compute_total_costs(fee_events, address),
+                compute_total_burnt(fee_events, address),
+            ]
+            got = (
+                [0, 0, 0]
+                if row is None
+                else [priced[name][row, 0] for name in ("earned", "cost", "burned")]
+            )
+            assert np.allclose(got, expected), (labels, address)
+        assert priced["refund"][0] == fee_events[-1].earned
+    assert 0 < n_refused < len(patterns)
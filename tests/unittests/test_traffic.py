@@ -0,0 +1,155 @@
+import numpy as np
+import pytest
+
+from fee_simulator.models import ProtocolParams
+from fee_simulator.simulation.agents import (
+    AgentSimulation,
+    HashDeviant,
+    Honest,
+    Lazy,
+    OpportunisticAppealant,
+)
+from fee_simulator.simulation.traffic import (
+    ARRIVAL,
+    BLOCK,
+    ROUND_END,
+    DiscreteDistribution,
+    Scheduler,
+    TrafficSimulation,
+    WindowStats,
+)
+
+params = ProtocolParams(round_sizes=(5, 7, 11, 13, 23))
+population = [
+    (Honest(), 60),
+    (Lazy(idle_rate=0.3), 10),
+    (HashDeviant(), 5),
+    (OpportunisticAppealant(), 5),
+]
+
+
+def make_traffic(**kwargs):
+    agents = AgentSimulation(population, params=params, max_appeals=2)
+    return TrafficSimulation(
+        agents,
+        arrival_rate=8,
+        horizon=30,
+        block_capacity=5,
+        round_duration=2.5,
+        leader_timeouts=DiscreteDistribution(values=(100, 200), weights=(3, 1)),
+        appeal_rounds=DiscreteDistribution(values=(0, 1, 2)),
+        bucket_width=4,
+        **kwargs,
+    )
+
+
+def test_scheduler_orders_by_time_kind_and_push_order():
+    scheduler = Scheduler()
+    scheduler.push(2.0, ARRIVAL, "late")
+    scheduler.push(1.0, ARRIVAL, "first arrival")
+    scheduler.push(1.0, BLOCK, "block")
+    scheduler.push(1.0, ARRIVAL, "second arrival")
+    scheduler.push(1.0, ROUND_END, "round end")
+    assert scheduler.next_time() == 1.0
+    popped = [scheduler.pop()[2] for _ in range(len(scheduler))]
+    assert popped == ["round end", "block", "first arrival", "second arrival", "late"]
+    assert scheduler.n_events == 5
+
+
+def test_window_spread_splits_intervals():
+    windows = WindowStats(bucket_width=2.0, n_validators=4)
+    windows.spread("busy", 1.0, 6.5, 3)
+    assert np.allclose(windows.busy, [3.0, 6.0, 6.0, 1.5])
+    assert np.allclose(windows.starts, [0, 2, 4, 6])
+    assert np.isclose(windows.utilization.sum() * 2.0 * 4, 16.5)
+
+
+def test_traffic_drains_and_conserves_counts():
+    traffic = make_traffic()
+    traffic.run()
+    windows = traffic.windows
+
+    assert traffic.n_arrived > 150
+    assert traffic.n_completed == traffic.n_arrived
+    assert windows.arrived.sum() == windows.included.sum() == windows.completed.sum()
+    assert windows.failed.sum() == traffic.agents.n_failed == 0
+    assert not traffic.mempool and traffic.n_in_flight == 0
+    # A backlog built up, so some transactions waited for blocks
+    assert windows.mempool_peak.max() > traffic.block_capacity
+    assert windows.waiting.sum() > 0
+    assert windows.latency.sum() >= windows.waiting.sum()
+
+    # Every assignment was released; validators sat in concurrent committees
+    assert not traffic.load.any()
+    assert traffic.max_load.max() > 1
+    assert np.isclose(traffic.busy_time.sum(), windows.busy.sum())
+    assert np.isclose(
+        traffic.busy_time.sum(), traffic.assignments.sum() * traffic.round_duration
+    )
+
+    # Fees and rewards of the windows add up to the agents' totals
+    assert windows.fees.sum() == traffic.agents.sender_cost
+    totals = {total.name: total for total in traffic.agents.totals()}
+    assert totals["HASH_DEVIANT"].slashed > 0
+    assert windows.rewards.sum() > 0
+
+
+def test_traffic_is_reproducible_and_resumable():
+    whole = make_traffic()
+    whole.run()
+    resumed = make_traffic()
+    resumed.run(until=12.5)
+    assert resumed.now <= 12.5 and len(resumed.scheduler)
+    resumed.run()
+
+    assert resumed.scheduler.n_events == whole.scheduler.n_events
+    for name in ("arrived", "fees", "busy", "latency"):
+        assert np.array_equal(
+            getattr(resumed.windows, name), getattr(whole.windows, name)
+        )
+    assert np.array_equal(resumed.max_load, whole.max_load)
+
+
+def test_without_fees_only_load_is_tracked():
+    traffic = make_traffic(process_fees=False)
+    traffic.run()
+    assert traffic.n_completed == traffic.n_arrived
+    assert traffic.windows.fees.sum() == 0
+    assert traffic.agents.totals()[0].earned == 0
+
+
+def test_invalid_configuration():
+    agents = AgentSimulation(population, params=params)
+    with pytest.raises(ValueError):
+        TrafficSimulation(agents, arrival_rate=0, horizon=10)
+    with pytest.raises(ValueError):
+        TrafficSimulation(
+            agents,
+            arrival_rate=1,
+            horizon=10,
+            appeal_rounds=DiscreteDistribution(values=(3,)),
+        )
+    with pytest.raises(ValueError):
+        DiscreteDistribution(values=(1, 2), weights=(1,))
+
+
+def test_back_to_back_runs_use_disjoint_streams(monkeypatch):
+    agents = AgentSimulation(population, params=params, max_appeals=2)
+    drawn = []
+    for_transaction = agents.streams.for_transaction
+
+    def recording(index):
+        drawn.append(index)
+        return for_transaction(index)
+
+    monkeypatch.setattr(agents.streams, "for_transaction", recording)
+    first = TrafficSimulation(agents, arrival_rate=8, horizon=10)
+    first.run()
+    second = TrafficSimulation(agents, arrival_rate=8, horizon=10)
+    second.run()
+    agents.run(5)
+
+    n_traffic = first.n_arrived + second.n_arrived
+    assert drawn == list(range(n_traffic + 5))
+    assert agents.n_transactions == n_traffic + 5
+    assert not np.array_equal(first.windows.arrived, second.windows.arrived)